@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+"""Checks of the designs as structured records.
+
+Each check returns Diagnostic records instead of printing: the code of the
+check, its severity, the limit and the actual value (plus the unit and the
+cycles, for the dynamic checks). The checks of verifyC and verifyBuckling
+can be evaluated at once for arrays of designs; the messages printed by
+the methods of the springs are given by format(), and report() prints a
+list of records.
+
+Codes:
+    C_HIGH, C_LOW : spring index out of the range 4 - 12 (verifyC)
+    BUCKLING      : free length over the buckling limit (verifyBuckling)
+    X_MAX, F_MAX  : deflexion or force over the maximum (force)
+    STRESS_MAX    : stress of a force over the maximum (stress)
+    FMAX, X_DYNAMIC, LIFE : limits of the dynamic working (verifyDynamic)"""
+from collections import namedtuple
+import numpy as np
+import sys
+
+INFO = 'info'
+WARNING = 'warning'
+ERROR = 'error'
+
+CMIN = 4.0
+CMAX = 12.0
+"""Factor of the buckling length of each type of fixing"""
+ALPHA = {'fix-parallel': 0.5, 'fix-pivot': 0.707, 'both-pivot': 1.0,
+         'hinged-free': 2.0}
+SUPERSCRIPT = {1e5: '\u2075', 1e6: '\u2076', 1e7: '\u2077'}
+EXPONENTS = dict((v, k) for (k, v) in SUPERSCRIPT.items())
+
+Diagnostic = namedtuple('Diagnostic', ('code', 'severity', 'limit', 'actual',
+                                       'unit', 'cycles'),
+                        defaults=('', None))
+
+MESSAGES = {
+    'C_HIGH': "El índice del resorte ({actual:.2f}) es mayor del adecuado "
+              "({limit:.2f}), el diámetro del resorte debería ser menor o el "
+              "calibre mayor; ajustar. En caso de ser imposible, evitar "
+              "esmerilar para no empeorar su funcionamiento",
+    'C_LOW': "El índice del resorte ({actual:.2f}) es menor del adecuado "
+             "({limit:.2f}), el diámetro del resorte debería ser mayor o el "
+             "calibre menor; ajustar. En caso de ser imposible, evitar "
+             "esmerilar para no empeorar su funcionamiento",
+    'BUCKLING': "La longitud del resorte dada: {actual:.2f} mm, provocará "
+                "pandeo. Se recomienda mantener el largo menor a {limit:.2f} "
+                "mm",
+    'X_MAX': "La deflexión dada es mayor a la máxima posible",
+    'F_MAX': "La fuerza dada es mayor a la máxima posible",
+    'STRESS_MAX': "El stress dado corresponde a un fuerza mayor a la máxima "
+                  "posible",
+    'FMAX': "La frecuencia de trabajo debe ser menor a {limit:.2f} ciclos / "
+            "min",
+    'X_DYNAMIC': "Para la vida útil definida (10{cyk} ciclos) la deflexión "
+                 "del resorte no debe superar los {limit:.2f}{unit}",
+    'LIFE': "La vida útil mínima estimada del resorte será: {limit:.2f} "
+            "minutos"}
+
+
+def format(diagnostic):
+    """Message of a record, the text printed by the methods of the
+    springs"""
+    d = diagnostic._asdict()
+    d['cyk'] = SUPERSCRIPT.get(diagnostic.cycles, '\u2076')
+    return MESSAGES[diagnostic.code].format(**d)
+
+
+def report(diagnostics, file=None):
+    """Print the messages of a list of records"""
+    for d in diagnostics:
+        print(format(d), file=file or sys.stdout)
+
+
+def checkC(C):
+    """Spring index check of numbers or arrays: 1 when C is too high, -1
+    when too low and 0 otherwise, like verifyC"""
+    C = np.asarray(C, dtype=float)
+    result = np.where(C >= CMAX, 1, np.where(C <= CMIN, -1, 0))
+    return int(result) if result.ndim == 0 else result
+
+
+def bucklingLength(DM, fixing):
+    """Maximum free length to avoid buckling"""
+    if isinstance(fixing, str):
+        alpha = ALPHA[fixing]
+    else:
+        alpha = np.array([ALPHA[f] for f in fixing])
+    return 2.63 / alpha * np.asarray(DM, dtype=float)
+
+
+def checkBuckling(Lo, DM, fixing):
+    """Buckling check of numbers or arrays: 1 when the spring buckles and 0
+    otherwise, and the maximum free length"""
+    LoMax = bucklingLength(DM, fixing)
+    result = (np.asarray(Lo, dtype=float) >= LoMax).astype(int)
+    if result.ndim == 0:
+        return (int(result), float(LoMax))
+    return (result, LoMax)
+
+
+def diagnose(C, Lo=None, DM=None, fixing=None, buckling=True):
+    """Checks of verifyC and verifyBuckling for arrays of designs. Lo, DM
+    and fixing are required for the buckling check, and 'buckling' (a
+    boolean or an array of them) says to which designs it's applied.
+    Return a list with the records of each design"""
+    C = np.atleast_1d(np.asarray(C, dtype=float))
+    codes = np.atleast_1d(checkC(C))
+    result = [[] for i in range(len(C))]
+    for i in np.flatnonzero(codes == 1):
+        result[i].append(Diagnostic('C_HIGH', WARNING, CMAX, float(C[i])))
+    for i in np.flatnonzero(codes == -1):
+        result[i].append(Diagnostic('C_LOW', WARNING, CMIN, float(C[i])))
+    if Lo is not None:
+        fixing = [fixing] * len(C) if isinstance(fixing, str) else fixing
+        Lo = np.atleast_1d(np.asarray(Lo, dtype=float))
+        (buckles, LoMax) = checkBuckling(Lo, np.atleast_1d(DM), fixing)
+        buckles = np.atleast_1d(buckles).astype(bool) & \
+            np.broadcast_to(buckling, buckles.shape)
+        for i in np.flatnonzero(buckles):
+            result[i].append(Diagnostic('BUCKLING', WARNING, float(LoMax[i]),
+                                        float(Lo[i]), 'mm'))
+    return result
+
+
+def diagnoseDesigns(designs):
+    """Checks of verifyC and verifyBuckling of a list of solved springs or
+    designs; the buckling is only checked for the compression springs"""
+    from spring import eSpring
+    from design import eDesign
+    buckling = np.array([not isinstance(d, (eSpring, eDesign)) for d in
+                         designs])
+    return diagnose([float(d.C) for d in designs],
+                    [float(d.Lo) for d in designs],
+                    [float(d.DM) for d in designs],
+                    [d.fixing for d in designs], buckling)
+
+
+def dynamic(fmax, x, cycles=1e6, unit=' mm', limitCycles=None):
+    """Records of the limits of the dynamic working, see verifyDynamic;
+    limitCycles are the cycles of the table of stresses used for x, when
+    they aren't the cycles given"""
+    return [Diagnostic('FMAX', INFO, float(fmax), None, 'ciclos / min',
+                       cycles),
+            Diagnostic('X_DYNAMIC', INFO, float(x), None, unit,
+                       limitCycles or cycles),
+            Diagnostic('LIFE', INFO, float(cycles / fmax), None, 'min',
+                       cycles)]
@@ -0,0 +1,351 @@
+#!/usr/bin/env python
+"""Evaluation of large sweeps of springs in many machines.
+
+The coordinator splits the inputs of a sweep in shards of consecutive rows
+and waits for the workers, that connect to it by TCP. Each worker receives
+a shard, solves its springs with the compiled solver and sends back the
+solved parameters; then it receives the next shard. When a worker fails
+or doesn't answer in time, its shard is sent to other worker, up to
+'retries' times; a shard that raises an error in the worker is sent back
+as an error, so the worker isn't lost. When all the workers that joined
+have left, the shards not solved are marked failed. The results are
+written in the row of each input, so the result is in the order of the
+inputs, with the format of spring.solveMany.
+
+The messages are JSON objects preceded by their length (4 bytes, big
+endian):
+    worker -> {"type": "hello", "token": ...}
+    coord. -> {"type": "shard", "id": 0, "class": "compression",
+               "options": {...}, "names": ["d", ...], "rows": [[...], ...]}
+    worker -> {"type": "result", "id": 0, "values": [[...], ...],
+               "errors": {"3": "ValueError: ..."}}
+           or {"type": "error", "id": 0, "error": "MemoryError: ..."}
+    coord. -> {"type": "stop"}
+Several worker processes in the same machine (see runLocal) are a valid
+deployment."""
+from spring import Spring, eSpring, tSpring
+from design import PARAMS
+from solver import solveFast
+from multiprocessing import Process
+from threading import Thread, Lock, Event
+import itertools
+import argparse
+import socket
+import struct
+import queue
+import json
+import os
+import numpy as np
+
+CLASSES = {'compression': Spring, 'extension': eSpring, 'torsion': tSpring}
+HEADER = struct.Struct('>I')
+MAXMSG = 1 << 30
+
+
+def send(sock, obj):
+    """Send a message"""
+    data = json.dumps(obj).encode()
+    sock.sendall(HEADER.pack(len(data)) + data)
+
+
+def _recvExact(sock, n):
+    data = bytearray()
+    while len(data) < n:
+        aux = sock.recv(min(n - len(data), 1 << 20))
+        if len(aux) == 0:
+            raise ConnectionError("Conexión cerrada")
+        data.extend(aux)
+    return bytes(data)
+
+
+def recv(sock):
+    """Receive a message"""
+    (n,) = HEADER.unpack(_recvExact(sock, HEADER.size))
+    if n > MAXMSG:
+        raise ValueError("Mensaje de {} bytes demasiado grande".format(n))
+    return json.loads(_recvExact(sock, n).decode())
+
+
+def grid(**axes):
+    """Inputs of a sweep: the product of the values of each parameter, as a
+    tuple (names, rows)"""
+    names = list(axes.keys())
+    return (names, [list(r) for r in itertools.product(*[
+        [float(v) for v in axes[k]] for k in names])])
+
+
+def solveShard(kind, options, names, rows, database='wires.db'):
+    """Solve the rows of a shard. Return the values (lists of the
+    parameters of PARAMS, None when unresolved) and the errors by row"""
+    springClass = CLASSES[kind]
+    values = []
+    errors = {}
+    for (i, row) in enumerate(rows):
+        try:
+            design = solveFast(springClass, dict(zip(names, row)), database,
+                               **options)
+            values.append([getattr(design, k) for k in PARAMS])
+        except Exception as ex:
+            values.append([None] * len(PARAMS))
+            errors[str(i)] = "{}: {}".format(type(ex).__name__, ex)
+    return (values, errors)
+
+
+def work(host, port, token='', database='wires.db'):
+    """Run a worker: solve the shards of the coordinator until it sends
+    stop or closes the connection. Return the number of shards solved"""
+    n = 0
+    with socket.create_connection((host, port)) as sock:
+        send(sock, {'type': 'hello', 'token': token, 'pid': os.getpid()})
+        while True:
+            try:
+                msg = recv(sock)
+            except ConnectionError:
+                break
+            if msg.get('type') != 'shard':
+                break
+            try:
+                (values, errors) = solveShard(msg['class'], msg['options'],
+                                              msg['names'], msg['rows'],
+                                              database)
+            except Exception as ex:
+                send(sock, {'type': 'error', 'id': msg['id'],
+                            'error': "{}: {}".format(type(ex).__name__, ex)})
+                continue
+            send(sock, {'type': 'result', 'id': msg['id'], 'values': values,
+                        'errors': errors})
+            n += 1
+    return n
+
+
+class Coordinator:
+    """Coordinator of a sweep of springs of the type 'kind' (compression,
+    extension or torsion). 'names' are the input parameters and 'rows' the
+    list of their values; 'options' are given to the springs (material,
+    ending, fixing...). Use start() to listen, then run() to wait the
+    results."""
+    def __init__(self, kind, names, rows, options=None, shardSize=500,
+                 retries=3, shardTimeout=300, host='127.0.0.1', port=0,
+                 token=''):
+        if kind not in CLASSES:
+            raise ValueError("Tipo de resorte {} no es válido".format(kind))
+        self.kind = kind
+        self.names = list(names)
+        self.rows = rows
+        self.options = options or {}
+        self.retries = retries
+        self.shardTimeout = shardTimeout
+        self.token = token
+        self.shards = [(i, min(i + shardSize, len(rows))) for i in
+                       range(0, len(rows), shardSize)]
+        self.values = np.full((len(rows), len(PARAMS)), np.nan)
+        self.errors = {}
+        self.stats = {'workers': 0, 'retries': 0, 'failed': 0}
+        self._pending = queue.Queue()
+        for i in range(len(self.shards)):
+            self._pending.put(i)
+        self._attempts = [0] * len(self.shards)
+        self._left = len(self.shards)
+        self._live = 0
+        self._lock = Lock()
+        self._done = Event()
+        if self._left == 0:
+            self._done.set()
+        self._sock = socket.create_server((host, port))
+        self.address = self._sock.getsockname()[:2]
+
+    def start(self):
+        """Start accepting workers in a thread"""
+        Thread(target=self._accept, daemon=True).start()
+        return self
+
+    def _accept(self):
+        while not self._done.is_set():
+            try:
+                (conn, addr) = self._sock.accept()
+            except OSError:
+                break
+            Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _finish(self, idx, values, errors):
+        (a, b) = self.shards[idx]
+        with self._lock:
+            self.values[a:b] = np.array(values, dtype=float)
+            for (k, v) in errors.items():
+                self.errors[a + int(k)] = v
+            self._left -= 1
+            if self._left == 0:
+                self._done.set()
+
+    def _failed(self, idx, ex, retry=True):
+        """Send the shard again, or mark it failed after 'retries'"""
+        with self._lock:
+            self._attempts[idx] += 1
+            retry = retry and self._attempts[idx] <= self.retries
+            self.stats['retries' if retry else 'failed'] += 1
+        if retry:
+            self._pending.put(idx)
+        else:
+            (a, b) = self.shards[idx]
+            self._finish(idx, [[np.nan] * len(PARAMS)] * (b - a),
+                         dict((str(i), "Lote fallido: {}".format(ex))
+                              for i in range(b - a)))
+
+    def abort(self, reason):
+        """Mark failed the shards waiting for a worker"""
+        while True:
+            try:
+                idx = self._pending.get_nowait()
+            except queue.Empty:
+                break
+            self._failed(idx, reason, retry=False)
+
+    def _serve(self, conn):
+        with conn:
+            try:
+                conn.settimeout(10)
+                hello = recv(conn)
+                if hello.get('type') != 'hello' or \
+                   hello.get('token', '') != self.token:
+                    return
+            except Exception:
+                return
+            with self._lock:
+                self.stats['workers'] += 1
+                self._live += 1
+            try:
+                self._work(conn)
+            finally:
+                with self._lock:
+                    self._live -= 1
+                    alone = self._live == 0
+                if alone and not self._done.is_set():
+                    self.abort("No quedan trabajadores")
+
+    def _work(self, conn):
+        """Send shards to a worker until they are done or it fails"""
+        conn.settimeout(self.shardTimeout)
+        while not self._done.is_set():
+            try:
+                idx = self._pending.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            (a, b) = self.shards[idx]
+            try:
+                send(conn, {'type': 'shard', 'id': idx,
+                            'class': self.kind, 'options': self.options,
+                            'names': self.names,
+                            'rows': self.rows[a:b]})
+                msg = recv(conn)
+                if msg.get('type') == 'error' and msg.get('id') == idx:
+                    self._failed(idx, msg.get('error'))
+                    continue
+                if msg.get('type') != 'result' or msg.get('id') != idx or \
+                   len(msg.get('values', ())) != b - a:
+                    raise ValueError("Respuesta no válida")
+            except Exception as ex:
+                self._failed(idx, "{}: {}".format(type(ex).__name__, ex))
+                return
+            self._finish(idx, msg['values'], msg['errors'])
+        try:
+            send(conn, {'type': 'stop'})
+        except OSError:
+            pass
+
+    def run(self, timeout=None):
+        """Wait until all the shards are done and return the result, like
+        spring.solveMany. After 'timeout' seconds the coordinator is closed
+        and TimeoutError is raised"""
+        if not self._done.wait(timeout):
+            self.close()
+            raise TimeoutError("Quedan {} lotes sin resolver".format(
+                               self._left))
+        self.close()
+        return {'names': list(PARAMS), 'values': self.values,
+                'errors': dict(sorted(self.errors.items()))}
+
+    def close(self):
+        self._done.set()
+        self._sock.close()
+
+
+def runLocal(kind, names, rows, workers=None, database='wires.db',
+             timeout=None, **kwargs):
+    """Run a coordinator and 'workers' worker processes in this machine,
+    waiting at most 'timeout' seconds"""
+    coord = Coordinator(kind, names, rows, **kwargs).start()
+    procs = [Process(target=work, args=(coord.address[0], coord.address[1],
+                                        coord.token, database), daemon=True)
+             for i in range(workers or os.cpu_count() or 1)]
+    for p in procs:
+        p.start()
+    try:
+        return coord.run(timeout)
+    finally:
+        for p in procs:
+            p.join(5)
+            if p.is_alive():
+                p.terminate()
+
+
+def parseAxis(text):
+    """Parse 'name=start:stop:steps' or 'name=v1,v2,...'"""
+    (name, values) = text.split('=')
+    if ':' in values:
+        (start, stop, steps) = values.split(':')
+        return (name, np.linspace(float(start), float(stop), int(steps)))
+    return (name, [float(v) for v in values.split(',')])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest='mode', required=True)
+    w = sub.add_parser('worker')
+    w.add_argument('host')
+    w.add_argument('port', type=int)
+    for p in (w, sub.add_parser('coordinator'), sub.add_parser('local')):
+        p.add_argument('--token', default='')
+        p.add_argument('--database', default='wires.db')
+    for p in (sub.choices['coordinator'], sub.choices['local']):
+        p.add_argument('type', choices=sorted(CLASSES.keys()))
+        p.add_argument('axes', nargs='+', help='nombre=inicio:fin:pasos')
+        p.add_argument('--material', default='A229')
+        p.add_argument('--ending', default=None)
+        p.add_argument('--fixing', default=None)
+        p.add_argument('--shard', type=int, default=500)
+        p.add_argument('--retries', type=int, default=3)
+        p.add_argument('--out', default='sweep.npz')
+        p.add_argument('--timeout', type=float, default=3600,
+                       help='espera máxima del barrido en segundos')
+    sub.choices['coordinator'].add_argument('--host', default='127.0.0.1')
+    sub.choices['coordinator'].add_argument('--port', type=int, default=9000)
+    sub.choices['local'].add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+    if args.mode == 'worker':
+        print("{} lotes resueltos".format(work(args.host, args.port,
+                                                args.token, args.database)))
+        return
+    (names, rows) = grid(**dict(parseAxis(a) for a in args.axes))
+    options = dict((k, getattr(args, k)) for k in ('material', 'ending',
+                                                    'fixing')
+                   if getattr(args, k) is not None)
+    kwargs = {'options': options, 'shardSize': args.shard,
+              'retries': args.retries, 'token': args.token}
+    if args.mode == 'local':
+        result = runLocal(args.type, names, rows, args.workers,
+                          args.database, args.timeout, **kwargs)
+    else:
+        coord = Coordinator(args.type, names, rows, host=args.host,
+                            port=args.port, **kwargs).start()
+        print("Coordinador en {}:{}, {} lotes".format(*coord.address,
+                                                     len(coord.shards)))
+        result = coord.run(args.timeout)
+    np.savez(args.out, names=result['names'], values=result['values'],
+             inputs=np.array(rows), inputNames=names)
+    print("{} resortes, {} errores -> {}".format(len(rows),
+                                                 len(result['errors']),
+                                                 args.out))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+"""Comparison of one geometry of spring in every material.
+
+The material only changes the density, the moduli and the tensile
+strength, so when the geometry is solved its values in other material are
+    k  ~ G (E for the torsion springs)
+    fn ~ sqrt(G / rho)
+    w  ~ rho
+    TS = tensileStrength(material, d)
+and the stress for a force is inversely proportional to TS. The geometry
+is solved only once, and the values of every material (and temperature,
+see thermal) are calculated in one pass with arrays. When the inputs
+include k, fn or w the geometry depends on the material, so the spring is
+solved for each material.
+
+The result is a table, a dictionary of arrays with a row per material:
+the properties (rho, G, E, TS, maxT, htTemp), the values of the spring
+(k, fn, w, fmax) and the maximum force F and deflexion x for the cycles
+given. With temperatures, k, fn, F and x have a column per temperature,
+and the flags overMax and overHT are added."""
+from spring import Spring, eSpring, tSpring, loadMaterials
+from design import Design, tDesign, PARAMS, freeze, newSpring
+from solver import solveFast
+from tensile import tensileStrength
+from thermal import TREF, modulusFactor, stressFactor, _unitStress
+import argparse
+import numpy as np
+
+CLASSES = {'compression': Spring, 'extension': eSpring, 'torsion': tSpring}
+"""Inputs that depend on the material"""
+DEPENDENT = ('k', 'fn', 'w')
+
+_fractions = {}
+
+
+def dynamicFractions(springClass, material, cycles, database='wires.db'):
+    """Maximum fractions of the tensile strength of the material for the
+    cycles given, see _dynamicTS"""
+    key = (springClass, material, cycles)
+    if key not in _fractions:
+        spring = newSpring(springClass, database, material=material)
+        _fractions[key] = spring._dynamicTS(cycles)[0]
+    return _fractions[key]
+
+
+def compareDesigns(designs, materials, T=None, cycles=1e6,
+                   database='wires.db'):
+    """Table of the designs (or solved springs) in the materials, one
+    design per material, or the same design for all of them"""
+    if isinstance(designs, Design) or not isinstance(designs, (list, tuple)):
+        designs = [designs] * len(materials)
+    designs = [d if isinstance(d, Design) else freeze(d) for d in designs]
+    data = loadMaterials(database)
+    base = dict((k, np.array([getattr(d, k) for d in designs]))
+                for k in PARAMS + ('rho', 'G', 'E', 'TS'))
+    prop = dict((k, np.array([data[m][k] for m in materials], dtype=float))
+                for k in ('rho', 'G', 'E', 'maxT', 'htTemp'))
+    torsion = type(designs[0]) is tDesign
+    modulus = 'E' if torsion else 'G'
+    TS = np.array([tensileStrength(m, np.array([d.d]), database)[0] for
+                   (m, d) in zip(materials, designs)])
+    table = {'material': list(materials),
+             'name': [data[m]['name'] for m in materials]}
+    table.update(prop)
+    table.update((k, base[k]) for k in ('d', 'DE', 'DI', 'Nt', 'Lo'))
+    table['TS'] = TS
+    table['k'] = base['k'] * prop[modulus] / base[modulus]
+    table['fn'] = base['fn'] * np.sqrt(prop['G'] / base['G'] *
+                                       base['rho'] / prop['rho'])
+    table['w'] = base['w'] * prop['rho'] / base['rho']
+    table['fmax'] = np.array([d._fmax() for d in designs]) * \
+        table['fn'] / base['fn']
+    # force allowed by each stress, with the stress for an unitary force
+    # scaled by the tensile strength of each material
+    temps = np.atleast_1d(np.asarray(TREF if T is None else T, dtype=float))
+    fm = np.stack([modulusFactor(m, temps) for m in materials])
+    fs = stressFactor(prop['maxT'][:, None], temps[None, :])
+    unit = [_unitStress(d) for d in designs]
+    F = np.full(fm.shape, np.inf)
+    for key in unit[0].keys():
+        frac = np.array([dynamicFractions(d._springClass, m, cycles,
+                                          database)[key]
+                         for (m, d) in zip(materials, designs)])
+        perN = np.array([u[key] for u in unit]) * base['TS'] / TS
+        F = np.minimum(F, (frac / perN)[:, None] * fs)
+    k = table['k'][:, None] * fm
+    x = F / k
+    if type(designs[0]) is Design:
+        x = np.minimum(x, (base['Lo'] - base['Ls'])[:, None])
+        F = np.minimum(F, x * k)
+    table['cycles'] = cycles
+    if T is None:
+        table.update(F=F[:, 0], x=x[:, 0])
+    else:
+        table.update(T=temps, k=k, fn=table['fn'][:, None] * np.sqrt(fm),
+                     F=F, x=x, overMax=temps[None, :] > prop['maxT'][:, None],
+                     overHT=temps[None, :] >= prop['htTemp'][:, None])
+    return table
+
+
+def compareMaterials(springClass, inputs, materials=None, T=None,
+                     cycles=1e6, database='wires.db', **options):
+    """Solve a spring with the inputs given and compare it in every
+    material (all the materials of the database by default). The options
+    are given to the springs (ending, fixing, L1, L2...). The materials
+    that can't be solved are in 'errors' and not in the table"""
+    materials = list(materials or loadMaterials(database).keys())
+    options.pop('material', None)
+    errors = {}
+    if any(k in inputs for k in DEPENDENT):
+        designs = []
+        for m in materials:
+            try:
+                designs.append(solveFast(springClass, inputs, database,
+                                         material=m, **options))
+            except Exception as ex:
+                errors[m] = "{}: {}".format(type(ex).__name__, ex)
+        materials = [m for m in materials if m not in errors]
+    else:
+        designs = solveFast(springClass, inputs, database,
+                            material=materials[0], **options)
+    if len(materials) == 0:
+        raise ValueError("No se pudo resolver el resorte en ningún material")
+    table = compareDesigns(designs, materials, T, cycles, database)
+    table['errors'] = errors
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('type', choices=sorted(CLASSES.keys()))
+    parser.add_argument('inputs', nargs='+', help='nombre=valor')
+    parser.add_argument('--materials', nargs='+', default=None)
+    parser.add_argument('--T', type=float, nargs='+', default=None,
+                        help='temperaturas en ºC')
+    parser.add_argument('--cycles', type=float, default=1e6)
+    parser.add_argument('--ending', default=None)
+    parser.add_argument('--fixing', default=None)
+    parser.add_argument('--database', default='wires.db')
+    args = parser.parse_args()
+    inputs = dict((k, float(v)) for (k, v) in (i.split('=') for i in
+                                                args.inputs))
+    options = dict((k, getattr(args, k)) for k in ('ending', 'fixing')
+                   if getattr(args, k) is not None)
+    table = compareMaterials(CLASSES[args.type], inputs, args.materials,
+                             args.T, args.cycles, args.database, **options)
+    print("{0:>8}{1:>10}{2:>10}{3:>10}{4:>10}{5:>10}{6:>10}".format(
+          'Material', 'TS', 'k', 'fn', 'w', 'F', 'x'))
+    for (i, m) in enumerate(table['material']):
+        for j in range(1 if args.T is None else len(args.T)):
+            (k, fn, F, x) = (table[c][i] if args.T is None else
+                             table[c][i, j] for c in ('k', 'fn', 'F', 'x'))
+            print("{0:>8}{1:10.1f}{2:10.4f}{3:10.2f}{4:10.5f}{5:10.2f}"
+                  "{6:10.2f}".format(m if j == 0 else '', table['TS'][i], k,
+                                     fn, table['w'][i], F, x) +
+                  ("" if args.T is None else "  {:.0f} ºC{}".format(
+                   args.T[j], " *" if table['overMax'][i, j] else "")))
+    for (k, v) in table['errors'].items():
+        print("{}: {}".format(k, v))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+#!/usr/bin/env python
+"""Datasheets of the springs of a production order.
+
+Each item of the order defines a spring, like the requests of service.py,
+plus the forces of its load points:
+    {"id": "P-001", "type": "compression", "material": "A229",
+     "ending": "closed-ground", "fixing": "fix-parallel",
+     "inputs": {"d": 1, "DE": 10, "Nt": 8, "Lo": 20}, "loads": [5, 10]}
+For each item an HTML page is written with the parameters of the spring
+(the values of showParams), the deflexion and stress of the load points,
+the messages of verifyC and verifyBuckling and the limits of verifyDynamic
+for 10⁵, 10⁶ and 10⁷ cycles; and a row is added to a CSV summary.
+
+The items are rendered by a pool of processes, that load the templates
+once (string.Template, the defaults or the files of a folder), and each
+page is written to disk by the process that renders it, while the rows of
+the summary are written as they arrive. The errors of an item are written
+in its row and don't stop the rest."""
+from spring import Spring, eSpring, tSpring
+from design import PARAMS, CYCLES, freeze, newSpring
+from solver import compiled
+import checks
+from multiprocessing import Pool
+from string import Template
+from html import escape
+import argparse
+import csv
+import json
+import os
+
+CLASSES = {'compression': Spring, 'extension': eSpring, 'torsion': tSpring}
+OPTIONS = ('material', 'ending', 'fixing', 'L1', 'L2', 'La', 'Ra', 'Rb')
+UNITS = {'d': 'mm', 'DE': 'mm', 'DM': 'mm', 'DI': 'mm', 'Lo': 'mm',
+         'Ls': 'mm', 'p': 'mm', 'gap': 'mm', 'w': 'Kg', 'C': 'mm/mm',
+         'k': 'N/mm', 'fn': 'Hz', 'rho': 'Kg/mm³', 'G': 'MPa', 'E': 'MPa',
+         'maxT': 'ºC', 'htTemp': 'ºC', 'htTime': 'min', 'TS': 'MPa',
+         'La': 'mm', 'Ra': 'mm', 'Rb': 'mm', 'L1': 'mm', 'L2': 'mm'}
+CSVFIELDS = ['id', 'type', 'material', 'ending', 'fixing'] + list(PARAMS) + \
+            ['verifyC', 'verifyBuckling'] + \
+            ['x{:.0e}'.format(c) for c in CYCLES] + ['fmax', 'error']
+
+TEMPLATES = {
+    'page': """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Resorte $id</title>
+<style>
+body {font-family: sans-serif; margin: 2em}
+table {border-collapse: collapse; margin-bottom: 1em}
+td, th {border: 1px solid #999; padding: 2px 8px; text-align: right}
+.warn {color: #d73c37}
+</style>
+</head>
+<body>
+<h1>Resorte $id</h1>
+<p>$kind, material $material, terminación $ending, fijación $fixing</p>
+<h2>Parámetros</h2>
+<table>
+$params
+</table>
+<h2>Puntos de carga</h2>
+<table>
+<tr><th>F (N)</th><th>x</th><th>Estrés (% TS)</th></tr>
+$loads
+</table>
+<h2>Verificaciones</h2>
+<ul>
+$checks
+</ul>
+<h2>Funcionamiento dinámico</h2>
+<p>Frecuencia de trabajo máxima: $fmax ciclos / min</p>
+<table>
+<tr><th>Ciclos</th><th>Deflexión máxima</th></tr>
+$dynamic
+</table>
+</body>
+</html>
+""",
+    'param': "<tr><td>$name</td><td>$value</td><td>$unit</td></tr>",
+    'load': "<tr><td>$F</td><td>$x</td><td>$stress</td></tr>",
+    'check': '<li class="$cls">$text</li>',
+    'dynamic': "<tr><td>$cycles</td><td>$x</td></tr>"}
+
+_templates = {}
+_options = {}
+
+
+def loadTemplates(folder=None):
+    """Templates of the datasheet; the files '<name>.html' of the folder
+    replace the defaults"""
+    result = dict(TEMPLATES)
+    if folder is not None:
+        for k in TEMPLATES.keys():
+            path = os.path.join(folder, k + '.html')
+            if os.path.isfile(path):
+                with open(path, encoding='utf-8') as f:
+                    result[k] = f.read()
+    return dict((k, Template(v)) for (k, v) in result.items())
+
+
+def _init(folder, outDir, database):
+    """Initializer of the workers"""
+    _templates.update(loadTemplates(folder))
+    _options.update(outDir=outDir, database=database)
+
+
+def _fmt(v):
+    return "{:.4g}".format(v) if isinstance(v, float) else escape(str(v))
+
+
+def evaluate(item, database='wires.db'):
+    """Solve the spring of an item and collect the values of its datasheet,
+    with the codes and messages of the checks of verifyC and
+    verifyBuckling"""
+    springClass = CLASSES[item.get('type', 'compression')]
+    options = dict((k, item[k]) for k in OPTIONS if k in item)
+    spring = newSpring(springClass, database, solver=compiled, **options)
+    spring.solveParams(None, **item['inputs'])
+    ur = spring.checkUnresolved()
+    if len(ur) > 0:
+        raise ValueError("Variables sin resolver: {}".format(" ".join(ur)))
+    design = freeze(spring)
+    params = [(k, float(v) if isinstance(v, (int, float)) else v) for (k, v)
+              in sorted(spring.__dict__.items()) if not k.startswith('_') and
+              k not in ('isSolved', 'solver')]
+    records = checks.diagnoseDesigns([design])[0]
+    result = []
+    for (name, codes) in (('verifyC', ('C_HIGH', 'C_LOW')),
+                          ('verifyBuckling', ('BUCKLING',))):
+        found = [r for r in records if r.code in codes]
+        code = checks.checkC(design.C) if name == 'verifyC' else \
+            int(len(found) > 0)
+        result.append((name, code, " ".join(checks.format(r) for r in
+                                            found)))
+    loads = []
+    for F in item.get('loads', ()):
+        loads.append(design.stress(F=F))
+        loads[-1]['x'] = design.force(F=loads[-1]['F'])['x']
+    dynamic = [design.verifyDynamic(cycles=c) for c in CYCLES]
+    return {'design': design, 'params': params, 'checks': result,
+            'loads': loads, 'dynamic': dynamic}
+
+
+def render(item, data, templates):
+    """HTML page of an item"""
+    t = templates
+    design = data['design']
+    params = "\n".join(t['param'].substitute(name=k, value=_fmt(v),
+                                             unit=UNITS.get(k, ''))
+                       for (k, v) in data['params'])
+    loads = "\n".join(t['load'].substitute(
+        F=_fmt(r['F']), x=_fmt(r['x']),
+        stress=" / ".join("{:.1%}".format(r[k]) for k in
+                          ('stress', 'stressA', 'stressB') if k in r))
+        for r in data['loads'])
+    checks = "\n".join(t['check'].substitute(
+        cls='warn' if text else 'ok',
+        text=escape(text or "{}: correcto".format(name)))
+        for (name, code, text) in data['checks'])
+    dynamic = "\n".join(t['dynamic'].substitute(cycles="{:.0e}".format(
+        r['cycles']), x=_fmt(r['x'])) for r in data['dynamic'])
+    return t['page'].substitute(
+        id=escape(str(item['id'])), kind=escape(item.get('type',
+                                                         'compression')),
+        material=design.material, ending=design.ending,
+        fixing=design.fixing, params=params, loads=loads, checks=checks,
+        dynamic=dynamic, fmax=_fmt(data['dynamic'][0]['fmax']))
+
+
+def _row(item, data=None, error=None):
+    row = {'id': item.get('id'), 'type': item.get('type', 'compression')}
+    if data is not None:
+        design = data['design']
+        row.update((k, getattr(design, k)) for k in ('material', 'ending',
+                                                     'fixing') + PARAMS)
+        for (name, code, text) in data['checks']:
+            row[name] = code
+        for (c, r) in zip(CYCLES, data['dynamic']):
+            row['x{:.0e}'.format(c)] = r['x']
+        row['fmax'] = data['dynamic'][0]['fmax']
+    row['error'] = error
+    return row
+
+
+def renderItem(item):
+    """Render an item and write its page, used by the workers. Return the
+    row of the summary"""
+    try:
+        data = evaluate(item, _options['database'])
+        page = render(item, data, _templates)
+        name = "".join(c if c.isalnum() or c in '-_.' else '_' for c in
+                       str(item['id']))
+        with open(os.path.join(_options['outDir'], name + '.html'), 'w',
+                  encoding='utf-8') as f:
+            f.write(page)
+    except Exception as ex:
+        return _row(item, error="{}: {}".format(type(ex).__name__, ex))
+    return _row(item, data)
+
+
+def generate(items, outDir, processes=None, templates=None,
+             database='wires.db', summary='summary.csv'):
+    """Write the datasheets of the items (any iterable, it's consumed as the
+    pages are rendered) in the folder outDir, and the summary CSV. Return a
+    dictionary with the number of pages written and the errors by id"""
+    os.makedirs(outDir, exist_ok=True)
+    result = {'ok': 0, 'errors': {}}
+    initargs = (templates, outDir, database)
+    with open(os.path.join(outDir, summary), 'w', newline='',
+              encoding='utf-8') as f:
+        writer = csv.DictWriter(f, CSVFIELDS, extrasaction='ignore')
+        writer.writeheader()
+        if processes == 1:
+            _init(*initargs)
+            rows = map(renderItem, items)
+        else:
+            pool = Pool(processes, initializer=_init, initargs=initargs)
+            rows = pool.imap(renderItem, items, chunksize=8)
+        try:
+            for row in rows:
+                writer.writerow(row)
+                if row['error'] is None:
+                    result['ok'] += 1
+                else:
+                    result['errors'][row['id']] = row['error']
+        finally:
+            if processes != 1:
+                pool.close()
+                pool.join()
+    return result
+
+
+def _readItems(path):
+    """Items of a JSON file (a list) or a JSON lines file"""
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    if text.lstrip().startswith('['):
+        yield from json.loads(text)
+    else:
+        for line in text.splitlines():
+            if line.strip():
+                yield json.loads(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('items', help='archivo JSON con los resortes')
+    parser.add_argument('--out', default='datasheets')
+    parser.add_argument('--templates', default=None)
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--database', default='wires.db')
+    args = parser.parse_args()
+    result = generate(_readItems(args.items), args.out, args.processes,
+                      args.templates, args.database)
+    print("{} hojas de datos en {}, {} errores".format(
+          result['ok'], args.out, len(result['errors'])))
+    for (k, v) in result['errors'].items():
+        print("    {}: {}".format(k, v))
+
+
+if __name__ == '__main__':
+    main()
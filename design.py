@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+"""Immutable definition of solved springs.
+
+A Spring changes its own attributes while it's solved and evaluated, so one
+instance can't be shared between threads. The classes of this module keep
+the solved parameters of a spring in a read only tuple, and all the
+evaluation (force, stress, dynamic check) is done with local variables of
+each call, so the same design can be evaluated from many threads at the
+same time without locks or copies. The formulas (stresses for an unitary
+force, maximum deflexion and frequency) are the methods of the classes of
+spring, shared by the designs, so both always give the same values."""
+from spring import Spring, eSpring, tSpring
+from collections import namedtuple
+
+PARAMS = ('d', 'DE', 'DM', 'DI', 'Nt', 'Na', 'p', 'gap', 'Lo', 'Ls', 'C', 'w',
+          'fn', 'k')
+FIELDS = ('material', 'ending', 'fixing') + PARAMS + \
+         ('rho', 'G', 'E', 'maxT', 'htTemp', 'htTime', 'TS', 'La', 'Ra',
+          'Rb', 'L1', 'L2', 'dynTS')
+CYCLES = (1e5, 1e6, 1e7)
+"""Values of the hooks of each class, given like the options of newSpring
+and not solved with the parameters"""
+HOOKS = {Spring: (), eSpring: ('La', 'Ra', 'Rb'), tSpring: ('L1', 'L2')}
+
+
+class Design(namedtuple('_Design', FIELDS)):
+    """Solved compression spring. The parameters have the same names and
+    units of the class Spring, and the methods force, stress and
+    verifyDynamic return the same values, but nothing is printed and the
+    design is never modified. Use freeze() or solveDesign() to create it."""
+    __slots__ = ()
+    _springClass = Spring
+    _checkMaxDef = Spring._checkMaxDef
+    _calcKw = Spring._calcKw
+    _bodyFactor = Spring._bodyFactor
+    _fmax = Spring._fmax
+
+    def force(self, **kwargs):
+        """Calculate the force for the deflexion 'x' given, or the deflexion
+        for the force 'F' given. The values outside of range are replaced by
+        the maximum one."""
+        for (k, v) in kwargs.items():
+            if k == 'x':
+                x = float(v)
+                if x > 0:
+                    x = self._checkMaxDef(x)
+                return {'F': self.k * x, 'x': x}
+            elif k == 'F':
+                F = float(v)
+                x = F / self.k
+                if F > 0:
+                    aux = self._checkMaxDef(x)
+                    if aux != x:
+                        x = aux
+                        F = self.k * x
+                return {'F': F, 'x': x}
+        raise ValueError("Se requiere la deflexión 'x' o la fuerza 'F'")
+
+    def _calcStress(self, factor, **kwargs):
+        """Calculate the stress for the force 'F' given, or the force for the
+        'stress' given, where 'factor' is the stress for an unitary force.
+        When the force exceeds the maximum possible force, the maximum is
+        used."""
+        for (k, v) in kwargs.items():
+            if k == 'F':
+                F = self.force(F=v)['F']
+                return {'stress': F * factor, 'F': F}
+            elif k == 'stress':
+                stress = float(v)
+                F = stress / factor
+                aux = self.force(F=F)['F']
+                if aux != F:
+                    F = aux
+                    stress = F * factor
+                return {'stress': stress, 'F': F}
+        raise ValueError("Se requiere la fuerza 'F' o el estrés 'stress'")
+
+    def stress(self, **kwargs):
+        """Calculate the stress on the body, based on the given Force, or
+        calculate the force base on the given stress"""
+        return self._calcStress(self._bodyFactor(), **kwargs)
+
+    def _dynamicTS(self, cycles):
+        """Maximum fractions of the tensile strength for the cycles given"""
+        for (c, TS, cyk) in self.dynTS:
+            if c == cycles:
+                return (dict(TS), cyk)
+        return self._dynamicTS(1e6)
+
+    def verifyDynamic(self, cycles=1e6):
+        """Return the maximum deflexion and working frequency for the number
+        of cycles given"""
+        TS = self._dynamicTS(cycles)[0]
+        aux = self.force(**self.stress(stress=TS['stress']))
+        return {'cycles': cycles, 'x': aux['x'], 'fmax': self._fmax()}
+
+
+class eDesign(Design):
+    """Solved extension spring, see eSpring"""
+    __slots__ = ()
+    _springClass = eSpring
+    _hookFactorA = eSpring._hookFactorA
+    _hookFactorB = eSpring._hookFactorB
+    _fmax = eSpring._fmax
+
+    def force(self, **kwargs):
+        result = super().force(**dict((k, -float(v)) for (k, v) in
+                                      kwargs.items()))
+        return dict((k, -v) for (k, v) in result.items())
+
+    def stress(self, **kwargs):
+        """Calculate the stress on the body and hooks, based on the given
+        Force, or calculate the force base on the given stress of the
+        body"""
+        result = self._calcStress(self._bodyFactor(), **kwargs)
+        hookA = self._calcStress(self._hookFactorA(), F=result['F'])
+        hookB = self._calcStress(self._hookFactorB(), F=result['F'])
+        return {**result, **{'stressA': hookA['stress'],
+                             'stressB': hookB['stress']}}
+
+    def stressA(self, **kwargs):
+        return self._calcStress(self._hookFactorA(), **kwargs)
+
+    def stressB(self, **kwargs):
+        return self._calcStress(self._hookFactorB(), **kwargs)
+
+    def verifyDynamic(self, cycles=1e6):
+        """Return the minimum deflexion so the stress of the body and the
+        hooks are below the maximum for the cycles given"""
+        TS = self._dynamicTS(cycles)[0]
+        sBody = self.force(**self._calcStress(self._bodyFactor(),
+                                              stress=TS['stress']))
+        sBend = self.force(**self._calcStress(self._hookFactorA(),
+                                              stress=TS['stressA']))
+        sTors = self.force(**self._calcStress(self._hookFactorB(),
+                                              stress=TS['stressB']))
+        x = min(sBody['x'], sBend['x'], sTors['x'])
+        return {'cycles': cycles, 'x': x, 'fmax': self._fmax()}
+
+
+class tDesign(eDesign):
+    """Solved torsion spring, see tSpring. The deflexion is given in
+    degrees"""
+    __slots__ = ()
+    _springClass = tSpring
+    _bodyFactor = tSpring._bodyFactor
+
+    def stress(self, **kwargs):
+        return self._calcStress(self._bodyFactor(), **kwargs)
+
+    def stressA(self, **kwargs):
+        raise AttributeError("'tDesign' has no attibute 'stressA'")
+
+    def stressB(self, **kwargs):
+        raise AttributeError("'tDesign' has no attibute 'stressB'")
+
+    def verifyDynamic(self, cycles=1e6):
+        TS = self._dynamicTS(cycles)[0]
+        aux = self.force(**self.stress(stress=TS['stress']))
+        return {'cycles': cycles, 'x': aux['x'], 'fmax': self._fmax()}
+
+
+def freeze(spring):
+    """Create the immutable design of a solved spring"""
+    if not spring.isSolved:
+        raise ValueError("El resorte no ha sido resuelto")
+    if isinstance(spring, tSpring):
+        cls = tDesign
+    elif isinstance(spring, eSpring):
+        cls = eDesign
+    else:
+        cls = Design
+    spring._setTS()
+    values = {}
+    for k in FIELDS:
+        v = getattr(spring, k, 0)
+        values[k] = v if k in ('material', 'ending', 'fixing') else float(v)
+    values['dynTS'] = tuple((c, tuple(sorted(TS.items())), cyk) for (c, TS,
+                            cyk) in ((c,) + spring._dynamicTS(c)
+                                     for c in CYCLES))
+    return cls(**values)
+
+
+def newSpring(springClass, database='wires.db', **options):
+    """Create a spring of the class given. The options are the arguments of
+    the class (material, ending, fixing, L1, L2) and the attributes of the
+    hooks of the extension springs (La, Ra, Rb)"""
+    options = dict(options)
+    hooks = {}
+    for k in HOOKS[eSpring]:
+        if k in options:
+            hooks[k] = options.pop(k)
+    spring = springClass(database=database, **options)
+    for (k, v) in hooks.items():
+        setattr(spring, k, v)
+    return spring
+
+
+def solveDesign(springClass, inputs, time=None, database='wires.db',
+                **options):
+    """Solve a new spring with the inputs given and return its design. The
+    spring is only used inside the call, so it can be run from many threads
+    at the same time"""
+    spring = newSpring(springClass, database, **options)
+    spring.solveParams(time, **inputs)
+    ur = spring.checkUnresolved()
+    if len(ur) > 0:
+        raise ValueError("Variables sin resolver: {}".format(" ".join(ur)))
+    return freeze(spring)
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+"""Standard wire gauges of the table TABLE_TS.
+
+A solved spring usually has a gauge that can't be bought. The functions of
+this module find the nearest standard gauges of the material, solve the
+spring again with each of them, keeping the rest of the geometry, and
+return the options ranked by how close they are to the original
+constant."""
+from design import Design, eDesign, tDesign, freeze
+from solver import solveFast
+from threading import Lock
+import sqlite3 as sq
+import numpy as np
+import os
+
+"""Parameters kept from the original design when the gauge is changed"""
+KEEP = {Design: ('DE', 'Nt', 'Lo'), eDesign: ('DE', 'Nt'),
+        tDesign: ('DE', 'Nt')}
+
+_gauges = {}
+_lock = Lock()
+
+
+class GaugeIndex:
+    """Sorted gauges and tensile strength of each material in TABLE_TS"""
+    def __init__(self, database='wires.db'):
+        if not os.path.isfile(database):
+            raise FileNotFoundError("El archivo de base de dato no se "
+                                    "encuentra disponible")
+        con = sq.connect(database)
+        try:
+            rows = con.execute("SELECT WIRE_MAT, GAUGE, TS FROM TABLE_TS "
+                               "ORDER BY WIRE_MAT, GAUGE").fetchall()
+        finally:
+            con.close()
+        self.gauges = {}
+        self.TS = {}
+        for m in set(r[0] for r in rows):
+            aux = [r for r in rows if r[0] == m]
+            self.gauges[m] = np.array([r[1] for r in aux], dtype=float)
+            self.TS[m] = np.array([r[2] for r in aux], dtype=float)
+
+    def _check(self, material):
+        if material not in self.gauges:
+            raise ValueError("No hay calibres estándar para el material {}".
+                             format(material))
+
+    def nearest(self, material, d, n=2):
+        """Return the indexes of the 'n' standard gauges nearest to 'd'.
+        'd' can be a number or an array, in that case the result has one row
+        for each value"""
+        self._check(material)
+        g = self.gauges[material]
+        d = np.asarray(d, dtype=float)
+        n = min(n, len(g))
+        pos = np.searchsorted(g, d)
+        # the n nearest are always among the n gauges at each side
+        cand = pos[..., None] + np.arange(-n, n)
+        cand = np.clip(cand, 0, len(g) - 1)
+        dist = np.abs(g[cand] - d[..., None])
+        dist = np.where(np.diff(cand, prepend=-1, axis=-1) == 0, np.inf,
+                        dist)
+        order = np.argsort(dist, axis=-1, kind='stable')[..., :n]
+        return np.take_along_axis(cand, order, axis=-1)
+
+    def snap(self, material, d, n=2):
+        """Return the 'n' standard gauges nearest to 'd' and their tensile
+        strength, as a list of tuples"""
+        idx = self.nearest(material, d, n)
+        return [(float(self.gauges[material][i]),
+                 float(self.TS[material][i])) for i in np.ravel(idx)]
+
+
+def gaugeIndex(database='wires.db'):
+    """Return the index of the database, it's loaded only once"""
+    key = os.path.abspath(database)
+    with _lock:
+        if key not in _gauges:
+            _gauges[key] = GaugeIndex(database)
+        return _gauges[key]
+
+
+def _options(design):
+    """Arguments to create again the spring of a design"""
+    options = {'material': design.material}
+    if type(design) is Design:
+        options.update(ending=design.ending, fixing=design.fixing)
+    elif type(design) is eDesign:
+        options['La'] = design.La
+        if design.Ra != design.DM:
+            options['Ra'] = design.Ra
+        if design.Rb != design.DM:
+            options['Rb'] = design.Rb
+    else:
+        options.update(L1=design.L1, L2=design.L2)
+    return options
+
+
+def _rank(design, candidates, F, cycles, keep, database):
+    """Solve the design again with each candidate (gauge, TS) and rank the
+    options"""
+    keep = KEEP[type(design)] if keep is None else keep
+    inputs = dict((k, getattr(design, k)) for k in keep)
+    options = _options(design)
+    result = []
+    for (d, TS) in candidates:
+        option = {'d': d, 'TS': TS}
+        try:
+            snapped = solveFast(design._springClass, {**inputs, 'd': d},
+                                database, **options)
+            snapped = snapped._replace(TS=TS)
+            dyn = snapped.verifyDynamic(cycles=cycles)
+            option.update(dk=abs(snapped.k - design.k) / design.k,
+                          k=snapped.k, w=snapped.w, C=snapped.C,
+                          x=dyn['x'], fmax=dyn['fmax'], design=snapped)
+            if F is not None:
+                option['stress'] = snapped.stress(F=F)['stress']
+        except Exception as ex:
+            option['error'] = "{}: {}".format(type(ex).__name__, ex)
+        result.append(option)
+    result.sort(key=lambda o: (o.get('dk', np.inf), o.get('w', np.inf)))
+    return result
+
+
+def snapDesign(design, n=3, F=None, cycles=1e6, keep=None,
+               database='wires.db'):
+    """Solve the design (or solved spring) again with each of the 'n'
+    nearest standard gauges, keeping the parameters in 'keep', and using the
+    tensile strength of the table for the new gauge. The options are ranked
+    by the relative difference of the constant (dk) and then by weight.
+    Each option is a dictionary with: d, TS, dk, k, w, C, stress (at the
+    force F, if given), x and fmax (from verifyDynamic) and the design, or
+    the error if the spring can't be solved with that gauge."""
+    if not isinstance(design, Design):
+        design = freeze(design)
+    candidates = gaugeIndex(database).snap(design.material, design.d, n)
+    return _rank(design, candidates, F, cycles, keep, database)
+
+
+def snapMany(designs, n=3, F=None, cycles=1e6, keep=None,
+             database='wires.db'):
+    """Snap a list of designs (or solved springs). The nearest gauges are
+    searched at once for all the designs of each material. Return a list
+    with the ranked options of each design, see snapDesign"""
+    designs = [d if isinstance(d, Design) else freeze(d) for d in designs]
+    index = gaugeIndex(database)
+    candidates = [None] * len(designs)
+    for m in set(d.material for d in designs):
+        pos = [i for (i, d) in enumerate(designs) if d.material == m]
+        idx = index.nearest(m, [designs[i].d for i in pos], n)
+        for (i, row) in zip(pos, idx):
+            candidates[i] = [(float(index.gauges[m][j]),
+                              float(index.TS[m][j])) for j in row]
+    return [_rank(d, c, F, cycles, keep, database) for (d, c) in
+            zip(designs, candidates)]
@@ -0,0 +1,332 @@
+#!/usr/bin/env python
+"""Differential harness to compare the accuracy and speed of the different
+ways to solve and evaluate a spring, using the sympy solution of
+Spring.solveParams as reference.
+
+A seeded corpus of valid inputs is generated for every class, ending, fixing
+and material of the database, every backend evaluates it and the relative
+error of each field is reported together with the speedup against the
+reference. Corpus and results are cached in a sqlite file, the results are
+keyed with the source code of the modules used by each backend, so a rerun
+only evaluates the backends that changed."""
+from spring import Spring, eSpring, tSpring, loadMaterials
+from design import PARAMS, eDesign, freeze
+from solver import solveFast
+from collections import OrderedDict
+from time import perf_counter
+import sqlite3 as sq
+import argparse
+import hashlib
+import inspect
+import importlib
+import json
+import math
+import random
+import sys
+
+CLASSES = OrderedDict([('Spring', Spring), ('eSpring', eSpring),
+                       ('tSpring', tSpring)])
+
+"""Sets of inputs that define the system for each class"""
+SIGNATURES = {'Spring': (('d', 'DE', 'Nt', 'Lo'), ('d', 'DI', 'Na', 'p'),
+                         ('d', 'C', 'Nt', 'gap')),
+              'eSpring': (('d', 'DE', 'Lo'), ('d', 'DM', 'Nt')),
+              'tSpring': (('d', 'DE', 'Nt'), ('d', 'C', 'Na'))}
+
+"""Turns not active and additional gauges in the free length for each
+ending, as defined in Spring._setEqs"""
+ENDINGS = {'closed-ground': (2, 2), 'closed': (2, 3), 'open-ground': (1, 0),
+           'open': (0, 1)}
+
+BACKENDS = OrderedDict()
+REFERENCE = 'sympy'
+
+
+def addBackend(name, func, modules=('spring', 'tensile')):
+    """Register a backend. 'func' receives a case and the database and
+    returns a dictionary with the value of every field evaluated, 'modules'
+    are the names of the modules whose source defines the result of the
+    backend."""
+    BACKENDS[name] = {'func': func, 'modules': tuple(modules)}
+
+
+def _validGauges(database, material):
+    """Return the interval of gauges with known tensile strength"""
+    con = sq.connect(database)
+    try:
+        (dMin, dMax) = con.execute("SELECT MIN(VALID_MIN), MAX(VALID_MAX) "
+                                   "FROM EQ_TS WHERE WIRE_MAT = ?",
+                                   (material,)).fetchone()
+    finally:
+        con.close()
+    return (max(dMin, 0.3), min(dMax, 6.0))
+
+
+def generateCorpus(n=2, seed=0, database='wires.db'):
+    """Generate 'n' random cases for every combination of class, ending,
+    fixing and material. The same seed always gives the same corpus."""
+    rnd = random.Random(seed)
+    spring = Spring(database=database)
+    cases = []
+    for (name, cls) in CLASSES.items():
+        endings = spring._endList if cls is Spring else ('open',)
+        fixings = spring._fixList if cls is Spring else ('both-pivot',)
+        for ending in endings:
+            for fixing in fixings:
+                for material in loadMaterials(database).keys():
+                    (dMin, dMax) = _validGauges(database, material)
+                    for i in range(n):
+                        d = math.exp(rnd.uniform(math.log(dMin),
+                                                 math.log(dMax)))
+                        C = rnd.uniform(4.5, 11.5)
+                        Nt = float(rnd.randint(6, 20))
+                        gap = 0 if cls is not Spring else \
+                            rnd.uniform(0.2, 1.5) * d
+                        (inactive, extra) = ENDINGS[ending]
+                        Na = Nt - inactive
+                        values = {'d': d, 'DM': C * d, 'DE': (C + 1) * d,
+                                  'DI': (C - 1) * d, 'C': C, 'Nt': Nt,
+                                  'Na': Na, 'gap': gap, 'p': d + gap,
+                                  'Lo': (d + gap) * Na + extra * d}
+                        sig = rnd.choice(SIGNATURES[name])
+                        case = {'class': name, 'ending': ending,
+                                'fixing': fixing, 'material': material,
+                                'options': {},
+                                'inputs': dict((k, round(values[k], 4))
+                                               for k in sig),
+                                'x': round(rnd.uniform(0.05, 0.9) *
+                                           values['Lo'], 4),
+                                'F': round(rnd.uniform(0.5, 50), 4),
+                                'stress': round(rnd.uniform(0.1, 0.6), 4),
+                                'cycles': rnd.choice((1e5, 1e6, 1e7))}
+                        if cls is tSpring:
+                            case['options'] = {
+                                'L1': round(rnd.uniform(0, 40), 2),
+                                'L2': round(rnd.uniform(0, 40), 2)}
+                            case['x'] = round(rnd.uniform(5, 180), 2)
+                        cases.append(case)
+    return cases
+
+
+def newSpring(case, database='wires.db'):
+    """Create the spring defined in the case, without solving it"""
+    cls = CLASSES[case['class']]
+    if cls is Spring:
+        return cls(ending=case['ending'], fixing=case['fixing'],
+                   material=case['material'], database=database)
+    return cls(material=case['material'], database=database,
+               **case['options'])
+
+
+def evalSpring(spring, case):
+    """Run every evaluation path on a solved spring and return the fields
+    as a flat dictionary of floats"""
+    result = OrderedDict()
+    for k in PARAMS:
+        result['solve.' + k] = getattr(spring, k)
+    paths = OrderedDict([('force_x', lambda: spring.force(x=case['x'])),
+                         ('force_F', lambda: spring.force(F=case['F'])),
+                         ('stress_F', lambda: spring.stress(F=case['F'])),
+                         ('stress_s', lambda: spring.stress(
+                                                 stress=case['stress'])),
+                         ('dynamic', lambda: spring.verifyDynamic(
+                                                 cycles=case['cycles']))])
+    if type(spring) is eSpring or type(spring) is eDesign:
+        paths['stressA'] = lambda: spring.stressA(F=case['F'])
+        paths['stressB'] = lambda: spring.stressB(F=case['F'])
+    for (name, path) in paths.items():
+        for (k, v) in path().items():
+            result[name + '.' + k] = v
+    return OrderedDict((k, float(v)) for (k, v) in result.items())
+
+
+def _sympyBackend(case, database):
+    spring = newSpring(case, database)
+    spring.solveParams(30, **case['inputs'])
+    return evalSpring(spring, case)
+
+
+def _inprocBackend(case, database):
+    spring = newSpring(case, database)
+    spring.solveParams(None, **case['inputs'])
+    return evalSpring(spring, case)
+
+
+def _designBackend(case, database):
+    spring = newSpring(case, database)
+    spring.solveParams(None, **case['inputs'])
+    return evalSpring(freeze(spring), case)
+
+
+def _compiledBackend(case, database):
+    options = dict(case['options'])
+    if case['class'] == 'Spring':
+        options.update(ending=case['ending'], fixing=case['fixing'])
+    return evalSpring(solveFast(CLASSES[case['class']], case['inputs'],
+                                database, material=case['material'],
+                                **options), case)
+
+
+addBackend('sympy', _sympyBackend)
+addBackend('inproc', _inprocBackend)
+addBackend('design', _designBackend, ('spring', 'tensile', 'design'))
+addBackend('compiled', _compiledBackend, ('spring', 'tensile', 'design',
+                                           'solver'))
+
+
+def fingerprint(backend):
+    """Hash of the source of the modules used by the backend"""
+    h = hashlib.sha1(backend.encode())
+    for m in BACKENDS[backend]['modules']:
+        h.update(inspect.getsource(importlib.import_module(m)).encode())
+    return h.hexdigest()
+
+
+def caseKey(case):
+    return hashlib.sha1(json.dumps(case, sort_keys=True).encode()).hexdigest()
+
+
+class Cache:
+    """Cache of corpus and results saved in a sqlite database"""
+    def __init__(self, path='harness.db'):
+        self.con = sq.connect(path)
+        self.con.execute("CREATE TABLE IF NOT EXISTS CORPUS (SEED INTEGER, "
+                         "N INTEGER, DATA TEXT, PRIMARY KEY(SEED, N))")
+        self.con.execute("CREATE TABLE IF NOT EXISTS RESULTS (BACKEND TEXT, "
+                         "FINGERPRINT TEXT, CASE_KEY TEXT, DATA TEXT, "
+                         "TIME REAL, PRIMARY KEY(BACKEND, FINGERPRINT, "
+                         "CASE_KEY))")
+        self.con.commit()
+
+    def corpus(self, n, seed, database):
+        row = self.con.execute("SELECT DATA FROM CORPUS WHERE SEED = ? AND "
+                               "N = ?", (seed, n)).fetchone()
+        if row is not None:
+            return json.loads(row[0])
+        cases = generateCorpus(n, seed, database)
+        self.con.execute("INSERT INTO CORPUS VALUES (?, ?, ?)",
+                         (seed, n, json.dumps(cases)))
+        self.con.commit()
+        return cases
+
+    def get(self, backend, fp, key):
+        row = self.con.execute("SELECT DATA, TIME FROM RESULTS WHERE "
+                               "BACKEND = ? AND FINGERPRINT = ? AND "
+                               "CASE_KEY = ?", (backend, fp, key)).fetchone()
+        return None if row is None else (json.loads(row[0]), row[1])
+
+    def put(self, backend, fp, key, data, time):
+        self.con.execute("INSERT OR REPLACE INTO RESULTS VALUES "
+                         "(?, ?, ?, ?, ?)",
+                         (backend, fp, key, json.dumps(data), time))
+
+    def commit(self):
+        self.con.commit()
+
+    def close(self):
+        self.con.close()
+
+
+def run(backends=None, n=2, seed=0, database='wires.db', cache='harness.db',
+        verbose=True):
+    """Evaluate the corpus with the reference and the backends given (all
+    the registered if None) and return a dictionary with the results of
+    each backend: {'backend': {'time': s, 'errors': [...], 'fields':
+    {field: [relative errors]}}}"""
+    backends = list(BACKENDS.keys()) if backends is None else list(backends)
+    if REFERENCE not in backends:
+        backends.insert(0, REFERENCE)
+    store = Cache(cache)
+    cases = store.corpus(n, seed, database)
+    results = OrderedDict()
+    try:
+        for b in backends:
+            fp = fingerprint(b)
+            func = BACKENDS[b]['func']
+            results[b] = {'data': [], 'time': 0.0, 'new': 0}
+            for case in cases:
+                key = caseKey(case)
+                cached = store.get(b, fp, key)
+                if cached is None:
+                    t = perf_counter()
+                    try:
+                        data = func(case, database)
+                    except Exception as ex:
+                        data = {'error': "{}: {}".format(type(ex).__name__,
+                                                         ex)}
+                    cached = (data, perf_counter() - t)
+                    store.put(b, fp, key, *cached)
+                    results[b]['new'] += 1
+                results[b]['data'].append(cached[0])
+                results[b]['time'] += cached[1]
+            store.commit()
+            if verbose:
+                print("{}: {} casos evaluados, {} en caché".format(
+                      b, results[b]['new'], len(cases) - results[b]['new']))
+    finally:
+        store.close()
+    return compare(results)
+
+
+def compare(results):
+    """Compare the results of each backend with the reference"""
+    ref = results[REFERENCE]
+    report = OrderedDict()
+    for (b, res) in results.items():
+        fields = OrderedDict()
+        errors = []
+        for (i, (r, v)) in enumerate(zip(ref['data'], res['data'])):
+            if 'error' in v or 'error' in r:
+                if v.get('error') != r.get('error'):
+                    errors.append((i, v.get('error', r.get('error'))))
+                continue
+            for (k, rv) in r.items():
+                if k not in v:
+                    continue
+                err = abs(v[k] - rv) / max(abs(rv), 1e-12)
+                fields.setdefault(k, []).append(err)
+        report[b] = {'time': res['time'],
+                     'speedup': ref['time'] / res['time'] if res['time'] > 0
+                     else float('inf'),
+                     'errors': errors, 'fields': fields}
+    return report
+
+
+def printReport(report, tol=1e-9):
+    for (b, res) in report.items():
+        print("*** {} ***  tiempo: {:.3f} s  aceleración: {:.1f}x  fallas: {}"
+              .format(b, res['time'], res['speedup'], len(res['errors'])))
+        if b == REFERENCE:
+            continue
+        for (k, errs) in res['fields'].items():
+            worst = max(errs)
+            print("{0:22}{1:12.3e}{2:12.3e} {3}".format(
+                  k, worst, sum(errs) / len(errs), 'OK' if worst <= tol
+                  else 'DIFERENTE'))
+        for (i, ex) in res['errors'][:10]:
+            print("    caso {}: {}".format(i, ex))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', type=int, default=2,
+                        help='casos por combinación')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--backends', default=None,
+                        help='lista separada por comas')
+    parser.add_argument('--database', default='wires.db')
+    parser.add_argument('--cache', default='harness.db')
+    parser.add_argument('--tol', type=float, default=1e-9)
+    args = parser.parse_args()
+    backends = None if args.backends is None else args.backends.split(',')
+    report = run(backends, args.n, args.seed, args.database, args.cache)
+    printReport(report, args.tol)
+    for (b, res) in report.items():
+        if len(res['errors']) > 0 or any(max(e) > args.tol for e in
+                                          res['fields'].values()):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
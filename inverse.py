@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+"""Inverse design of springs from two load points.
+
+The drawings of the customers usually give two points of the spring: the
+force F1 at the length L1 and the force F2 at the length L2. From them the
+constant and the free length are
+    compression: k = (F2 - F1) / (L1 - L2),   Lo = L1 + F1 / k
+    extension:   k = (F2 - F1) / (L2 - L1),   Lo = L1 - F1 / k
+(the extension springs of this program have no initial tension, and the
+lengths are measured between the inner sides of the hooks).
+
+Then the standard gauges of each material (or a series of gauges in the
+valid range of EQ_TS when the material isn't in TABLE_TS) are combined with
+spring indexes between 4 and 12, and each candidate is solved for the
+constant (and free length) required. The feasible designs are returned
+ranked by weight."""
+from spring import Spring, eSpring, loadMaterials
+from optimize import violation
+from solver import solveFast
+from gauge import gaugeIndex
+from tensile import loadTable
+from multiprocessing import Pool
+import argparse
+import numpy as np
+
+CLASSES = {'compression': Spring, 'extension': eSpring}
+"""Spring indexes tried for each gauge"""
+INDEXES = np.linspace(4, 12, 17)
+POSITIVE = ('Nt', 'Na', 'p', 'Ls', 'k')
+
+
+def loadPoints(springClass, F1, L1, F2, L2):
+    """Constant and free length of the spring that passes through the two
+    load points. Return (k, Lo)"""
+    if F1 == F2 or L1 == L2:
+        raise ValueError("Los puntos de carga deben ser distintos")
+    if springClass is Spring:
+        k = (F2 - F1) / (L1 - L2)
+        Lo = L1 + F1 / k
+    else:
+        k = (F2 - F1) / (L2 - L1)
+        Lo = L1 - F1 / k
+    if k <= 0 or Lo <= 0:
+        raise ValueError("Los puntos de carga no corresponden a un resorte "
+                         "de {}".format("compresión" if springClass is Spring
+                                        else "extensión"))
+    return (k, Lo)
+
+
+def gauges(material, database='wires.db', steps=24):
+    """Gauges tried for the material: the standard ones of TABLE_TS or, when
+    there are few of them, a geometric series in the range of EQ_TS"""
+    index = gaugeIndex(database)
+    if len(index.gauges.get(material, ())) >= steps // 4:
+        return index.gauges[material]
+    rows = loadTable(database).get(material, ())
+    if len(rows) == 0:
+        return np.array([])
+    (dMin, dMax) = (min(r[0] for r in rows), max(r[1] for r in rows))
+    return np.geomspace(dMin, dMax, steps).round(2)
+
+
+def candidates(springClass, k, Lo, materials=None, DE=(None, None),
+               DI=(None, None), database='wires.db'):
+    """List of (material, d, DE) that satisfy the limits of the external and
+    internal diameters"""
+    materials = materials or list(loadMaterials(database).keys())
+    result = []
+    for m in materials:
+        for d in gauges(m, database):
+            DEs = (INDEXES + 1) * d
+            DIs = DEs - 2 * d
+            mask = DIs > 0
+            if DE[0] is not None:
+                mask &= DEs >= DE[0]
+            if DE[1] is not None:
+                mask &= DEs <= DE[1]
+            if DI[0] is not None:
+                mask &= DIs >= DI[0]
+            if DI[1] is not None:
+                mask &= DIs <= DI[1]
+            if springClass is Spring:
+                mask &= d < Lo
+            result.extend((m, float(d), float(x)) for x in DEs[mask])
+    return result
+
+
+def evaluate(problem, candidate):
+    """Solve one candidate and check it. Return a dictionary with the
+    design, or None when it isn't feasible"""
+    (material, d, DE) = candidate
+    springClass = problem['springClass']
+    inputs = {'d': d, 'DE': DE, 'k': problem['k']}
+    if springClass is Spring:
+        inputs['Lo'] = problem['Lo']
+    try:
+        design = solveFast(springClass, inputs, problem['database'],
+                           material=material, **problem['options'])
+        if any(getattr(design, k) <= 0 for k in POSITIVE) or \
+           violation(design, problem['F2']) > 0:
+            return None
+        TS = design._dynamicTS(problem['cycles'])[0]
+        stress = design.stress(F=problem['F2'])
+        if springClass is Spring and stress['F'] < problem['F2']:
+            return None
+        margin = min(TS[i] - stress[i] for i in TS.keys())
+        if margin < 0:
+            return None
+    except Exception:
+        return None
+    result = {'material': material, 'd': d, 'DE': DE, 'Nt': design.Nt,
+              'w': design.w, 'stress': stress['stress'], 'margin': margin,
+              'design': design}
+    if springClass is not Spring:
+        result['hooks'] = problem['Lo'] - design.Lo
+        if result['hooks'] <= 0:
+            return None
+    return result
+
+
+def _evaluate(args):
+    return evaluate(*args)
+
+
+def inverseDesign(springClass, F1, L1, F2, L2, materials=None,
+                  DE=(None, None), DI=(None, None), cycles=1e6,
+                  processes=None, database='wires.db', **options):
+    """Search the designs of the class that pass through the load points
+    (F1, L1) and (F2, L2). 'DE' and 'DI' are tuples (minimum, maximum) of
+    the diameters, any of them can be None. The stress at F2 must be under
+    the fatigue limit for the cycles given. Return the list of feasible
+    designs sorted by weight, each one a dictionary with: material, d, DE,
+    Nt, w, stress (at F2), margin (to the fatigue limit), hooks (length left
+    for the hooks, only extension springs) and the design."""
+    (k, Lo) = loadPoints(springClass, F1, L1, F2, L2)
+    problem = {'springClass': springClass, 'k': k, 'Lo': Lo,
+               'F2': max(F1, F2), 'cycles': cycles, 'database': database,
+               'options': options}
+    tasks = [(problem, c) for c in candidates(springClass, k, Lo, materials,
+                                               DE, DI, database)]
+    if processes == 1:
+        result = [_evaluate(t) for t in tasks]
+    else:
+        with Pool(processes) as pool:
+            result = pool.map(_evaluate, tasks, chunksize=16)
+    result = [r for r in result if r is not None]
+    result.sort(key=lambda r: r['w'])
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('type', choices=sorted(CLASSES.keys()))
+    parser.add_argument('F1', type=float)
+    parser.add_argument('L1', type=float)
+    parser.add_argument('F2', type=float)
+    parser.add_argument('L2', type=float)
+    parser.add_argument('--DE', type=float, nargs=2, default=(None, None),
+                        metavar=('MIN', 'MAX'))
+    parser.add_argument('--DI', type=float, nargs=2, default=(None, None),
+                        metavar=('MIN', 'MAX'))
+    parser.add_argument('--material', nargs='*', default=None)
+    parser.add_argument('--cycles', type=float, default=1e6)
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('-n', type=int, default=20,
+                        help='número de diseños a mostrar')
+    args = parser.parse_args()
+    springClass = CLASSES[args.type]
+    (k, Lo) = loadPoints(springClass, args.F1, args.L1, args.F2, args.L2)
+    print("k = {:.4f} N/mm, Lo = {:.2f} mm".format(k, Lo))
+    result = inverseDesign(springClass, args.F1, args.L1, args.F2, args.L2,
+                           args.material, args.DE, args.DI, args.cycles,
+                           args.processes)
+    print("{0:>6}{1:>8}{2:>8}{3:>8}{4:>10}{5:>8}{6:>8}".format(
+          'Mat', 'd', 'DE', 'Nt', 'w', 'estrés', 'margen'))
+    for r in result[:args.n]:
+        print("{0:>6}{1:8.2f}{2:8.2f}{3:8.2f}{4:10.5f}{5:8.3f}{6:8.3f}".
+              format(r['material'], r['d'], r['DE'], r['Nt'], r['w'],
+                     r['stress'], r['margin']))
+
+
+if __name__ == '__main__':
+    main()
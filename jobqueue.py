@@ -0,0 +1,339 @@
+#!/usr/bin/env python
+"""Durable queue of spring evaluations.
+
+The springs of a sweep are saved as jobs in a SQLite database (jobs.db,
+next to wires.db by default), with the state pending, running, done or
+failed. The workers claim the pending jobs in batches, and the results
+of each batch are saved as soon as it's solved, so when the run is
+stopped (or the machine reboots) only the batches being solved are lost:
+run() puts back to pending the jobs left running by workers that are gone
+(a process of this machine that isn't alive, or a claim older than the
+lease) and continues. A job abandoned MAXATTEMPTS times is marked failed.
+
+Usage:
+    python jobqueue.py add compression d=0.5:2:10 DE=8:20:10 Nt=5:15:10 \\
+        Lo=40 --material A229 --batch nightly
+    python jobqueue.py run --workers 4
+    python jobqueue.py status
+    python jobqueue.py export nightly --out nightly.npz"""
+from design import PARAMS
+from cluster import CLASSES, grid, parseAxis
+from solver import solveFast
+from multiprocessing import Process
+from time import monotonic, sleep, time
+import argparse
+import sqlite3 as sq
+import json
+import sys
+import os
+import numpy as np
+
+STATES = ('pending', 'running', 'done', 'failed')
+"""Seconds after which a running job of other machine is considered lost"""
+LEASE = 3600.0
+MAXATTEMPTS = 3
+
+
+def workerName():
+    """Name of the worker of this process, node:pid"""
+    return "{}:{}".format(os.uname().nodename if hasattr(os, 'uname') else
+                          '', os.getpid())
+
+
+def workerAlive(worker):
+    """True or False when the worker is a process of this machine, None
+    when it can't be known"""
+    (node, sep, pid) = (worker or '').rpartition(':')
+    if sep == '' or not pid.isdigit() or \
+       node != workerName().rpartition(':')[0]:
+        return None
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def jobsPath(database='wires.db'):
+    """Default path of the jobs database, in the folder of the database of
+    wires"""
+    return os.path.join(os.path.dirname(os.path.abspath(database)),
+                        'jobs.db')
+
+
+class JobQueue:
+    """Jobs of a SQLite database; every instance has its own connection,
+    so each process must create its own"""
+    def __init__(self, path=None, database='wires.db'):
+        self.path = path or jobsPath(database)
+        self.database = database
+        self._con = sq.connect(self.path, timeout=60,
+                               isolation_level=None)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.execute("PRAGMA synchronous=NORMAL")
+        self._con.execute("CREATE TABLE IF NOT EXISTS JOBS ("
+                          "ID INTEGER PRIMARY KEY, BATCH TEXT, CLASS TEXT, "
+                          "OPTIONS TEXT, INPUTS TEXT, STATE TEXT, "
+                          "WORKER TEXT, ATTEMPTS INTEGER DEFAULT 0, "
+                          "RESULT TEXT, ERROR TEXT, DONE_AT REAL, "
+                          "CLAIMED_AT REAL)")
+        columns = [r[1] for r in self._con.execute(
+                   "PRAGMA table_info(JOBS)")]
+        if 'CLAIMED_AT' not in columns:
+            self._con.execute("ALTER TABLE JOBS ADD COLUMN CLAIMED_AT REAL")
+        self._con.execute("CREATE INDEX IF NOT EXISTS JOBS_STATE ON "
+                          "JOBS (STATE, ID)")
+
+    def close(self):
+        self._con.close()
+
+    def add(self, kind, inputs, options=None, batch='default'):
+        """Add a job for each dictionary of inputs. Return the number of
+        jobs added"""
+        if kind not in CLASSES:
+            raise ValueError("Tipo de resorte {} no es válido".format(kind))
+        options = json.dumps(options or {}, sort_keys=True)
+        with self._con:
+            self._con.execute("BEGIN IMMEDIATE")
+            self._con.executemany(
+                "INSERT INTO JOBS (BATCH, CLASS, OPTIONS, INPUTS, STATE) "
+                "VALUES (?, ?, ?, ?, 'pending')",
+                ((batch, kind, options, json.dumps(i)) for i in inputs))
+        return len(inputs)
+
+    def claim(self, worker, n=100):
+        """Mark up to 'n' pending jobs as running by the worker and return
+        them as tuples (id, kind, options, inputs)"""
+        with self._con:
+            self._con.execute("BEGIN IMMEDIATE")
+            rows = self._con.execute(
+                "SELECT ID, CLASS, OPTIONS, INPUTS FROM JOBS WHERE STATE = "
+                "'pending' ORDER BY ID LIMIT ?", (n,)).fetchall()
+            now = time()
+            self._con.executemany(
+                "UPDATE JOBS SET STATE = 'running', WORKER = ?, ATTEMPTS = "
+                "ATTEMPTS + 1, CLAIMED_AT = ? WHERE ID = ?",
+                ((worker, now, r[0]) for r in rows))
+        return [(r[0], r[1], json.loads(r[2]), json.loads(r[3]))
+                for r in rows]
+
+    def complete(self, results):
+        """Save the results of a batch, a list of tuples (id, values, error)
+        where values is a list with the parameters of PARAMS or None"""
+        now = time()
+        with self._con:
+            self._con.execute("BEGIN IMMEDIATE")
+            self._con.executemany(
+                "UPDATE JOBS SET STATE = ?, RESULT = ?, ERROR = ?, "
+                "DONE_AT = ? WHERE ID = ?",
+                (('done' if e is None else 'failed',
+                  None if v is None else json.dumps(v), e, now, i)
+                 for (i, v, e) in results))
+
+    def resume(self, lease=LEASE, maxAttempts=MAXATTEMPTS):
+        """Put back to pending the jobs left running by workers that are
+        gone: processes of this machine that aren't alive, or claims older
+        than 'lease' seconds. The jobs claimed 'maxAttempts' times are
+        marked failed. Return the number of jobs (pending, failed)"""
+        limit = time() - lease
+        with self._con:
+            self._con.execute("BEGIN IMMEDIATE")
+            stale = [(i, attempts) for (i, worker, attempts, claimed) in
+                     self._con.execute("SELECT ID, WORKER, ATTEMPTS, "
+                                       "CLAIMED_AT FROM JOBS WHERE STATE = "
+                                       "'running'")
+                     if workerAlive(worker) is False or claimed is None or
+                     claimed < limit]
+            failed = [i for (i, attempts) in stale if attempts >= maxAttempts]
+            pending = [i for (i, attempts) in stale if attempts < maxAttempts]
+            self._con.executemany(
+                "UPDATE JOBS SET STATE = 'pending', WORKER = NULL WHERE ID "
+                "= ?", ((i,) for i in pending))
+            self._con.executemany(
+                "UPDATE JOBS SET STATE = 'failed', ERROR = ?, DONE_AT = ? "
+                "WHERE ID = ?", (("Abandonado después de {} intentos".format(
+                                  maxAttempts), time(), i) for i in failed))
+        return (len(pending), len(failed))
+
+    def retryFailed(self, batch=None):
+        """Put back to pending the failed jobs"""
+        query = "UPDATE JOBS SET STATE = 'pending', ERROR = NULL, " \
+                "ATTEMPTS = 0 WHERE STATE = 'failed'"
+        with self._con:
+            if batch is None:
+                return self._con.execute(query).rowcount
+            return self._con.execute(query + " AND BATCH = ?",
+                                     (batch,)).rowcount
+
+    def progress(self, batch=None):
+        """Number of jobs in each state"""
+        query = "SELECT STATE, COUNT(*) FROM JOBS"
+        args = ()
+        if batch is not None:
+            query += " WHERE BATCH = ?"
+            args = (batch,)
+        result = dict((s, 0) for s in STATES)
+        result.update(self._con.execute(query + " GROUP BY STATE",
+                                        args).fetchall())
+        return result
+
+    def batches(self):
+        return [r[0] for r in self._con.execute(
+                "SELECT DISTINCT BATCH FROM JOBS ORDER BY BATCH")]
+
+    def results(self, batch='default'):
+        """Results of a batch in the order the jobs were added, in the
+        format of spring.solveMany, plus the inputs of each job"""
+        rows = self._con.execute("SELECT INPUTS, RESULT, ERROR, STATE FROM "
+                                 "JOBS WHERE BATCH = ? ORDER BY ID",
+                                 (batch,)).fetchall()
+        values = np.full((len(rows), len(PARAMS)), np.nan)
+        errors = {}
+        for (i, r) in enumerate(rows):
+            if r[1] is not None:
+                values[i] = json.loads(r[1])
+            elif r[3] == 'failed':
+                errors[i] = r[2]
+        return {'names': list(PARAMS), 'values': values, 'errors': errors,
+                'inputs': [json.loads(r[0]) for r in rows]}
+
+
+def solveJob(kind, options, inputs, database='wires.db'):
+    """Solve one job, return (values, error)"""
+    try:
+        design = solveFast(CLASSES[kind], inputs, database, **options)
+    except Exception as ex:
+        return (None, "{}: {}".format(type(ex).__name__, ex))
+    return ([getattr(design, k) for k in PARAMS], None)
+
+
+def work(path, database='wires.db', batchSize=100):
+    """Worker: claim and solve batches until there are no pending jobs"""
+    jobs = JobQueue(path, database)
+    name = workerName()
+    try:
+        while True:
+            batch = jobs.claim(name, batchSize)
+            if len(batch) == 0:
+                break
+            jobs.complete([(i,) + solveJob(kind, options, inputs, database)
+                           for (i, kind, options, inputs) in batch])
+    finally:
+        jobs.close()
+
+
+def _eta(seconds):
+    if seconds == float('inf'):
+        return '--:--:--'
+    seconds = int(seconds)
+    return "{:02d}:{:02d}:{:02d}".format(seconds // 3600, seconds // 60 % 60,
+                                         seconds % 60)
+
+
+def run(path=None, workers=None, batchSize=100, interval=2.0,
+        database='wires.db', out=sys.stdout):
+    """Solve the pending jobs with 'workers' processes, showing the progress
+    and throughput every 'interval' seconds. The jobs left running by a
+    previous run that are gone are solved again, see resume"""
+    jobs = JobQueue(path, database)
+    try:
+        (n, failed) = jobs.resume()
+        if n > 0:
+            print("{} trabajos interrumpidos vuelven a pendientes".format(n),
+                  file=out)
+        if failed > 0:
+            print("{} trabajos abandonados demasiadas veces fallaron".format(
+                  failed), file=out)
+        procs = [Process(target=work, args=(jobs.path, database, batchSize))
+                 for i in range(workers or os.cpu_count() or 1)]
+        for p in procs:
+            p.start()
+        start = monotonic()
+        first = last = jobs.progress()
+        lastTime = start
+        while any(p.is_alive() for p in procs):
+            sleep(interval)
+            now = monotonic()
+            state = jobs.progress()
+            solved = state['done'] + state['failed']
+            rate = (solved - last['done'] - last['failed']) / \
+                (now - lastTime)
+            total = sum(state.values())
+            print("\r{}/{} resueltos ({:.1%}), {} fallidos, {:.1f} resortes/s, "
+                  "faltan {}".format(solved, total, solved / max(total, 1),
+                                     state['failed'], rate,
+                                     _eta((total - solved) / rate if rate > 0
+                                          else float('inf'))),
+                  end='', file=out, flush=True)
+            (last, lastTime) = (state, now)
+        for p in procs:
+            p.join()
+        state = jobs.progress()
+        solved = state['done'] + state['failed'] - first['done'] - \
+            first['failed']
+        print("\n{} resortes en {:.1f} s ({:.1f} resortes/s)".format(
+              solved, monotonic() - start,
+              solved / max(monotonic() - start, 1e-9)), file=out)
+        return state
+    finally:
+        jobs.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--jobs', default=None, help='base de datos de '
+                        'trabajos')
+    parser.add_argument('--database', default='wires.db')
+    sub = parser.add_subparsers(dest='mode', required=True)
+    a = sub.add_parser('add')
+    a.add_argument('type', choices=sorted(CLASSES.keys()))
+    a.add_argument('axes', nargs='+', help='nombre=inicio:fin:pasos')
+    a.add_argument('--batch', default='default')
+    a.add_argument('--material', default='A229')
+    a.add_argument('--ending', default=None)
+    a.add_argument('--fixing', default=None)
+    r = sub.add_parser('run')
+    r.add_argument('--workers', type=int, default=None)
+    r.add_argument('--size', type=int, default=100)
+    sub.add_parser('status')
+    sub.add_parser('retry').add_argument('batch', nargs='?', default=None)
+    e = sub.add_parser('export')
+    e.add_argument('batch')
+    e.add_argument('--out', default=None)
+    args = parser.parse_args()
+    if args.mode == 'run':
+        run(args.jobs, args.workers, args.size, database=args.database)
+        return
+    jobs = JobQueue(args.jobs, args.database)
+    try:
+        if args.mode == 'add':
+            (names, rows) = grid(**dict(parseAxis(x) for x in args.axes))
+            options = dict((k, getattr(args, k)) for k in
+                           ('material', 'ending', 'fixing')
+                           if getattr(args, k) is not None)
+            n = jobs.add(args.type, [dict(zip(names, r)) for r in rows],
+                         options, args.batch)
+            print("{} trabajos agregados a {}".format(n, args.batch))
+        elif args.mode == 'status':
+            for b in jobs.batches():
+                print("{:20}".format(b), "  ".join(
+                      "{}: {}".format(k, v) for (k, v) in
+                      jobs.progress(b).items()))
+        elif args.mode == 'retry':
+            print("{} trabajos vuelven a pendientes".format(
+                  jobs.retryFailed(args.batch)))
+        elif args.mode == 'export':
+            result = jobs.results(args.batch)
+            out = args.out or args.batch + '.npz'
+            np.savez(out, names=result['names'], values=result['values'],
+                     inputs=json.dumps(result['inputs']))
+            print("{} resortes, {} errores -> {}".format(
+                  len(result['inputs']), len(result['errors']), out))
+    finally:
+        jobs.close()
+
+
+if __name__ == '__main__':
+    main()
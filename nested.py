@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+"""Sets of concentric (nested) compression springs.
+
+For heavy loads two or three compression springs are mounted one inside
+the other: the external diameter of each inner spring must clear the
+internal diameter of the spring around it, and the constants add. The
+designer searches a catalog of solved designs for the pairs and triples
+with the combined constant required whose solid length doesn't exceed the
+solid height given.
+
+The catalog is sorted by DE, so the springs that fit inside another one
+are a prefix of it found by bisection, and only the constants of that
+prefix are compared. The outer springs are distributed in a pool of
+processes."""
+from spring import Spring
+from solver import solveFast
+from optimize import violation
+from inverse import gauges
+from multiprocessing import Pool
+from bisect import bisect_right
+import argparse
+import heapq
+import numpy as np
+
+"""Spring indexes and total turns of the generated catalog"""
+INDEXES = np.linspace(4, 12, 9)
+TURNS = np.arange(4, 21, 2)
+
+_catalog = None
+
+
+def _solve(args):
+    (material, d, DE, Nt, Lo, options, database) = args
+    try:
+        design = solveFast(Spring, {'d': d, 'DE': DE, 'Nt': Nt, 'Lo': Lo},
+                           database, material=material, **options)
+    except Exception:
+        return None
+    if design.k <= 0 or design.p <= design.d or design.Ls >= design.Lo or \
+       violation(design, 0) > 0:
+        return None
+    return design
+
+
+def buildCatalog(Lo, materials=('A229',), processes=None,
+                 database='wires.db', **options):
+    """Solve the compression springs of free length Lo for the gauges of
+    each material and the spring indexes and turns of INDEXES and TURNS.
+    Return the list of designs that can be solved"""
+    tasks = [(m, float(d), float((C + 1) * d), float(Nt), Lo, options,
+              database) for m in materials for d in gauges(m, database)
+             for C in INDEXES for Nt in TURNS if d < Lo]
+    if processes == 1:
+        result = [_solve(t) for t in tasks]
+    else:
+        with Pool(processes) as pool:
+            result = pool.map(_solve, tasks, chunksize=32)
+    return [r for r in result if r is not None]
+
+
+class Catalog:
+    """Designs sorted by external diameter, with arrays of the parameters
+    used by the search"""
+    def __init__(self, designs):
+        self.designs = sorted(designs, key=lambda d: d.DE)
+        self.DE = [d.DE for d in self.designs]
+        self.DI = np.array([d.DI for d in self.designs])
+        self.k = np.array([d.k for d in self.designs])
+        self.Ls = np.array([d.Ls for d in self.designs])
+        self.w = np.array([d.w for d in self.designs])
+
+    def inside(self, DI, clearance):
+        """Number of designs (a prefix of the catalog) that fit inside the
+        diameter DI"""
+        return bisect_right(self.DE, DI - clearance)
+
+
+def _init(designs):
+    global _catalog
+    _catalog = Catalog(designs)
+
+
+def _search(args):
+    """Sets with the outer spring 'i' of the catalog"""
+    (i, k, tol, Hs, clearance, triples) = args
+    cat = _catalog
+    if cat.Ls[i] > Hs or cat.k[i] >= k * (1 + tol):
+        return []
+    result = []
+    (kMin, kMax) = (k * (1 - tol), k * (1 + tol))
+    n = cat.inside(cat.DI[i], clearance)
+    j = np.arange(n)
+    j = j[cat.Ls[j] <= Hs]
+    kSet = cat.k[i] + cat.k[j]
+    for m in j[(kSet >= kMin) & (kSet <= kMax)]:
+        result.append((i, int(m)))
+    if triples:
+        for m in j[kSet < kMax]:
+            q = np.arange(cat.inside(cat.DI[m], clearance))
+            q = q[cat.Ls[q] <= Hs]
+            kSet = cat.k[i] + cat.k[m] + cat.k[q]
+            for r in q[(kSet >= kMin) & (kSet <= kMax)]:
+                result.append((i, int(m), int(r)))
+    return result
+
+
+def nestedSets(designs, k, Hs, tol=0.05, clearance=0.5, triples=True,
+               limit=1000, processes=None):
+    """Search the sets of the designs (see buildCatalog) with combined
+    constant k (relative tolerance 'tol') and solid length not greater than
+    Hs. Each spring must have a radial clearance of 'clearance' / 2 with the
+    spring around it. Return the best 'limit' sets, as dictionaries with
+    the springs of the set (outer first), k, error (relative) and w, sorted
+    by error and then by weight."""
+    cat = Catalog(designs)
+    tasks = [(i, k, tol, Hs, clearance, triples) for i in
+             range(len(cat.designs))]
+    if processes == 1:
+        _init(cat.designs)
+        found = [_search(t) for t in tasks]
+    else:
+        with Pool(processes, initializer=_init,
+                  initargs=(cat.designs,)) as pool:
+            found = pool.map(_search, tasks, chunksize=8)
+
+    def key(s):
+        return (round(abs(sum(cat.k[i] for i in s) - k) / k, 3),
+                sum(cat.w[i] for i in s))
+    result = []
+    for s in heapq.nsmallest(limit, (s for sets in found for s in sets),
+                             key=key):
+        kSet = float(sum(cat.k[i] for i in s))
+        result.append({'springs': [cat.designs[i] for i in s], 'k': kSet,
+                       'error': abs(kSet - k) / k,
+                       'w': float(sum(cat.w[i] for i in s))})
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('k', type=float, help='constante combinada')
+    parser.add_argument('Lo', type=float, help='longitud libre')
+    parser.add_argument('Hs', type=float, help='altura sólida máxima')
+    parser.add_argument('--tol', type=float, default=0.05)
+    parser.add_argument('--clearance', type=float, default=0.5)
+    parser.add_argument('--material', nargs='*', default=['A229'])
+    parser.add_argument('--pairs', action='store_true',
+                        help='buscar solo pares')
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('-n', type=int, default=20,
+                        help='número de juegos a mostrar')
+    args = parser.parse_args()
+    designs = buildCatalog(args.Lo, args.material, args.processes)
+    result = nestedSets(designs, args.k, args.Hs, args.tol, args.clearance,
+                        not args.pairs, args.n, args.processes)
+    print("{} resortes en el catálogo".format(len(designs)))
+    for r in result:
+        print("k = {:.3f} ({:.1%}), w = {:.5f}".format(r['k'], r['error'],
+                                                        r['w']))
+        for s in r['springs']:
+            print("    {0:>6} d={1:.2f} DE={2:.2f} DI={3:.2f} Nt={4:.1f} "
+                  "k={5:.3f} Ls={6:.2f}".format(s.material, s.d, s.DE, s.DI,
+                                                 s.Nt, s.k, s.Ls))
+
+
+if __name__ == '__main__':
+    main()
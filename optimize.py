@@ -0,0 +1,314 @@
+#!/usr/bin/env python
+"""Multi-objective optimization of spring designs.
+
+The optimizer searches the gauge d, the external diameter DE, the total
+turns Nt and (for compression springs) the free length Lo, together with the
+material, to find the designs that can't be improved in one objective
+without losing in another (Pareto front). The objectives are:
+     - w : weight of the spring (minimize)
+     - x : maximum deflexion for the cycles given, see verifyDynamic
+           (maximize)
+     - margin : difference between the fatigue limit and the stress at the
+                working force F, the minimum of body and hooks (maximize)
+The designs must satisfy the spring index limits of verifyC, the buckling
+limit of verifyBuckling, not reach the solid length at the working force,
+and fit in the bore / over the rod when they are given.
+
+It's a genetic algorithm (NSGA-II): each generation is evaluated in
+parallel by a pool of processes, and the state can be saved in a
+checkpoint file after each generation to resume long runs."""
+from spring import Spring, eSpring, tSpring, loadMaterials
+from design import Design
+from solver import solveFast
+from checks import bucklingLength
+from multiprocessing import Pool
+import argparse
+import pickle
+import random
+import math
+import os
+
+BOUNDS = {'d': (0.3, 6.0), 'DE': (3.0, 60.0), 'Nt': (3.0, 30.0),
+          'Lo': (5.0, 150.0)}
+CLASSES = {'compression': Spring, 'extension': eSpring, 'torsion': tSpring}
+
+
+def violation(design, F, bore=None, rod=None):
+    """Sum of the relative violations of the constraints, 0 when the design
+    is feasible"""
+    v = max(0, 4 - design.C) / 4 + max(0, design.C - 12) / 12
+    if type(design) is Design:
+        LoMax = bucklingLength(design.DM, design.fixing)
+        v += max(0, design.Lo - LoMax) / LoMax
+        v += max(0, design.Ls - (design.Lo - F / design.k)) / design.Lo
+    if bore is not None:
+        v += max(0, design.DE - bore) / bore
+    if rod is not None:
+        v += max(0, rod - design.DI) / rod
+    return v
+
+
+def evaluate(problem, genes):
+    """Solve and evaluate one individual. Return (objectives, violation,
+    design); the designs that can't be solved have an infinite violation"""
+    (x, material) = genes
+    inputs = dict(zip(problem['names'], x))
+    try:
+        design = solveFast(problem['springClass'], inputs,
+                           problem['database'], material=material,
+                           **problem['options'])
+        TS = design._dynamicTS(problem['cycles'])[0]
+        stress = design.stress(F=problem['F'])
+        margin = min(TS[k] - stress[k] for k in TS.keys())
+        xDyn = abs(design.verifyDynamic(cycles=problem['cycles'])['x'])
+        v = violation(design, problem['F'], problem['bore'], problem['rod'])
+    except Exception:
+        return (None, math.inf, None)
+    return ((design.w, -xDyn, -margin), v, design)
+
+
+def _evaluate(args):
+    return evaluate(*args)
+
+
+def dominates(a, b):
+    """Constrained domination between two evaluated individuals (obj, v)"""
+    if a[1] < b[1]:
+        return True
+    if a[1] > b[1] or a[1] > 0:
+        return False
+    return all(i <= j for (i, j) in zip(a[0], b[0])) and \
+        any(i < j for (i, j) in zip(a[0], b[0]))
+
+
+def sortFronts(evals):
+    """Fast non-dominated sort, return the list of fronts (indexes)"""
+    n = len(evals)
+    dominated = [[] for i in range(n)]
+    count = [0] * n
+    fronts = [[]]
+    for i in range(n):
+        for j in range(i + 1, n):
+            if dominates(evals[i], evals[j]):
+                dominated[i].append(j)
+                count[j] += 1
+            elif dominates(evals[j], evals[i]):
+                dominated[j].append(i)
+                count[i] += 1
+        if count[i] == 0:
+            fronts[0].append(i)
+    k = 0
+    while len(fronts[k]) > 0:
+        nxt = []
+        for i in fronts[k]:
+            for j in dominated[i]:
+                count[j] -= 1
+                if count[j] == 0:
+                    nxt.append(j)
+        fronts.append(nxt)
+        k += 1
+    return fronts[:-1]
+
+
+def crowding(evals, front):
+    """Crowding distance of the individuals of a front"""
+    dist = dict((i, 0.0) for i in front)
+    if any(evals[i][0] is None for i in front):
+        return dict((i, -evals[i][1]) for i in front)
+    for m in range(len(evals[front[0]][0])):
+        aux = sorted(front, key=lambda i: evals[i][0][m])
+        (lo, hi) = (evals[aux[0]][0][m], evals[aux[-1]][0][m])
+        dist[aux[0]] = dist[aux[-1]] = math.inf
+        if hi == lo:
+            continue
+        for j in range(1, len(aux) - 1):
+            dist[aux[j]] += (evals[aux[j+1]][0][m] -
+                             evals[aux[j-1]][0][m]) / (hi - lo)
+    return dist
+
+
+class Optimizer:
+    """Search the Pareto front of the designs of a class of spring that work
+    with the force F. 'bounds' can change the default limits of d, DE, Nt
+    and Lo; 'materials' is the list of materials allowed (all by default);
+    'bore' is the maximum DE and 'rod' the minimum DI. The rest of the
+    options are given to the spring (ending, fixing, L1, L2, La...)."""
+    def __init__(self, springClass=Spring, F=10.0, cycles=1e6, bounds=None,
+                 materials=None, bore=None, rod=None, popSize=40, seed=0,
+                 processes=None, database='wires.db', **options):
+        names = ['d', 'DE', 'Nt'] + (['Lo'] if springClass is Spring else [])
+        self.bounds = [(bounds or {}).get(k, BOUNDS[k]) for k in names]
+        self.materials = list(materials or loadMaterials(database).keys())
+        self.problem = {'springClass': springClass, 'names': names,
+                        'F': float(F), 'cycles': cycles, 'bore': bore,
+                        'rod': rod, 'database': database, 'options': options}
+        self.popSize = popSize
+        self.processes = processes
+        self.rnd = random.Random(seed)
+        self.generation = 0
+        self.population = []
+        self.evals = []
+
+    def _random(self):
+        return ([self.rnd.uniform(lo, hi) for (lo, hi) in self.bounds],
+                self.rnd.choice(self.materials))
+
+    def _child(self, a, b, eta=15, pm=None):
+        """Simulated binary crossover and polynomial mutation"""
+        pm = pm or 1 / len(self.bounds)
+        x = []
+        for (i, (lo, hi)) in enumerate(self.bounds):
+            (p, q) = (a[0][i], b[0][i])
+            u = self.rnd.random()
+            beta = (2*u)**(1/(eta + 1)) if u <= 0.5 else \
+                (1 / (2*(1 - u)))**(1/(eta + 1))
+            c = 0.5 * ((1 + beta) * p + (1 - beta) * q)
+            if self.rnd.random() < pm:
+                u = self.rnd.random()
+                delta = (2*u)**(1/(eta + 1)) - 1 if u < 0.5 else \
+                    1 - (2*(1 - u))**(1/(eta + 1))
+                c += delta * (hi - lo)
+            x.append(min(max(c, lo), hi))
+        material = (a if self.rnd.random() < 0.5 else b)[1]
+        if self.rnd.random() < 0.1:
+            material = self.rnd.choice(self.materials)
+        return (x, material)
+
+    def _select(self, rank, dist):
+        """Binary tournament by rank and crowding distance"""
+        (i, j) = (self.rnd.randrange(len(self.population)),
+                  self.rnd.randrange(len(self.population)))
+        if (rank[i], -dist[i]) <= (rank[j], -dist[j]):
+            return self.population[i]
+        return self.population[j]
+
+    def _evaluate(self, population, pool):
+        tasks = [(self.problem, g) for g in population]
+        if pool is None:
+            return [_evaluate(t) for t in tasks]
+        return pool.map(_evaluate, tasks,
+                        chunksize=max(1, len(tasks) // (4 * (self.processes or
+                                                             os.cpu_count() or
+                                                             1))))
+
+    def _survivors(self, population, evals):
+        """Keep the best popSize individuals by front and crowding"""
+        keep = []
+        for front in sortFronts([e[:2] for e in evals]):
+            if len(keep) + len(front) <= self.popSize:
+                keep.extend(front)
+            else:
+                dist = crowding([e[:2] for e in evals], front)
+                front.sort(key=lambda i: -dist[i])
+                keep.extend(front[:self.popSize - len(keep)])
+                break
+        return ([population[i] for i in keep], [evals[i] for i in keep])
+
+    def save(self, path):
+        """Save the state of the search, the file is replaced atomically"""
+        state = {'generation': self.generation, 'population':
+                 self.population, 'evals': self.evals, 'random':
+                 self.rnd.getstate(), 'problem': self.problem,
+                 'bounds': self.bounds, 'materials': self.materials,
+                 'popSize': self.popSize}
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump(state, f)
+        os.replace(path + '.tmp', path)
+
+    def load(self, path):
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+        self.generation = state['generation']
+        self.population = state['population']
+        self.evals = state['evals']
+        self.rnd.setstate(state['random'])
+        self.problem = state['problem']
+        self.bounds = state['bounds']
+        self.materials = state['materials']
+        self.popSize = state['popSize']
+
+    def run(self, generations=50, checkpoint=None, verbose=False):
+        """Run the search until 'generations' generations are done. If a
+        checkpoint file is given and exists, the search continues from it,
+        and it's saved after each generation. Return the Pareto front."""
+        if checkpoint is not None and os.path.isfile(checkpoint):
+            self.load(checkpoint)
+        pool = None if self.processes == 1 else Pool(self.processes)
+        try:
+            if len(self.population) == 0:
+                self.population = [self._random() for i in
+                                   range(self.popSize)]
+                self.evals = self._evaluate(self.population, pool)
+            while self.generation < generations:
+                fronts = sortFronts([e[:2] for e in self.evals])
+                rank = {}
+                dist = {}
+                for (r, front) in enumerate(fronts):
+                    dist.update(crowding([e[:2] for e in self.evals], front))
+                    for i in front:
+                        rank[i] = r
+                children = [self._child(self._select(rank, dist),
+                                        self._select(rank, dist))
+                            for i in range(self.popSize)]
+                evals = self._evaluate(children, pool)
+                (self.population, self.evals) = self._survivors(
+                    self.population + children, self.evals + evals)
+                self.generation += 1
+                if checkpoint is not None:
+                    self.save(checkpoint)
+                if verbose:
+                    print("Generación {}: {} diseños en el frente".format(
+                          self.generation, len(self.front())))
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        return self.front()
+
+    def front(self):
+        """Feasible designs of the first front, sorted by weight"""
+        result = []
+        fronts = sortFronts([e[:2] for e in self.evals])
+        for i in (fronts[0] if len(fronts) > 0 else []):
+            (obj, v, design) = self.evals[i]
+            if obj is None or v > 0:
+                continue
+            result.append({'inputs': dict(zip(self.problem['names'],
+                                              self.population[i][0])),
+                           'material': self.population[i][1],
+                           'w': obj[0], 'x': -obj[1], 'margin': -obj[2],
+                           'design': design})
+        result.sort(key=lambda r: r['w'])
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('type', choices=sorted(CLASSES.keys()))
+    parser.add_argument('-F', type=float, required=True,
+                        help='fuerza de trabajo')
+    parser.add_argument('--cycles', type=float, default=1e6)
+    parser.add_argument('--bore', type=float, default=None)
+    parser.add_argument('--rod', type=float, default=None)
+    parser.add_argument('--pop', type=int, default=40)
+    parser.add_argument('--generations', type=int, default=50)
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--checkpoint', default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    opt = Optimizer(CLASSES[args.type], args.F, args.cycles, bore=args.bore,
+                    rod=args.rod, popSize=args.pop, seed=args.seed,
+                    processes=args.processes)
+    front = opt.run(args.generations, args.checkpoint, verbose=True)
+    print("{0:>8}{1:>8}{2:>8}{3:>8}{4:>6}{5:>10}{6:>10}{7:>8}".format(
+          'd', 'DE', 'Nt', 'Lo', 'Mat', 'w', 'x', 'margen'))
+    for r in front:
+        print("{0:8.3f}{1:8.2f}{2:8.2f}{3:8.2f}{4:>6}{5:10.5f}{6:10.2f}"
+              "{7:8.3f}".format(r['design'].d, r['design'].DE,
+                                r['design'].Nt, r['design'].Lo,
+                                r['material'], r['w'], r['x'],
+                                r['margin']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""Check of the natural frequency of springs against vibration spectra.
+
+verifyDynamic reduces the natural frequency fn to one maximum working
+frequency, fn / 13 (fix-parallel and both-pivot) or fn / 26 (fix-pivot and
+hinged-free): the harmonics of the excitation up to that order must not
+reach fn. Here the same rule is applied to every bin of a measured
+spectrum, for many springs at once. For each spring and bin:
+    margin    = fn / (ratio * f) - 1, negative when the bin is above the
+                maximum working frequency
+    order     = harmonic of f nearest to fn, between 1 and ratio
+    clearance = |order * f - fn| / fn, relative distance between fn and
+                that harmonic
+A bin violates the rule when its amplitude reaches the threshold and the
+clearance is lower than the one required. Consecutive violating bins are
+grouped in bands. The frequencies are in Hz, like fn."""
+from collections import namedtuple
+from math import sqrt
+import numpy as np
+
+RATIO = {'fix-parallel': 13, 'both-pivot': 13, 'fix-pivot': 26,
+         'hinged-free': 26}
+
+Band = namedtuple('Band', ('fLow', 'fHigh', 'order', 'clearance'))
+
+
+def naturalFrequency(d, DM, Na, G, rho):
+    """Natural frequency of the springs, the relation of fn in _setEqs. The
+    arguments can be numbers or arrays"""
+    d = np.asarray(d, dtype=float)
+    DM = np.asarray(DM, dtype=float)
+    return d * np.sqrt(G) / (sqrt(2) * np.sqrt(rho) * DM**2 *
+                             np.asarray(Na, dtype=float))
+
+
+def ratios(fixing):
+    """Harmonic order limit (13 or 26) of each type of fixing"""
+    try:
+        return np.array([RATIO[f] for f in np.atleast_1d(fixing)])
+    except KeyError as ex:
+        raise ValueError("Tipo de fijación {} no es válido".format(ex))
+
+
+def _bands(freq, mask, order, clearance):
+    """Group the consecutive True bins of 'mask' (one spring) in bands"""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    result = []
+    for (i, j) in zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)):
+        w = i + np.argmin(clearance[i:j])
+        result.append(Band(float(freq[i]), float(freq[j - 1]),
+                           int(order[w]), float(clearance[w])))
+    return result
+
+
+def analyze(fn, ratio, freq, amplitude=None, threshold=0.0, required=0.1,
+            chunk=1024):
+    """Margins of the springs of natural frequencies 'fn' (array of S
+    values, with their harmonic ratio, see ratios) for the spectrum bins
+    'freq' (array of B frequencies, with their 'amplitude', all the bins
+    are considered if it's None). Return a dictionary with the arrays
+    margin, order and clearance (S x B), violation (S x B, boolean),
+    minClearance (S, over the bins that reach the threshold) and bands (a
+    list of S lists of Band). The springs are processed in groups of
+    'chunk' to limit the memory used."""
+    fn = np.atleast_1d(np.asarray(fn, dtype=float))
+    ratio = np.broadcast_to(np.asarray(ratio, dtype=float), fn.shape)
+    freq = np.atleast_1d(np.asarray(freq, dtype=float))
+    if np.any(freq <= 0):
+        raise ValueError("Las frecuencias deben ser positivas")
+    active = np.ones(freq.shape, dtype=bool) if amplitude is None else \
+        np.asarray(amplitude, dtype=float) >= threshold
+    shape = (len(fn), len(freq))
+    result = {'margin': np.empty(shape), 'order': np.empty(shape, dtype=int),
+              'clearance': np.empty(shape),
+              'violation': np.empty(shape, dtype=bool)}
+    for s in range(0, len(fn), chunk):
+        f = fn[s:s + chunk, None]
+        r = ratio[s:s + chunk, None]
+        result['margin'][s:s + chunk] = f / (r * freq) - 1
+        order = np.clip(np.rint(f / freq), 1, r)
+        clearance = np.abs(order * freq - f) / f
+        result['order'][s:s + chunk] = order
+        result['clearance'][s:s + chunk] = clearance
+        result['violation'][s:s + chunk] = active & (clearance < required)
+    result['minClearance'] = np.where(active, result['clearance'],
+                                      np.inf).min(axis=1)
+    result['bands'] = [_bands(freq, result['violation'][i],
+                              result['order'][i], result['clearance'][i])
+                       for i in range(len(fn))]
+    return result
+
+
+def checkSprings(springs, freq, amplitude=None, threshold=0.0, required=0.1):
+    """Analyze a list of solved springs or designs (see analyze)"""
+    fn = [float(s.fn) for s in springs]
+    return analyze(fn, ratios([s.fixing for s in springs]), freq, amplitude,
+                   threshold, required)
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+"""Limits of the static stress of the springs.
+
+The stress (fraction of the tensile strength) of a spring at its working
+force is classified as:
+    OK   (0) : below the limits
+    SET  (1) : over the set removal limit, the spring requires 'set
+               removal'
+    OVER (2) : over the maximum limit, the stress is too high for the force
+The limits depend on the type of spring, the material and the stress
+(body 'stress', and the hooks 'stressA' and 'stressB' of the extension
+springs). They are the rows of RULES; the first row of the type and stress
+whose material is the one of the spring, or None (any material), is used.
+The values can be numbers or arrays."""
+from spring import Spring, eSpring, tSpring
+import numpy as np
+
+OK = 0
+SET = 1
+OVER = 2
+MESSAGES = {OK: '', SET: "El resorte requiere 'set removal'",
+            OVER: "El stress es demasiado para la fuerza requerida"}
+KINDS = {Spring: 'compression', eSpring: 'extension', tSpring: 'torsion'}
+
+"""(type, material, stress, set removal limit, maximum limit); None as
+limit means that the limit isn't checked"""
+RULES = (
+    ('compression', None, 'stress', 0.4, 0.6),
+    ('torsion', 'A227', 'stress', None, 0.8),
+    ('torsion', 'T302', 'stress', None, 0.6),
+    ('torsion', None, 'stress', None, 0.85),
+    ('extension', 'T302', 'stress', None, 0.35),
+    ('extension', 'T302', 'stressA', None, 0.55),
+    ('extension', 'T302', 'stressB', None, 0.30),
+    ('extension', None, 'stress', None, 0.45),
+    ('extension', None, 'stressA', None, 0.75),
+    ('extension', None, 'stressB', None, 0.40),
+)
+
+
+def kindOf(spring):
+    """Type of spring of a spring, design or class"""
+    cls = spring if isinstance(spring, type) else \
+        getattr(spring, '_springClass', type(spring))
+    for (k, v) in KINDS.items():
+        if cls is k:
+            return v
+    raise ValueError("Tipo de resorte {} no es válido".format(cls.__name__))
+
+
+def limits(kind, material):
+    """Limits of each stress of the type and material, as a dictionary of
+    tuples (set removal, maximum)"""
+    result = {}
+    for (k, m, key, setLimit, overLimit) in RULES:
+        if k == kind and (m is None or m == material) and key not in result:
+            result[key] = (setLimit, overLimit)
+    if len(result) == 0:
+        raise ValueError("Tipo de resorte {} no es válido".format(kind))
+    return result
+
+
+def classify(kind, material, key, stress):
+    """Classify the stress (number or array) of the type 'key'. Return OK,
+    SET or OVER, or an array of them"""
+    (setLimit, overLimit) = limits(kind, material)[key]
+    stress = np.asarray(stress, dtype=float)
+    result = np.zeros(stress.shape, dtype=np.int8)
+    if setLimit is not None:
+        result[stress > setLimit] = SET
+    if overLimit is not None:
+        result[stress > overLimit] = OVER
+    return int(result) if result.ndim == 0 else result
+
+
+def classifyAll(kind, material, stresses):
+    """Classify a dictionary of stresses, like the result of the method
+    stress (the keys without rules are ignored). Return the dictionary of
+    classes of each stress and the worst of them"""
+    rules = limits(kind, material)
+    result = dict((k, classify(kind, material, k, v)) for (k, v) in
+                  stresses.items() if k in rules)
+    worst = np.maximum.reduce([np.asarray(v) for v in result.values()])
+    return (result, int(worst) if np.ndim(worst) == 0 else worst)
+
+
+def classifySpring(spring, F):
+    """Classify the stresses of a solved spring or design at the force F (a
+    number)"""
+    return classifyAll(kindOf(spring), spring.material, spring.stress(F=F))
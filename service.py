@@ -0,0 +1,322 @@
+#!/usr/bin/env python
+"""Local HTTP/JSON service to solve and evaluate springs.
+
+Every endpoint receives by POST a JSON object that defines the spring:
+    {"type": "compression" | "extension" | "torsion",
+     "material": "A229", "ending": "closed-ground", "fixing": "fix-parallel",
+     "L1": 0, "L2": 0, "La": 0, "Ra": 0, "Rb": 0,
+     "inputs": {"d": 1, "DE": 10, "Nt": 8, "Lo": 20}}
+Only type and inputs are required. The endpoints are:
+    /solve    -> solved parameters
+    /force    -> {"x": ...} or {"F": ...} like Spring.force
+    /stress   -> {"F": ...} or {"stress": ...} like Spring.stress
+    /curve    -> {"points": 20, "xMax": ...} force and stress vs deflexion
+    /dynamic  -> {"cycles": 1e6} like Spring.verifyDynamic
+GET /health returns the state of the service.
+
+The requests are grouped in small batches and evaluated by a pool of worker
+processes, that keep the materials and compiled solvers loaded. When the
+queue of requests is full, the service answers 503 with a Retry-After
+header. The values that aren't finite (NaN, inf) are sent as null."""
+from spring import Spring, eSpring, tSpring, loadMaterials
+from design import eDesign
+from solver import solveFast
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from concurrent.futures import ProcessPoolExecutor, Future
+from collections import OrderedDict
+from threading import Thread, Semaphore, Lock
+from math import isfinite
+from time import monotonic
+from functools import lru_cache
+import argparse
+import queue
+import json
+import os
+
+CLASSES = {'compression': Spring, 'extension': eSpring, 'torsion': tSpring}
+OPTIONS = ('material', 'ending', 'fixing', 'L1', 'L2', 'La', 'Ra', 'Rb')
+ENDPOINTS = ('solve', 'force', 'stress', 'curve', 'dynamic')
+
+_database = 'wires.db'
+
+
+def _warm(database):
+    """Initializer of the workers: keep the database and the materials"""
+    global _database
+    _database = database
+    loadMaterials(database)
+
+
+def specKey(spec):
+    """Hashable key of the spring defined in a request"""
+    if spec.get('type') not in CLASSES:
+        raise ValueError("Tipo de resorte {} no es válido".format(
+                         spec.get('type')))
+    if not isinstance(spec.get('inputs'), dict):
+        raise ValueError("Se requieren los parámetros 'inputs'")
+    options = tuple(sorted((k, spec[k]) for k in OPTIONS if k in spec))
+    inputs = tuple(sorted((k, float(v)) for (k, v) in spec['inputs'].items()))
+    return (spec['type'], options, inputs)
+
+
+@lru_cache(maxsize=1024)
+def _design(key):
+    """Solved designs are kept, so many evaluations of the same spring are
+    solved only once per worker"""
+    (kind, options, inputs) = key
+    springClass = CLASSES[kind]
+    options = dict(options)
+    if springClass is not Spring:
+        options.pop('ending', None)
+        options.pop('fixing', None)
+    if springClass is not tSpring:
+        options.pop('L1', None)
+        options.pop('L2', None)
+    return solveFast(springClass, dict(inputs), _database, **options)
+
+
+def _curve(design, spec):
+    """Force and stress for 'points' deflexions between 0 and xMax"""
+    n = int(spec.get('points', 20))
+    if n < 2 or n > 10000:
+        raise ValueError("Número de puntos {} no es válido".format(n))
+    xMax = spec.get('xMax')
+    if xMax is None:
+        if not isinstance(design, eDesign):
+            xMax = design.Lo - design.Ls
+        else:
+            xMax = design.verifyDynamic(spec.get('cycles', 1e6))['x']
+    result = OrderedDict([('x', []), ('F', []), ('stress', [])])
+    for i in range(n):
+        F = design.force(x=float(xMax) * i / (n - 1))
+        result['x'].append(F['x'])
+        result['F'].append(F['F'])
+        result['stress'].append(design.stress(F=F['F'])['stress'])
+    return result
+
+
+def evaluate(endpoint, spec):
+    """Evaluate one request, used by the workers"""
+    design = _design(specKey(spec))
+    if endpoint == 'solve':
+        result = design._asdict()
+        del result['dynTS']
+        return result
+    elif endpoint == 'force':
+        return design.force(**dict((k, spec[k]) for k in ('x', 'F')
+                                   if k in spec))
+    elif endpoint == 'stress':
+        return design.stress(**dict((k, spec[k]) for k in ('F', 'stress')
+                                    if k in spec))
+    elif endpoint == 'curve':
+        return _curve(design, spec)
+    elif endpoint == 'dynamic':
+        return design.verifyDynamic(cycles=float(spec.get('cycles', 1e6)))
+    raise ValueError("Operación {} no es válida".format(endpoint))
+
+
+def jsonValue(data):
+    """Copy of the result with the values that aren't finite replaced by
+    None, as JSON has no NaN or inf"""
+    if isinstance(data, float):
+        return data if isfinite(data) else None
+    if isinstance(data, dict):
+        return OrderedDict((k, jsonValue(v)) for (k, v) in data.items())
+    if isinstance(data, (list, tuple)):
+        return [jsonValue(v) for v in data]
+    return data
+
+
+def runBatch(batch):
+    """Evaluate a batch of requests; the errors of a request don't affect
+    the rest of the batch"""
+    result = []
+    for (endpoint, spec) in batch:
+        try:
+            result.append((200, evaluate(endpoint, spec)))
+        except Exception as ex:
+            result.append((400, {'error': "{}: {}".format(type(ex).__name__,
+                                                          ex)}))
+    return result
+
+
+class Batcher:
+    """Collect the requests in a bounded queue and send them to the pool of
+    workers in batches of up to 'batchSize' requests, waiting at most
+    'batchWait' seconds to fill a batch"""
+    def __init__(self, workers=None, batchSize=16, batchWait=0.005,
+                 maxQueue=256, database='wires.db'):
+        self.workers = workers or os.cpu_count() or 1
+        self.batchSize = batchSize
+        self.batchWait = batchWait
+        self.queue = queue.Queue(maxsize=maxQueue)
+        self._slots = Semaphore(2 * self.workers)
+        self._pool = ProcessPoolExecutor(self.workers, initializer=_warm,
+                                         initargs=(database,))
+        self.stats = {'requests': 0, 'batches': 0, 'rejected': 0}
+        self._statsLock = Lock()
+        self._running = True
+        self._thread = Thread(target=self._dispatch, daemon=True)
+        self._thread.start()
+
+    def submit(self, endpoint, spec):
+        """Queue a request and return its future. Raise queue.Full when
+        there is no space left"""
+        future = Future()
+        try:
+            self.queue.put_nowait((endpoint, spec, future))
+        except queue.Full:
+            self._count('rejected')
+            raise
+        self._count('requests')
+        return future
+
+    def _count(self, key):
+        """The counters are updated from the threads of the server and the
+        one of the dispatcher"""
+        with self._statsLock:
+            self.stats[key] += 1
+
+    def counters(self):
+        """Copy of the counters"""
+        with self._statsLock:
+            return dict(self.stats)
+
+    def _dispatch(self):
+        while self._running:
+            try:
+                batch = [self.queue.get(timeout=0.1)]
+            except queue.Empty:
+                continue
+            deadline = monotonic() + self.batchWait
+            while len(batch) < self.batchSize:
+                timeout = deadline - monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            self._slots.acquire()
+            self._count('batches')
+            try:
+                done = self._pool.submit(runBatch, [(e, s) for (e, s, f) in
+                                                    batch])
+            except Exception as ex:
+                self._slots.release()
+                for (e, s, f) in batch:
+                    f.set_exception(ex)
+                continue
+            done.add_done_callback(
+                lambda d, b=batch: self._finish(d, b))
+
+    def _finish(self, done, batch):
+        self._slots.release()
+        try:
+            results = done.result()
+        except Exception as ex:
+            for (e, s, f) in batch:
+                f.set_exception(ex)
+        else:
+            for ((e, s, f), r) in zip(batch, results):
+                f.set_result(r)
+
+    def close(self):
+        self._running = False
+        self._thread.join()
+        self._pool.shutdown()
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Request handler; the batcher is an attribute of the server"""
+    timeout = 60
+
+    def _send(self, code, data, headers=()):
+        body = json.dumps(jsonValue(data), allow_nan=False).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for (k, v) in headers:
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/health':
+            batcher = self.server.batcher
+            self._send(200, {'workers': batcher.workers,
+                             'queue': batcher.queue.qsize(),
+                             **batcher.counters()})
+        else:
+            self._send(404, {'error': 'No encontrado'})
+
+    def do_POST(self):
+        endpoint = self.path.strip('/')
+        if endpoint not in ENDPOINTS:
+            self._send(404, {'error': 'No encontrado'})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            spec = json.loads(self.rfile.read(length) or b'{}')
+            if not isinstance(spec, dict):
+                raise ValueError("Se esperaba un objeto JSON")
+        except ValueError as ex:
+            self._send(400, {'error': str(ex)})
+            return
+        try:
+            future = self.server.batcher.submit(endpoint, spec)
+        except queue.Full:
+            self._send(503, {'error': 'Servicio ocupado, intente de nuevo'},
+                       (('Retry-After', '1'),))
+            return
+        try:
+            (code, result) = future.result(timeout=self.timeout)
+        except Exception as ex:
+            self._send(500, {'error': "{}: {}".format(type(ex).__name__,
+                                                      ex)})
+            return
+        self._send(code, result)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+def serve(host='127.0.0.1', port=8080, **kwargs):
+    """Create the server, with its pool of workers. Call serve_forever() to
+    run it and shutdown() and batcher.close() to stop it"""
+    server = Server((host, port), Handler)
+    server.batcher = Batcher(**kwargs)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--batch', type=int, default=16)
+    parser.add_argument('--wait', type=float, default=5,
+                        help='espera máxima para formar un lote en ms')
+    parser.add_argument('--queue', type=int, default=256)
+    parser.add_argument('--database', default='wires.db')
+    args = parser.parse_args()
+    server = serve(args.host, args.port, workers=args.workers,
+                   batchSize=args.batch, batchWait=args.wait / 1000,
+                   maxQueue=args.queue, database=args.database)
+    print("Servicio en http://{}:{}".format(*server.server_address))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        server.batcher.close()
+
+
+if __name__ == '__main__':
+    main()
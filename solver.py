@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+"""Compiled solver for the equations of the springs.
+
+The sympy solution of Spring.solveParams is slow because the system is solved
+again for every spring. Here the system is solved symbolically only once for
+each class, ending, material and set of input parameters, and the solution
+is converted into a python function evaluated with floats. When the system
+has more than one solution, or can't be solved symbolically, the function
+returns None and the spring is solved with sympy as before.
+
+Usage: Spring(..., solver=compiled) or solveFast(springClass, inputs)"""
+from design import freeze, newSpring
+from sympy import Symbol, solve, lambdify
+from threading import Lock
+import copy
+
+_cache = {}
+_freedom = {}
+_lock = Lock()
+
+"""Constants of the equations that are kept as symbols in the compiled
+solution, so the same function serves for any value of them"""
+CONSTANTS = ('E', 'L1', 'L2')
+
+
+def _key(spring, names):
+    return (type(spring).__name__, spring.ending, float(spring.rho),
+            float(spring.G), tuple(sorted(names)))
+
+
+def _compile(spring, names):
+    """Solve the system of the spring symbolically for the parameters that
+    aren't in 'names'. Return a tuple (arguments, unknowns, function), or
+    None when the system has no single solution"""
+    aux = copy.copy(spring)
+    aux._rstParams()
+    consts = [k for k in CONSTANTS if hasattr(aux, k)]
+    for k in consts:
+        setattr(aux, k, Symbol(k))
+    unknowns = [Symbol(k) for k in aux._paramNames if k not in names and
+                type(getattr(aux, k)) is Symbol]
+    try:
+        result = solve(aux._setEqs(aux._setK()), unknowns, dict=True)
+    except Exception:
+        return None
+    args = [Symbol(k) for k in sorted(names)] + [Symbol(k) for k in consts]
+    if len(result) != 1 or len(result[0]) != len(unknowns) or \
+       any(not result[0][u].free_symbols <= set(args) for u in unknowns):
+        return None
+    func = lambdify(args, [result[0][u] for u in unknowns], 'math')
+    return ([str(a) for a in args], [str(u) for u in unknowns], func)
+
+
+def _entry(spring, names):
+    """Compiled solution of the spring for the parameters 'names', compiled
+    the first time"""
+    key = _key(spring, names)
+    with _lock:
+        if key not in _cache:
+            _cache[key] = _compile(spring, names)
+        return _cache[key]
+
+
+def freedom(spring):
+    """Unknown parameters of the system of the spring and how many of them
+    must be given to determine it. It doesn't solve anything, so it's fast
+    enough to check the inputs while they are typed"""
+    key = (type(spring).__name__, spring.ending)
+    with _lock:
+        if key not in _freedom:
+            aux = copy.copy(spring)
+            aux._rstParams()
+            free = tuple(k for k in aux._paramNames if type(getattr(aux, k))
+                         is Symbol)
+            _freedom[key] = (free, len(free) - len(aux._setEqs(aux._setK())))
+        return _freedom[key]
+
+
+def solvable(spring, names):
+    """True if the parameters 'names' determine the system of the spring
+    and the compiled solver has its single solution (it's compiled the
+    first time, that can take some seconds)"""
+    (free, n) = freedom(spring)
+    names = [k for k in names if k in free]
+    return len(names) == n and _entry(spring, names) is not None
+
+
+def compiled(spring, **kwargs):
+    """Solver function for Spring(solver=compiled). The parameters given are
+    already set in the spring by _setParams"""
+    names = [k for k in kwargs.keys() if k in spring._paramNames]
+    entry = _entry(spring, names)
+    if entry is None:
+        return None
+    (args, unknowns, func) = entry
+    try:
+        values = func(*[float(getattr(spring, k)) for k in args])
+    except (ValueError, TypeError, ZeroDivisionError, OverflowError):
+        return None
+    result = dict(kwargs)
+    for k in names:
+        result[k] = getattr(spring, k)
+    for (k, v) in zip(unknowns, values):
+        if isinstance(v, complex):
+            return None
+        result[k] = v
+    return spring._normalize(result)
+
+
+def solveFast(springClass, inputs, database='wires.db', **options):
+    """Solve a spring with the compiled solver and return its immutable
+    design (see design.solveDesign)"""
+    spring = newSpring(springClass, database, solver=compiled, **options)
+    spring.solveParams(None, **inputs)
+    ur = spring.checkUnresolved()
+    if len(ur) > 0:
+        raise ValueError("Variables sin resolver: {}".format(" ".join(ur)))
+    return freeze(spring)
+
+
+def cacheInfo():
+    """Number of systems compiled, and how many of them fall back to
+    sympy"""
+    with _lock:
+        return {'compiled': sum(1 for v in _cache.values() if v is not None),
+                'fallback': sum(1 for v in _cache.values() if v is None)}
@@ -6,10 +6,51 @@
 from math import pi, sqrt
 import sqlite3 as sq
 from sympy import Symbol, Add, Mul, Float, solve
-from multiprocessing import Process, Queue
+import numpy as np
+from multiprocessing import Process, Queue, Pool, shared_memory
+from multiprocessing.util import Finalize
+from collections import OrderedDict
+from tensile import tensileStrength
+import checks
 import os
 
 
+"""Marker used in the results of the solver for the parameters that
+couldn't be solved"""
+UNRESOLVED = None
+
+_materials = {}
+
+
+def loadMaterials(database='wires.db'):
+    """Read the table MATERIALS of the database only once and return it as an
+    ordered dictionary with the material as key and a dictionary with the
+    properties: name, rho, G, E, maxT, htTemp and htTime. The result is shared
+    by every spring and window that use the same database."""
+    key = os.path.abspath(database)
+    if key not in _materials:
+        if not os.path.isfile(database):
+            raise FileNotFoundError("El archivo de base de dato no se "
+                                    "encuentra disponible")
+        con = sq.connect(database)
+        try:
+            rows = con.execute("SELECT MATERIAL, NAME, DENSITY, SHEAR_MOD, \
+                               ELAST_MOD, MAX_WORK_TEMP, HT_TEMP, HT_TIME \
+                               FROM MATERIALS").fetchall()
+        finally:
+            con.close()
+        if len(rows) == 0:
+            raise ValueError("El data buscado, no se encuentra en la base de "
+                             "datos")
+        result = OrderedDict()
+        for row in rows:
+            result[row[0]] = OrderedDict(zip(['rho', 'G', 'E', 'maxT',
+                                              'htTemp', 'htTime'], row[2:]))
+            result[row[0]]['name'] = row[1]
+        _materials[key] = result
+    return _materials[key]
+
+
 class Spring:
     """Definition of class Spring. To fully define the Spring Class, three
     parameters should be given: ending, fixing and material.
@@ -34,26 +75,29 @@ class Spring:
     If less than 4 parameters are given the attributes of the class would not
     be fully solved.
 
+    Optionally a 'solver' can be given: a function called as
+    solver(spring, **kwargs) from solveParams, returning the solved
+    parameters as a dictionary of floats (see _normalize), or None to solve
+    the equations with sympy.
+
     ***NOTE: All the units given are in: mm, N, Kg, MPa, Hz"""
     def __init__(self, ending='closed-ground', fixing='fix-parallel',
-                 material='A229', database='wires.db', **kwargs):
+                 material='A229', database='wires.db', solver=None, **kwargs):
         if not os.path.isfile(database):
             raise FileNotFoundError("El archivo de base de dato no se "
                                     "encuentra disponible")
         self._db = database
+        self._solver = solver
         self._endList = ('closed-ground', 'closed', 'open-ground', 'open')
         self._fixList = ('fix-parallel', 'fix-pivot', 'both-pivot',
                          'hinged-free')
-        self._matList = tuple(self._getData("SELECT MATERIAL FROM MATERIALS",
-                                            ()))
+        materials = loadMaterials(database)
+        self._matList = tuple(materials.keys())
         self.ending = self._checkInputVar(ending, self._endList)
         self.fixing = self._checkInputVar(fixing, self._fixList)
         self.material = self._checkInputVar(material, self._matList)
-        self._setData((self._getData("SELECT DENSITY, SHEAR_MOD, ELAST_MOD, \
-                      MAX_WORK_TEMP, HT_TEMP, HT_TIME FROM MATERIALS WHERE \
-                      MATERIAL=?", (self.material,))), ['rho', 'G', 'E',
-                                                        'maxT', 'htTemp',
-                                                        'htTime'])
+        keys = ['rho', 'G', 'E', 'maxT', 'htTemp', 'htTime']
+        self._setData([materials[self.material][k] for k in keys], keys)
         self._paramNames = ['d', 'DE', 'DM', 'DI', 'Nt', 'Na', 'p', 'gap',
                             'Lo', 'Ls', 'C', 'w', 'fn', 'k']
         self._rstParams()
@@ -179,80 +223,98 @@ class Spring:
         maximum time of 'time' seconds. If the process is still alive, will be
         killed and a exception will be raised. If the process is finished
         succefully, the program will continue and the result of the methos
-        will be saved as class parameters"""
+        will be saved as class parameters. If 'time' is None the equations
+        are solved in the current process, without time limit."""
         return_dict = Queue()
-        p = Process(target=self._sParams, args=(return_dict,), kwargs=kwargs)
-        p.start()
-        p.join(time)
-        if p.is_alive():
-            p.terminate()
-            raise ValueError("Timeout! No se puede resolver con los "
-                             "parámetros dados")
-            p.join()
+        if time is None:
+            self._sParams(return_dict, **kwargs)
+        else:
+            p = Process(target=self._sParams, args=(return_dict,),
+                        kwargs=kwargs)
+            p.start()
+            p.join(time)
+            if p.is_alive():
+                p.terminate()
+                raise ValueError("Timeout! No se puede resolver con los "
+                                 "parámetros dados")
+                p.join()
         result = return_dict.get()
-        self._setData(result.values(), result.keys())
+        for (k, v) in result.items():
+            setattr(self, k, Symbol(k) if v is UNRESOLVED else v)
         if len(self.checkUnresolved()) == 0:
-            for (k, v) in self.__dict__.items():
-                if type(v) is Float and k != 'gap' and v <= 0:
+            for k in self._paramNames:
+                v = getattr(self, k)
+                if k != 'gap' and v <= 0:
                     raise ValueError("Valor {} = {} es menor ó igual a cero".
                                      format(k, v))
-                elif type(v) is Float and v < 0:
+                elif v < 0:
                     raise ValueError("Valor {} = {} es menor que cero".
                                      format(k, v))
-                else:
-                    self.isSolved = True
+            self.isSolved = True
 
     def _sParams(self, return_dict, **kwargs):
         """Method that will be run in parallel"""
         self._setParams(**kwargs)
+        if self._solver is not None:
+            result = self._solver(self, **kwargs)
+            if result is not None:
+                return_dict.put(result)
+                return
         result = (solve(self._setEqs(self._setK())))
         result = {**kwargs, **result[0]}
-        return_dict.put(result)
+        return_dict.put(self._normalize(result))
+
+    def _normalize(self, result):
+        """Convert the result of the solver, with sympy objects as keys and
+        values, to a dictionary of names and native floats. The parameters
+        that weren't solved, or whose value is not a real number, are marked
+        as UNRESOLVED"""
+        values = dict((str(k), v) for (k, v) in result.items())
+        normalized = {}
+        for k in list(values.keys()) + self._paramNames:
+            try:
+                normalized[k] = float(values[k])
+            except (KeyError, TypeError):
+                normalized[k] = UNRESOLVED
+        return normalized
 
-    def verifyC(self):
+    def verifyC(self, verbose=True):
         """Calculates the spring gauge-Diameter ratio, and through a warning
         if it's outside of the proper value. Will return 0 if the spring ratio
         is inside the interval; a positive number if is greater, and a negative
-        one otherwise."""
+        one otherwise. The warning is printed when verbose, see checks.C_HIGH
+        and checks.C_LOW for the records."""
         if type(self.C) is Symbol:
             raise ValueError("El valor de C no está definido.")
-        if self.C >= 12:
-            print("El índice del resorte ({:.2f}) es mayor del adecuado "
-                  "(12.00), el diámetro del resorte debería ser menor o el "
-                  "calibre mayor; ajustar. En caso de ser imposible, evitar "
-                  "esmerilar para no empeorar su funcionamiento"
-                  .format(self.C))
-            return 1
-        elif self.C <= 4:
-            print("El índice del resorte ({:.2f}) es menor del adecuado "
-                  "(4.00), el diámetro del resorte debería ser mayor o el "
-                  "calibre menor; ajustar. En caso de ser imposible, evitar "
-                  "esmerilar para no empeorar su funcionamiento"
-                  .format(self.C))
-            return -1
-        return 0
+        if verbose:
+            for d in checks.diagnose(float(self.C))[0]:
+                print(checks.format(d))
+        return checks.checkC(float(self.C))
 
-    def verifyBuckling(self):
+    def verifyBuckling(self, verbose=True):
         """Calculates the maximum length allowed for the spring to avoid
-        buckling."""
-        if self.fixing == 'fix-parallel':
-            alpha = 0.5
-        elif self.fixing == 'fix-pivot':
-            alpha = 0.707
-        elif self.fixing == 'both-pivot':
-            alpha = 1.0
-        elif self.fixing == 'hinged-free':
-            alpha = 2.0
-        LoMax = 2.63 / alpha * self.DM
+        buckling. Will return 1 if the spring buckles, printing a warning when
+        verbose, and 0 otherwise."""
+        LoMax = 2.63 / checks.ALPHA[self.fixing] * self.DM
         if type(LoMax) is Mul:
             raise ValueError("Valor 'DM' aún no está definido")
-        else:
-            if self.Lo >= LoMax:
-                print("La longitud del resorte dada: {:.2f} mm, provocará "
-                      "pandeo. Se recomienda mantener el largo menor a "
-                      "{:.2f} mm".format(self.Lo, LoMax))
-            return 0
-        return 1
+        (result, LoMax) = checks.checkBuckling(float(self.Lo), float(self.DM),
+                                               self.fixing)
+        if verbose and result:
+            print(checks.format(checks.Diagnostic(
+                'BUCKLING', checks.WARNING, LoMax, float(self.Lo), 'mm')))
+        return result
+
+    @staticmethod
+    def _report(verbose, diagnostics, code, limit, actual, unit=''):
+        """Add the record of a check to the list diagnostics, if given, and
+        print its message when verbose"""
+        d = checks.Diagnostic(code, checks.WARNING, float(limit), float(actual),
+                              unit)
+        if diagnostics is not None:
+            diagnostics.append(d)
+        if verbose:
+            print(checks.format(d))
 
     def _checkMaxDef(self, x):
         """Rerturn the value of deflexion, if the value given is lesser than
@@ -263,11 +325,12 @@ class Spring:
         Eq = [self.G * self.d**4 / (8 * self.Na * self.DM**3) - self.k]
         return Eq
 
-    def force(self, verbose=False, **kwargs):
+    def force(self, verbose=False, diagnostics=None, **kwargs):
         """Function to calculate the Force of the spring based on the deflexion
         given and the parameters of the spring. If the Force is given the
         deflexion is calculated. When the the values are outside of range, the
-        maximum value will be returned.
+        maximum value will be returned, and a record (X_MAX or F_MAX) is added
+        to the list diagnostics, if given.
         The return value is a dictionary with the value calculated."""
         unlock = True
         recheck = False
@@ -280,9 +343,8 @@ class Spring:
                     if v > 0:
                         aux = self._checkMaxDef(v)
                         if v != aux:
-                            if verbose:
-                                print("La deflexión dada es mayor a la máxima "
-                                      "posible")
+                            self._report(verbose, diagnostics, 'X_MAX', aux, v,
+                                         'mm')
                             v = aux
                 elif k is 'F':
                     solvedKey = 'x'
@@ -298,9 +360,8 @@ class Spring:
                 if v > 0:
                     aux = self._checkMaxDef(vars['x'])
                     if vars[solvedKey] != aux:
-                        if verbose:
-                            print("La fuerza dada es mayor a la máxima "
-                                  "posible")
+                        self._report(verbose, diagnostics, 'F_MAX',
+                                     self.k * aux, v, 'N')
                         vars[solvedKey] = aux
                     solvedKey = 'F'
                     vars[solvedKey] = Symbol(solvedKey)
@@ -315,21 +376,29 @@ class Spring:
         """Solve the Wahl's curvature correction ratio"""
         return (((4*self.C - 1) / (4*self.C - 4)) + (0.615 / self.C))
 
+    def _bodyFactor(self):
+        """Stress in the body for an unitary force, with the Walh's curvature
+        correction factor, as a fraction of the tensile strength"""
+        return 8 * self._calcKw() * self.DM / (pi * self.TS * self.d**3)
+
     def _bodyStress(self, varz, *args):
         """Function to define the function to calculates the Walh's curvature
         correction factor for the stress in the body of the spring"""
-        Kw = self._calcKw()
-        Eq = [pi*varz['stress']*self.TS*self.d**3 - 8*Kw*self.DM*varz['F']]
+        Eq = [varz['stress'] - self._bodyFactor() * varz['F']]
         return Eq
 
-    def _calcStress(self, Eq, verbose=False, *args, **kwargs):
+    def _setTS(self):
+        """Calculate the tensile strength of the material for the current
+        gauge and save it as the parameter TS"""
+        self.TS = tensileStrength(self.material, self.d, self._db)
+
+    def _calcStress(self, Eq, verbose=False, *args, diagnostics=None,
+                    **kwargs):
         """Function to calculate the stress of the spring based on the force
         given, when this force excede the maximun possible force, this maximum
-        value will be calculated and used to obtain the stress."""
-        self._setData((self._getData("SELECT A, M FROM EQ_TS WHERE \
-                                     WIRE_MAT = ? AND VALID_MIN <= ? AND \
-                                     VALID_MAX >= ?", (self.material, self.d,
-                                                       self.d,))), ['TS'])
+        value will be calculated and used to obtain the stress (a record
+        STRESS_MAX is added to the list diagnostics, if given)."""
+        self._setTS()
         unlock = True
         recheck = False
         varz = {'stress': Symbol('stress'), 'F': Symbol('F')}
@@ -351,9 +420,8 @@ class Spring:
             if recheck:
                 aux = self.force(**varz)
                 if aux[solvedKey] != varz[solvedKey]:
-                    if verbose:
-                        print("El stress dado corresponde a un fuerza mayor a "
-                              "la máxima posible")
+                    self._report(verbose, diagnostics, 'STRESS_MAX',
+                                 aux[solvedKey], varz[solvedKey], 'N')
                     varz[solvedKey] = aux[solvedKey]
                     solvedKey = 'stress'
                     varz[solvedKey] = Symbol(solvedKey)
@@ -369,16 +437,10 @@ class Spring:
         calculate the force base on the given stress"""
         return self._calcStress(self._bodyStress, verbose, *args, **kwargs)
 
-    def verifyDynamic(self, verbose=False, cycles=1e6):
-        """Check the values for dynamic functioning of the spring: high number
-        of cycles. Valid values for cycles are 1e5, 1e6, 1e7, with 1e6 as
-        default value"""
-        if type(self.fn) is Symbol:
-            raise ValueError("El valor de fn no está definido.")
-        if self.fixing == "fix-parallel" or self.fixing == "both-pivot":
-            f = self.fn / 13 * 60
-        elif self.fixing == "fix-pivot" or self.fixing == "hinged-free":
-            f = self.fn / 26 * 60
+    def _dynamicTS(self, cycles):
+        """Return the maximum fractions of the tensile strength allowed for
+        the number of cycles given, as a dictionary with the same keys of the
+        stress method, and the exponent of the cycles used to print it"""
         if self.material == "A229" or self.material == "A228" or self.material\
            == "T302" or self.material == "A227":
             if cycles == 1e5:
@@ -406,17 +468,37 @@ class Spring:
             else:
                 TS = 0.40
                 cyk = '\u2076'
+        return ({'stress': TS}, cyk)
+
+    def _fmax(self):
+        """Maximum working frequency in cycles / min"""
+        if self.fixing == "fix-pivot" or self.fixing == "hinged-free":
+            return self.fn / 26 * 60
+        return self.fn / 13 * 60
+
+    def verifyDynamic(self, verbose=False, cycles=1e6, diagnostics=None):
+        """Check the values for dynamic functioning of the spring: high number
+        of cycles. Valid values for cycles are 1e5, 1e6, 1e7, with 1e6 as
+        default value"""
+        if type(self.fn) is Symbol:
+            raise ValueError("El valor de fn no está definido.")
+        f = self._fmax()
+        (TS, cyk) = self._dynamicTS(cycles)
+        TS = TS['stress']
         aux = self.force(**self.stress(stress=TS))
-        if verbose:
-            print("La frecuencia de trabajo debe ser menor a {:.2f} "
-                  "ciclos / min". format(f))
-            print("Para la vida útil definida (10{} ciclos) la deflexión del "
-                  "resorte no debe superar los {:.2f} mm".
-                  format(cyk, aux['x']))
-            print("La vida útil mínima estimada del resorte será: {:.2f} "
-                  "minutos".format(cycles / f))
+        self._reportDynamic(verbose, diagnostics, f, aux['x'], cycles, cyk)
         return {'cycles': cycles, 'x': aux['x'], 'fmax': f}
 
+    @staticmethod
+    def _reportDynamic(verbose, diagnostics, f, x, cycles, cyk, unit=' mm'):
+        """Add the records of verifyDynamic to the list diagnostics, if
+        given, and print them when verbose"""
+        result = checks.dynamic(f, x, cycles, unit, checks.EXPONENTS[cyk])
+        if diagnostics is not None:
+            diagnostics.extend(result)
+        if verbose:
+            checks.report(result)
+
     def showParams(self):
         """Function to print all the paramenters current defined in the class
         """
@@ -456,10 +538,10 @@ class eSpring(Spring):
         super()._rstParams()
         self.gap = 0
 
-    def force(self, verbose=False, **kwargs):
+    def force(self, verbose=False, diagnostics=None, **kwargs):
         for (k, v) in kwargs.items():
             kwargs[k] = -v
-        result = super().force(verbose, **kwargs)
+        result = super().force(verbose, diagnostics, **kwargs)
         for (k, v) in result.items():
             result[k] = -v
         return result
@@ -476,25 +558,34 @@ class eSpring(Spring):
                                'stressB': hookB['stress']}}
         return result
 
-    def _hookStressA(self, varz):
-        """Set the equations for the bending stress on the point A in the
-        spring's hook"""
+    def _hookFactorA(self):
+        """Bending stress on the point A of the hook for an unitary force, as
+        a fraction of the tensile strength"""
         C1 = 2 * self.Ra / self.d
         if C1 <= 1:
             raise ValueError("Valor de C1 muy pequeño")
         Ka = (4*C1**2 - C1 - 1) / (4*C1*(C1 - 1))
-        Eq = [(32 * Ka * self.DM * varz['F'] / (pi * self.d**3)) +
-              (4 * varz['F'] / (pi * self.d**2)) - varz['stress'] * self.TS]
-        return Eq
+        return ((32 * Ka * self.DM / (pi * self.d**3)) +
+                (4 / (pi * self.d**2))) / self.TS
 
-    def _hookStressB(self, varz):
-        """Define the equations for the torsion stress in the spring's hook"""
+    def _hookFactorB(self):
+        """Torsion stress on the point B of the hook for an unitary force, as
+        a fraction of the tensile strength"""
         C2 = 2 * self.Rb / self.d
         if C2 <= 4:
             raise ValueError("Valor de C1 muy pequeño")
         Kb = (4*C2 - 1) / (4*C2 - 4)
-        Eq = [16 * varz['F'] * self.DM * Kb / (pi * self.d**3) -
-              varz['stress'] * self.TS]
+        return 16 * self.DM * Kb / (pi * self.d**3) / self.TS
+
+    def _hookStressA(self, varz):
+        """Set the equations for the bending stress on the point A in the
+        spring's hook"""
+        Eq = [varz['stress'] - self._hookFactorA() * varz['F']]
+        return Eq
+
+    def _hookStressB(self, varz):
+        """Define the equations for the torsion stress in the spring's hook"""
+        Eq = [varz['stress'] - self._hookFactorB() * varz['F']]
         return Eq
 
     def addWeight(self):
@@ -522,13 +613,11 @@ class eSpring(Spring):
         the given force. Or calculates the force based on the given stress."""
         return self._calcStress(self._hookStressB, verbose, **kwargs)
 
-    def verifyDynamic(self, verbose=False, cycles=1e6):
-        """Run a verification of the dynamic stress for the spring body
-        and hooks. Will return the minimum deflexion so all three stress
-        are below maximum"""
-        if type(self.fn) is Symbol:
-            raise ValueError("El valor de fn no está definido.")
-        f = self.fn / 13 * 60
+    def _dynamicTS(self, cycles):
+        """Return the maximum fractions of the tensile strength allowed in
+        the body (stress), the bending of the hook (stressA) and its torsion
+        (stressB) for the number of cycles given, and the exponent of the
+        cycles used to print it"""
         if cycles == 1e5:
             tsBody = 0.36
             tsHookT = 0.34
@@ -549,6 +638,22 @@ class eSpring(Spring):
             tsHookT = 0.30
             tsHookF = 0.47
             cyk = '\u2076'
+        return ({'stress': tsBody, 'stressA': tsHookF, 'stressB': tsHookT},
+                cyk)
+
+    def _fmax(self):
+        return self.fn / 13 * 60
+
+    def verifyDynamic(self, verbose=False, cycles=1e6, diagnostics=None):
+        """Run a verification of the dynamic stress for the spring body
+        and hooks. Will return the minimum deflexion so all three stress
+        are below maximum"""
+        if type(self.fn) is Symbol:
+            raise ValueError("El valor de fn no está definido.")
+        f = self._fmax()
+        (TS, cyk) = self._dynamicTS(cycles)
+        (tsBody, tsHookF, tsHookT) = (TS['stress'], TS['stressA'],
+                                      TS['stressB'])
         sBody = self.force(**self._calcStress(self._bodyStress, stress=tsBody))
         sBend = self.force(**self._calcStress(self._hookStressA,
                                               stress=tsHookF))
@@ -556,14 +661,7 @@ class eSpring(Spring):
                                               stress=tsHookT))
         aux = [sBody['x'], sBend['x'], sTors['x']]
         aux.sort()
-        if verbose:
-            print("La frecuencia de trabajo debe ser menor a {:.2f} "
-                  "ciclos / min". format(f))
-            print("Para la vida útil definida (10{} ciclos) la deflexión del "
-                  "resorte no debe superar los {:.2f} mm".
-                  format(cyk, aux[0]))
-            print("La vida útil mínima estimada del resorte será: {:.2f} "
-                  "minutos".format(cycles / f))
+        self._reportDynamic(verbose, diagnostics, f, aux[0], cycles, cyk)
         return {'cycles': cycles, 'x': aux[0], 'fmax': f}
 
 
@@ -598,11 +696,15 @@ class tSpring(eSpring):
         super(eSpring, self).solveParams(time, **kwargs)
         self.w = self.w + self.addWeight()
 
+    def _bodyFactor(self):
+        """Bending stress in the body for an unitary force, as a fraction of
+        the tensile strength"""
+        Kb = (4*self.C - 1) / (4*self.C - 4)
+        return 32 * Kb / (pi * self.d**3) / self.TS
+
     def _bodyStress(self, varz):
         """Generate the equation of the spring's body stress"""
-        Kb = (4*self.C - 1) / (4*self.C - 4)
-        Eq = [32 * varz['F'] * Kb / (pi * self.d**3) -
-              varz['stress'] * self.TS]
+        Eq = [varz['stress'] - self._bodyFactor() * varz['F']]
         return Eq
 
     def stress(self, verbose=False, *args, **kwargs):
@@ -623,12 +725,10 @@ class tSpring(eSpring):
             wAdd = self.d**2 * pi * self.rho * La / 4
             return wAdd
 
-    def verifyDynamic(self, verbose=False, cycles=1e6):
-        """Verify that the stress during dynamical fuction of the spring,
-        is under the maximum values"""
-        if type(self.fn) is Symbol:
-            raise ValueError("El valor de fn no está definido.")
-        f = self.fn / 13 * 60
+    def _dynamicTS(self, cycles):
+        """Return the maximum fraction of the tensile strength allowed in the
+        body (stress) for the number of cycles given, and the exponent used
+        to print it"""
         if self.material == 'A227' or self.material == 'A228' or \
            self.material == 'A229' or self.material == 'T302':
                 if cycles == 1e5:
@@ -650,17 +750,141 @@ class tSpring(eSpring):
                 else:
                     tsBody = 0.53
                     cyk = '\u2076'
-        aux = self.force(**self.stress(stress=tsBody))
-        if verbose:
-            print("La frecuencia de trabajo debe ser menor a {:.2f} "
-                  "ciclos / min". format(f))
-            print("Para la vida útil definida (10{} ciclos) la deflexión del "
-                  "resorte no debe superar los {:.2f}º".
-                  format(cyk, aux['x']))
-            print("La vida útil mínima estimada del resorte será: {:.2f} "
-                  "minutos".format(cycles / f))
+        return ({'stress': tsBody}, cyk)
+
+    def verifyDynamic(self, verbose=False, cycles=1e6, diagnostics=None):
+        """Verify that the stress during dynamical fuction of the spring,
+        is under the maximum values"""
+        if type(self.fn) is Symbol:
+            raise ValueError("El valor de fn no está definido.")
+        f = self._fmax()
+        (TS, cyk) = self._dynamicTS(cycles)
+        aux = self.force(**self.stress(stress=TS['stress']))
+        self._reportDynamic(verbose, diagnostics, f, aux['x'], cycles, cyk,
+                            'º')
         return {'cycles': cycles, 'x': aux['x'], 'fmax': f}
 
+    def sweep(self, L1=None, L2=None, angle=None, cycles=1e6):
+        """Evaluate the solved spring over grids of hook lengths and angles
+        without solving it again. The body geometry (d, DM, Nt) is kept and
+        only the terms that depend on the hooks are recalculated, using array
+        arithmetic. L1, L2 and angle may be scalars or sequences, when they
+        are not given the current values of the spring are used (angle 0).
+        The return value is a dictionary with the axes of the grid and:
+             - k : constant, shape (L1, L2)
+             - w : weight, shape (L1, L2)
+             - F : torque at each angle, shape (L1, L2, angle)
+             - stress : body stress at each angle, shape (L1, L2, angle)
+             - xMax : maximum angle for the cycles given, shape (L1, L2)"""
+        if not self.isSolved:
+            raise ValueError("El resorte no ha sido resuelto")
+        L1 = np.atleast_1d(np.asarray(self.L1 if L1 is None else L1,
+                                      dtype=float))
+        L2 = np.atleast_1d(np.asarray(self.L2 if L2 is None else L2,
+                                      dtype=float))
+        angle = np.atleast_1d(np.asarray(0 if angle is None else angle,
+                                         dtype=float))
+        if L1.min() < 0 or L2.min() < 0:
+            raise ValueError("Las longitudes de los ganchos no pueden ser "
+                             "menores que cero")
+        self._setTS()
+        (d, DM, Nt, C) = (float(self.d), float(self.DM), float(self.Nt),
+                          float(self.C))
+        (E, rho, TS) = (float(self.E), float(self.rho), float(self.TS))
+        La = L1[:, None] + L2[None, :]
+        k = E * d**4 / (3.888E3 * DM * (Nt + La / (3 * pi * DM)))
+        w = rho * (pi * d / 2)**2 * DM * Nt + d**2 * pi * rho * La / 4
+        F = k[:, :, None] * angle[None, None, :]
+        Kb = (4*C - 1) / (4*C - 4)
+        stress = 32 * F * Kb / (pi * d**3 * TS)
+        FMax = (self._dynamicTS(cycles)[0]['stress'] * TS * pi * d**3 /
+                (32 * Kb))
+        return {'L1': L1, 'L2': L2, 'angle': angle, 'k': k, 'w': w, 'F': F,
+                'stress': stress, 'xMax': FMax / k}
+
+
+_bulk = {}
+
+
+def _attachBulk(name, shape):
+    """Initializer of the workers of solveMany, attach the shared buffer and
+    close it when the worker exits. The block is owned by solveMany, so the
+    workers don't track it (before Python 3.13 they register it in the
+    resource tracker of the pool, the one of solveMany, where it's already
+    registered and unregistered by the unlink)"""
+    try:
+        shm = shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+    _bulk['shm'] = shm
+    _bulk['values'] = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    Finalize(shm, _detachBulk, exitpriority=10)
+
+
+def _detachBulk():
+    """Release the view of the shared buffer and close it"""
+    _bulk.pop('values', None)
+    shm = _bulk.pop('shm', None)
+    if shm is not None:
+        shm.close()
+
+
+def _solveRow(args):
+    """Solve one row of solveMany and write it in the shared buffer"""
+    (i, springClass, database, options, inputs) = args
+    try:
+        spring = springClass(database=database, **options)
+        spring.solveParams(None, **inputs)
+        for (j, k) in enumerate(spring._paramNames):
+            v = getattr(spring, k)
+            _bulk['values'][i, j] = (v if type(v) is float else
+                                     float(v) if type(v) is int else np.nan)
+    except Exception as ex:
+        return (i, "{}: {}".format(type(ex).__name__, ex))
+    return (i, None)
+
+
+def solveMany(springClass, inputs, processes=None, database='wires.db',
+              **options):
+    """Solve many springs of the same class and options, one for each
+    dictionary of parameters in 'inputs', using a pool of processes. The
+    workers write the solved parameters in a shared memory buffer instead of
+    sending them back pickled. The return value is a dictionary with:
+         - names : name of the parameters, the columns of 'values'
+         - values : array (len(inputs), len(names)) of floats, where the
+                    parameters unresolved are NaN
+         - errors : dictionary with the index and message of the springs
+                    that couldn't be solved"""
+    names = springClass(database=database, **options)._paramNames
+    shape = (len(inputs), len(names))
+    shm = shared_memory.SharedMemory(create=True,
+                                     size=max(1, shape[0] * shape[1] * 8))
+    try:
+        values = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        values[:] = np.nan
+        errors = {}
+        tasks = [(i, springClass, database, options, kw) for (i, kw) in
+                 enumerate(inputs)]
+        with Pool(processes, initializer=_attachBulk,
+                  initargs=(shm.name, shape)) as pool:
+            for (i, ex) in pool.imap_unordered(_solveRow, tasks,
+                                               chunksize=max(1, len(tasks) //
+                                                             (4 * (processes or
+                                                              os.cpu_count() or
+                                                              1)))):
+                if ex is not None:
+                    errors[i] = ex
+            # let the workers exit and close the buffer before the unlink
+            pool.close()
+            pool.join()
+        result = {'names': list(names), 'values': values.copy(),
+                  'errors': errors}
+        del values
+    finally:
+        shm.close()
+        shm.unlink()
+    return result
+
 
 def main():
     print("*** COMPRESSION ***")
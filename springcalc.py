@@ -3,16 +3,28 @@
    San Diego 2006, Venezuela
    by Alberto Vázquez
    v1.0.1"""
-from spring import Spring, eSpring, tSpring
+from spring import Spring, eSpring, tSpring, loadMaterials
+from design import freeze, HOOKS
+from solver import compiled, freedom, solvable, solveFast
+import rules
+import surrogate
+import tkprofile
 from tkinter import Tk, Frame, Button, Label, \
-     Entry, LabelFrame, Text, Radiobutton, DoubleVar, StringVar, messagebox
-from tkinter.ttk import Notebook, Combobox
+     Entry, LabelFrame, Text, Radiobutton, DoubleVar, StringVar, messagebox, \
+     Canvas
+from tkinter.ttk import Notebook, Combobox, Treeview, Scrollbar
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import RotatingFileHandler
 from time import strftime
+import logging
+import queue
+import threading
 import sys
 import os
 import traceback
 import multiprocessing
+import copy
 
 """
 Recipe for using multiprocessing in windows' exe, created by pyinstaller:
@@ -59,26 +71,112 @@ def resource_path(relative):
 
     return os.path.join(base_path, relative)
 
+"""Surrogate tables of the previews, built in a worker thread"""
+_previewPool = ThreadPoolExecutor(max_workers=1)
+_tables = {}
+"""Speculative solves of the tabs, see lFrame1.speculate"""
+_speculativePool = ThreadPoolExecutor(max_workers=1)
+"""Environment variable with the path of the log of the console; without
+it nothing is written to disk"""
+LOGFILE = 'SPRINGCALC_LOG'
+STRESSCOLORS = {rules.OK: 'black', rules.SET: 'orange', rules.OVER: 'red'}
+
+
 def except_handler(ex):
     print("La solución superó su tiempo máximo establecido. Error de tipo {}: "
           "{}".format(type(ex).__name__, ex))
 
-class StdoutRedirector(object):
-    """Class to redirect stdout and traceback to a text widget"""
-    def __init__(self, text_widget):
+
+def speculativeSolve(spring, inputs):
+    """Solve a copy of the spring of a tab with the compiled solver, in a
+    worker thread while the inputs are typed. Return the solved copy, or
+    None when the compiled solver has no single solution for the inputs"""
+    if not solvable(spring, inputs.keys()):
+        return None
+    spring._solver = compiled
+    spring.solveParams(None, **inputs)
+    if len(spring.checkUnresolved()) > 0:
+        return None
+    return spring
+
+
+def stressLimits(spring):
+    """Limits of the stress (fraction of TS) of the spring, see rules, as a
+    dictionary with the list of (limit, color) of each stress"""
+    result = {}
+    for (k, (setLimit, overLimit)) in rules.limits(
+            rules.kindOf(spring), spring.material).items():
+        result[k] = [(l, STRESSCOLORS[c]) for (l, c) in
+                     ((setLimit, rules.SET), (overLimit, rules.OVER))
+                     if l is not None]
+    return result
+
+
+class ConsoleSink(object):
+    """Class to redirect stdout to a text widget. Each line starts with the
+    time it was written. The writes are kept in a buffer and moved to the
+    widget in batches every 'interval' ms, the widget keeps only the last
+    'maxLines' lines, and if logFile is given every line is also saved to a
+    rotating log file"""
+    def __init__(self, text_widget, maxLines=1000, interval=200,
+                 logFile=None, maxBytes=1048576, backupCount=3):
         self.text_widget = text_widget
+        self.maxLines = maxLines
+        self.interval = interval
+        self._pending = []
+        self._line = ''
+        self._lock = threading.Lock()
+        self._log = logging.getLogger('springcalc.console')
+        self._log.setLevel(logging.INFO)
+        self._log.propagate = False
+        if logFile is not None and len(self._log.handlers) == 0:
+            try:
+                handler = RotatingFileHandler(logFile, maxBytes=maxBytes,
+                                              backupCount=backupCount,
+                                              encoding='utf-8')
+            except OSError:
+                pass
+            else:
+                handler.setFormatter(logging.Formatter('%(message)s'))
+                self._log.addHandler(handler)
+        self.text_widget.after(self.interval, self._flushWidget)
 
     def write(self, string):
-        if not "\n" in string:
-           string = "(" + strftime("%I:%M:%S %p") + ") " + string
-        self.text_widget.insert('end', string)
-        self.text_widget.see('end')
+        stamp = "(" + strftime("%I:%M:%S %p") + ") "
+        lines = []
+        with self._lock:
+            for part in string.splitlines(True):
+                if len(self._line) == 0 and len(part.strip('\n')) > 0:
+                    part = stamp + part
+                self._pending.append(part)
+                self._line += part
+                if self._line.endswith('\n'):
+                    lines.append(self._line[:-1])
+                    self._line = ''
+        for line in lines:
+            self._log.info(line)
+
+    def _flushWidget(self):
+        """Move the buffered text to the widget and remove the oldest lines
+        if there are more than 'maxLines'"""
+        with self._lock:
+            string = ''.join(self._pending)
+            self._pending = []
+        if len(string) > 0:
+            self.text_widget.insert('end', string)
+            lines = int(self.text_widget.index('end-1c').split('.')[0])
+            if lines > self.maxLines:
+                self.text_widget.delete('1.0', '{}.0'.format(
+                                        lines - self.maxLines + 1))
+            self.text_widget.see('end')
+        self.text_widget.after(self.interval, self._flushWidget)
 
     def flush(self):
+        for handler in self._log.handlers:
+            handler.flush()
         sys.__stdout__.flush()
 
 
-
 class cFrame(Frame):
     """Basic structure for frames inside the notebook's tabs"""
     def __init__(self, parent, pos, name, spring=None):
@@ -128,11 +226,15 @@ class subWindow(Frame):
                            self.spring)
         self.lf3 = lFrame3(self.parent, (1, 1, 1), "Cálculo dinámico",
                            self.spring)
+        self.chart = chartFrame(self.parent, (0, 2, 2), "Curva de carga",
+                                self.spring)
+        self.lf2.chart = self.chart
 
     def init_widgets(self):
         self.lf1.init_widget()
         self.lf2.init_widget()
         self.lf3.init_widget()
+        self.chart.init_widget()
 
 
 class lFrame1(cFrame):
@@ -142,10 +244,13 @@ class lFrame1(cFrame):
         cbFix = {}
         cbEnd = {}
         self._wlabel = StringVar()
-        matList = self.spring._getData("SELECT NAME, MATERIAL FROM MATERIALS",
-                                       ())
-        for i in range(0, len(matList)-1, 2):
-            cbMat[matList[i]] = matList[i+1]
+        self._preview = StringVar()
+        self._previewJob = None
+        self._speculateJob = None
+        self._speculative = None
+        self._generation = 0
+        for (k, v) in loadMaterials(self.spring._db).items():
+            cbMat[v['name']] = k
         endList = ('Cerrado y esmerilado', 'Cerrado', 'Abierto y esmerilado',
                    'Abierto')
         for (k, v) in zip(endList, self.spring._endList):
@@ -187,10 +292,13 @@ class lFrame1(cFrame):
                 e.current(3)
             else:
                 e.current(0)
+            e.bind('<<ComboboxSelected>>', self.inputsChanged)
             i += 1
         (i, j) = self.createEntries(i)
         butPos = i // 2 if i % 2 == 0 else i // 2 + 1
         self.createButtons((butPos, j, 2), (butPos-2, j, 2))
+        l = Label(self.frame, textvariable=self._preview, fg='gray40')
+        l.grid(column=0, row=j+1, columnspan=i, sticky='w', padx=5)
 
     def checkInput(self, *args):
         for k in self.entries.keys():
@@ -206,6 +314,118 @@ class lFrame1(cFrame):
                 self.entries[modKey]['entry'].configure(bg="white")
         else:
             self.entries[modKey]['entry'].configure(bg="white")
+        if self._previewJob is not None:
+            self.frame.after_cancel(self._previewJob)
+        self._previewJob = self.frame.after(150, self.preview)
+        self.inputsChanged()
+
+    def typedInputs(self):
+        """Values of the fields that are valid numbers"""
+        inputs = {}
+        for k in self.entries.keys():
+            try:
+                inputs[k] = float(self.entries[k]['entryVar'].get())
+            except ValueError:
+                pass
+        return inputs
+
+    def options(self):
+        """Material, ending and fixing selected"""
+        return dict((k, self.cbEntries[k]['values'][
+                     self.cbEntries[k]['entry'].get()]) for k in
+                    self.cbEntries.keys())
+
+    def inputsChanged(self, *args):
+        """Discard the speculative solve of the previous inputs (a new
+        generation) and start other when the inputs stop changing"""
+        self._generation += 1
+        if self._speculative is not None:
+            self._speculative[2].cancel()
+            self._speculative = None
+        if self._speculateJob is not None:
+            self.frame.after_cancel(self._speculateJob)
+        self._speculateJob = self.frame.after(150, self.speculate)
+
+    def speculate(self):
+        """Start solving the spring in background as soon as the fields
+        typed determine its system, so Resolver only has to show the
+        result. The job is tagged with the generation of the inputs"""
+        self._speculateJob = None
+        if self.spring.isSolved:
+            return
+        inputs = self.typedInputs()
+        (free, n) = freedom(self.spring)
+        if sum(1 for k in inputs.keys() if k in free) != n:
+            return
+        options = self.options()
+        spring = copy.copy(self.spring)
+        for (k, v) in options.items():
+            setattr(spring, k, v)
+        key = (tuple(sorted(options.items())), tuple(sorted(inputs.items())))
+        self._speculative = (self._generation, key, _speculativePool.submit(
+                             speculativeSolve, spring, inputs))
+
+    def speculativeResult(self, options, inputs):
+        """Spring solved in background for the options and inputs, waiting
+        for it if it's still running; None if there is none"""
+        spec = self._speculative
+        key = (tuple(sorted(options.items())), tuple(sorted(inputs.items())))
+        if spec is None or spec[0] != self._generation or spec[1] != key:
+            return None
+        try:
+            return spec[2].result(timeout=30)
+        except Exception:
+            return None
+
+    def preview(self):
+        """Show the values estimated by the surrogate tables for the
+        parameters typed; the tables are built in a worker thread the first
+        time, and the preview is cleared when the spring is solved"""
+        self._previewJob = None
+        if self.spring.isSolved:
+            return
+        inputs = self.typedInputs()
+        if len(inputs) == 0:
+            self._preview.set('')
+            return
+        material = self.cbEntries['material']['values'].get(
+            self.cbEntries['material']['entry'].get())
+        ending = self.cbEntries['ending']['values'].get(
+            self.cbEntries['ending']['entry'].get()) if 'ending' in \
+            self.cbEntries else 'open'
+        key = (type(self.spring), ending, material)
+        future = _tables.get(key)
+        if future is None:
+            future = _previewPool.submit(surrogate.surrogate,
+                                         type(self.spring), ending, material,
+                                         self.spring._db)
+            _tables[key] = future
+        if not future.done():
+            self._preview.set("Vista previa: preparando tablas...")
+            self._previewJob = self.frame.after(300, self.preview)
+            return
+        try:
+            future.result()
+            result = surrogate.preview(type(self.spring), ending, material,
+                                       self.spring._db, **inputs)
+        except Exception:
+            result = None
+        if result is None:
+            self._preview.set('')
+            return
+        text = "Vista previa (±{:.1%}): ".format(max(result['error'][q] for q
+                                                     in ('k', 'fn', 'w')))
+        for (q, f, u, fmt) in (('k', 1, 'N/mm', "{:.3e}"),
+                               ('fn', 1, 'Hz', "{:.1f}"),
+                               ('w', 1000, 'g', "{:.2f}")):
+            (lo, hi) = result['bounds'][q]
+            if len(result['missing']) == 0:
+                text += ("{} \u2248 " + fmt + " {}   ").format(
+                        q, result[q] * f, u)
+            else:
+                text += ("{} entre " + fmt + " y " + fmt + " {}   ").format(
+                        q, lo * f, hi * f, u)
+        self._preview.set(text.strip())
 
     def createEntries(self, first):
         i = first
@@ -262,12 +482,18 @@ class lFrame1(cFrame):
 
     def solve(self):
         if not self.spring.isSolved:
-            for k in self.cbEntries.keys():
-                setattr(self.spring, k,
-                        self.cbEntries[k]['values']
-                        [self.cbEntries[k]['entry'].get()])
+            options = self.options()
+            for (k, v) in options.items():
+                setattr(self.spring, k, v)
+            inputs = self.inputDict()
+            solved = self.speculativeResult(options, inputs)
             try:
-                self.spring.solveParams(30, **self.inputDict())
+                if solved is None:
+                    self.spring.solveParams(30, **inputs)
+                else:
+                    for (k, v) in solved.__dict__.items():
+                        if k != '_solver':
+                            setattr(self.spring, k, v)
             except Exception as ex:
                 except_handler(ex)
                 return
@@ -278,6 +504,7 @@ class lFrame1(cFrame):
                     print("{} ".format(i), end="")
                 print("")
             else:
+                self._preview.set('')
                 self.cleanEntries()
                 self.writeResult()
                 self.spring.verifyC()
@@ -288,6 +515,9 @@ class lFrame1(cFrame):
         self.parent.event_generate('<<unsolved>>')
         self.cleanEntries()
         self.spring._rstParams()
+        self._preview.set('')
+        self._generation += 1
+        self._speculative = None
 
     def enaButtons(self, event):
         for k in self.entries.keys():
@@ -320,6 +550,7 @@ class lFrame2(cFrame):
                                                      'entryVar': StringVar()}
             self.result[n] = {'unit': u, 'label': None}
         self._update = False
+        self.chart = None
 
     def init_widget(self):
         self.createEntries()
@@ -366,6 +597,8 @@ class lFrame2(cFrame):
             for k in self.result.keys():
                 self.result[k]['label']['text'] = '-'
                 self.result[k]['label']['fg'] = 'black'
+            if self.chart is not None:
+                self.chart.moveCursor(None)
             return
         else:
             self.entries[modKey]['entry'].configure(bg="white")
@@ -396,57 +629,21 @@ class lFrame2(cFrame):
                         kwargs[k] = v
                 if len(kwargs.keys()) >= 3:
                     doWhile = False
-            isRed = False
+            kind = rules.kindOf(self.spring)
+            (codes, worst) = rules.classifyAll(
+                kind, self.spring.material,
+                dict((k, float(v)) for (k, v) in kwargs.items() if k in
+                     rules.limits(kind, self.spring.material)))
             for (k, v) in kwargs.items():
-                if (type(self.spring) is Spring) and k == 'stress':
+                if k in codes:
                     self.result[k]['label']['text'] = "{:.2f}".\
                                                         format(float(v)*100)
-                    if v > 0.4 and v <= 0.6:
-                        self.result[k]['label']['fg'] = 'orange'
-                        self.msg['text'] = "El resorte requiere 'set removal'"
-                    elif v > 0.6:
-                        self.result[k]['label']['fg'] = 'red'
-                        self.msg['text'] = ("El stress es demasiado para la "
-                                            "fuerza requerida")
-                    else:
-                        self.result[k]['label']['fg'] = 'black'
-                        self.msg['text'] = ''
-                elif (type(self.spring) is tSpring) and k == 'stress':
-                    self.result[k]['label']['text'] = "{:.2f}".\
-                                                        format(float(v)*100)
-                    if ((self.spring.material == 'A227' and v > 0.8) or
-                       (self.spring.material == 'T302' and v > 0.6) or
-                       (v > 0.85)):
-                        self.result[k]['label']['fg'] = 'red'
-                        self.msg['text'] = ("El stress es demasiado para la "
-                                            "fuerza requerida")
-                    else:
-                        self.result[k]['label']['fg'] = 'black'
-                        self.msg['text'] = ''
-                elif type(self.spring) is eSpring and (k == 'stress' or
-                                                       k == 'stressA' or
-                                                       k == 'stressB'):
-                    self.result[k]['label']['text'] = "{:.2f}".\
-                                                        format(float(v)*100)
-                    if ((self.spring.material == 'T302' and (
-                            (k == 'stress' and v > 0.35) or
-                            (k == 'stressA' and v > 0.55) or
-                            (k == 'stressB' and v > 0.30))) or
-                        ((k == 'stress' and v > 0.45) or
-                        (k == 'stressA' and v > 0.75) or
-                        (k == 'stressB' and v > 0.40))):
-                        self.result[k]['label']['fg'] = 'red'
-                        isRed = True
-                    else:
-                        self.result[k]['label']['fg'] = 'black'
-                    if isRed:
-                        self.msg['text'] = ("El stress es demasiado para la "
-                                            "fuerza requerida")
-                    else:
-                        self.msg['text'] = ''
+                    self.result[k]['label']['fg'] = STRESSCOLORS[codes[k]]
                 else:
                     self.result[k]['label']['text'] = "{:.2f}".format(v)
-
+            self.msg['text'] = rules.MESSAGES[worst]
+            if self.chart is not None:
+                self.chart.moveCursor(kwargs['x'])
 
     def disButtons(self, event):
         self._update = True
@@ -516,6 +713,140 @@ class lFrame3(cFrame):
         super().disButtons(event)
 
 
+class chartFrame(cFrame):
+    """Force and stress against deflexion of the solved spring, with the
+    bands of the stress limits. The curve is calculated once for each
+    solved spring and kept; while the static values are typed only the
+    cursor is drawn again"""
+    colors = {'stress': 'blue', 'stressA': 'purple', 'stressB': 'brown'}
+
+    def __init__(self, parent, pos, name, spring, cacheSize=32):
+        super().__init__(parent, pos, name, spring)
+        self._cache = OrderedDict()
+        self._cacheSize = cacheSize
+        self.curve = None
+        self.cursor = None
+        self.margin = (50, 15, 50, 25)
+
+    def init_widget(self):
+        self.canvas = Canvas(self.frame, height=200, bg='white',
+                             highlightthickness=0)
+        self.canvas.grid(column=0, row=0, columnspan=2, sticky='nsew',
+                         padx=5, pady=5)
+        self.canvas.bind('<Configure>', lambda e: self.draw())
+
+    def _calcCurve(self, design):
+        """Deflexion, force and stresses of the curve, and the limits"""
+        limits = stressLimits(self.spring)
+        unit = {'stress': design._bodyFactor()}
+        if 'stressA' in limits:
+            unit['stressA'] = design._hookFactorA()
+            unit['stressB'] = design._hookFactorB()
+        if type(self.spring) is Spring:
+            xMax = design.Lo - design.Ls
+        else:
+            xMax = 1.25 * min(limits[k][-1][0] / unit[k] for k in unit) / \
+                design.k
+        return {'xMax': xMax, 'FMax': design.k * xMax, 'unit': unit,
+                'limits': limits,
+                'sMax': max(max(unit[k] * design.k * xMax, limits[k][-1][0])
+                            for k in unit) * 1.1}
+
+    def curveOf(self):
+        """Curve of the solved spring, from the cache when it's there"""
+        design = freeze(self.spring)
+        if design in self._cache:
+            self._cache.move_to_end(design)
+        else:
+            self._cache[design] = self._calcCurve(design)
+            if len(self._cache) > self._cacheSize:
+                self._cache.popitem(last=False)
+        return self._cache[design]
+
+    def _scale(self):
+        (w, h) = (self.canvas.winfo_width(), self.canvas.winfo_height())
+        (l, t, r, b) = self.margin
+        c = self.curve
+        return (lambda x: l + (w - l - r) * x / c['xMax'],
+                lambda F: h - b - (h - t - b) * F / c['FMax'],
+                lambda s: h - b - (h - t - b) * s / c['sMax'])
+
+    def draw(self):
+        """Draw the axes, bands and curves, and the cursor"""
+        self.canvas.delete('all')
+        if self.curve is None:
+            return
+        c = self.curve
+        (sx, sF, ss) = self._scale()
+        (w, h) = (self.canvas.winfo_width(), self.canvas.winfo_height())
+        (l, t, r, b) = self.margin
+        if len(c['limits']) == 1:
+            bands = c['limits']['stress'] + [(c['sMax'], None)]
+            for ((lo, color), (hi, aux)) in zip(bands, bands[1:]):
+                self.canvas.create_rectangle(l, ss(hi), w - r, ss(lo),
+                                             fill=color, outline='',
+                                             stipple='gray25')
+        else:
+            for (k, limits) in c['limits'].items():
+                for (lim, color) in limits:
+                    self.canvas.create_line(l, ss(lim), w - r, ss(lim),
+                                            fill=self.colors[k], dash=(4, 2))
+        self.canvas.create_rectangle(l, t, w - r, h - b, outline='gray40')
+        unit = '\u00ba' if type(self.spring) is tSpring else 'mm'
+        for i in range(5):
+            x = c['xMax'] * i / 4
+            self.canvas.create_text(sx(x), h - b + 3, anchor='n',
+                                    text="{:.3g}".format(x))
+            F = c['FMax'] * i / 4
+            self.canvas.create_text(l - 3, sF(F), anchor='e',
+                                    text="{:.3g}".format(F))
+            s = c['sMax'] * i / 4
+            self.canvas.create_text(w - r + 3, ss(s), anchor='w',
+                                    text="{:.0f}%".format(s * 100))
+        self.canvas.create_text(w - r, h - 2, anchor='se',
+                                text="x ({})".format(unit))
+        self.canvas.create_text(2, t, anchor='nw', text='F', fill='black')
+        self.canvas.create_line(sx(0), sF(0), sx(c['xMax']), sF(c['FMax']),
+                                fill='black', width=2)
+        for (k, u) in c['unit'].items():
+            self.canvas.create_line(sx(0), ss(0), sx(c['xMax']),
+                                    ss(u * c['FMax']), fill=self.colors[k],
+                                    width=2)
+        self.moveCursor(self.cursor)
+
+    def moveCursor(self, x):
+        """Draw the cursor at the deflexion x, or hide it if x is None"""
+        self.cursor = x
+        self.canvas.delete('cursor')
+        if self.curve is None or x is None:
+            return
+        c = self.curve
+        x = min(max(float(x), 0), c['xMax'])
+        (sx, sF, ss) = self._scale()
+        F = self.spring.k * x
+        (t, b) = (self.margin[1], self.canvas.winfo_height() - self.margin[3])
+        self.canvas.create_line(sx(x), t, sx(x), b, fill='gray40',
+                                dash=(2, 2), tags='cursor')
+        points = [(sF(F), 'black')] + [(ss(u * F), self.colors[k]) for
+                                       (k, u) in c['unit'].items()]
+        for (y, color) in points:
+            self.canvas.create_oval(sx(x) - 3, y - 3, sx(x) + 3, y + 3,
+                                    fill=color, outline=color, tags='cursor')
+
+    def enaButtons(self, event):
+        self.cursor = None
+        try:
+            self.curve = self.curveOf()
+        except Exception:
+            self.curve = None
+        self.draw()
+
+    def disButtons(self, event):
+        self.curve = None
+        self.cursor = None
+        self.canvas.delete('all')
+
+
 class consoleFrame(LabelFrame):
     def __init__(self, parent, name):
         self.parent = parent
@@ -525,7 +856,7 @@ class consoleFrame(LabelFrame):
         self.text = Text(self, wrap='word', height=10)
         self.text.grid(column=0, row=0, sticky='nsew', padx=5,
                        pady=5)
-        redir = StdoutRedirector(self.text)
+        redir = ConsoleSink(self.text, logFile=os.environ.get(LOGFILE))
         sys.stdout = redir
 
 
@@ -575,6 +906,259 @@ class subWindow3(subWindow):
         self.lf3.defUnit = 'º'
 
 
+def solveVariant(springClass, database, options, inputs, F, cycles):
+    """Solve one variant of the comparison table in this process (it's run
+    in a worker thread, so nothing is printed and no process is forked) and
+    return the values shown in the table. The hooks typed with the inputs
+    are given as options, see design.newSpring."""
+    inputs = dict(inputs)
+    for k in HOOKS[springClass]:
+        if k in inputs:
+            options[k] = inputs.pop(k)
+    design = solveFast(springClass, inputs, database, **options)
+    result = {'k': design.k, 'fn': design.fn, 'w': design.w, 'C': design.C}
+    if F is not None:
+        result['stress'] = design.stress(F=F)['stress'] * 100
+    dyn = design.verifyDynamic(cycles=cycles)
+    result['x'] = dyn['x']
+    result['fmax'] = dyn['fmax']
+    return result
+
+
+class compWindow(Frame):
+    """Tab used to solve several variants of a spring at the same time and
+    compare them in a table. Each line of the text box is a variant written
+    as 'd=1 DE=10 Nt=8 Lo=20'; optionally the first line can be swept over
+    one field."""
+    def __init__(self, parent, database):
+        self.parent = parent
+        super().__init__(parent)
+        self._db = database
+        self._pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 2)
+        self.bind('<Destroy>', self.close)
+        self._queue = queue.Queue()
+        self._job = 0
+        self._sortKey = None
+        self._sortReverse = False
+        spring = Spring(database=database)
+        self.cbEntries = OrderedDict()
+        self.cbEntries['type'] = {'text': 'Tipo:', 'values': OrderedDict(
+                                  [('Compresión', Spring),
+                                   ('Extensión', eSpring),
+                                   ('Torsión', tSpring)])}
+        self.cbEntries['material'] = {'text': 'Material:', 'values': dict(
+                                      (v['name'], k) for (k, v) in
+                                      loadMaterials(database).items())}
+        self.cbEntries['ending'] = {'text': 'Terminación:', 'values': dict(
+                                    zip(('Cerrado y esmerilado', 'Cerrado',
+                                         'Abierto y esmerilado', 'Abierto'),
+                                        spring._endList))}
+        self.cbEntries['fixing'] = {'text': 'Fijación:', 'values': dict(
+                                    zip(('Ambos extremos fijos y placas '
+                                         'paralelas',
+                                         'Un extremo fijo y otro pivotea',
+                                         'Ambos extremos pivotean',
+                                         'Un extremo amarrado y otro libre'),
+                                        spring._fixList))}
+        self.entries = OrderedDict()
+        names = ['F', 'cycles', 'field', 'start', 'stop', 'steps']
+        texts = ['Fuerza:', 'Ciclos:', 'Barrer campo:', 'Desde:', 'Hasta:',
+                 'Pasos:']
+        defaults = ['', '1e6', '', '', '', '5']
+        for (n, t, v) in zip(names, texts, defaults):
+            self.entries[n] = {'text': t, 'entry': None,
+                               'entryVar': StringVar(value=v)}
+        self.columns = OrderedDict([('variant', 'Variante'),
+                                    ('k', 'k'), ('fn', 'fn [Hz]'),
+                                    ('w', 'w [Kg]'), ('C', 'C'),
+                                    ('stress', 'Estrés [%]'),
+                                    ('x', 'Def. máx.'),
+                                    ('fmax', 'Frec. máx.'),
+                                    ('status', 'Estado')])
+
+    def init_widget(self):
+        frame = LabelFrame(self.parent, text='Variantes')
+        frame.grid(column=0, row=0, sticky='nsew', padx=5, pady=5)
+        frame.grid_columnconfigure(1, weight=1)
+        i = 0
+        for k in self.cbEntries.keys():
+            Label(frame, text=self.cbEntries[k]['text']).grid(column=0, row=i,
+                                                              sticky='w')
+            e = Combobox(frame, width=30)
+            e['values'] = sorted(self.cbEntries[k]['values'].keys())
+            e.grid(column=1, row=i, columnspan=3, sticky='w', padx=10, pady=2)
+            e.current(0 if k != 'ending' else 3)
+            self.cbEntries[k]['entry'] = e
+            i += 1
+        self.text = Text(frame, wrap='none', height=6, width=40)
+        self.text.grid(column=0, row=i, columnspan=4, sticky='nsew', padx=5,
+                       pady=5)
+        self.text.insert('end', 'd=1 DE=10 Nt=8 Lo=20\n')
+        i += 1
+        j = 0
+        for k in self.entries.keys():
+            Label(frame, text=self.entries[k]['text']).grid(
+                column=(j % 2) * 2, row=i + j // 2, sticky='w')
+            e = Entry(frame, width=8, textvariable=self.entries[k]['entryVar'])
+            e.grid(column=(j % 2) * 2 + 1, row=i + j // 2, sticky='w', padx=5,
+                   pady=2)
+            self.entries[k]['entry'] = e
+            j += 1
+        i += j // 2 + 1
+        Button(frame, text='Borrar', command=self.rst).grid(
+            column=0, row=i, sticky='w', padx=5, pady=4)
+        Button(frame, text='Comparar', command=self.solve).grid(
+            column=3, row=i, sticky='e', padx=5, pady=4)
+        tFrame = LabelFrame(self.parent, text='Comparación')
+        tFrame.grid(column=1, row=0, sticky='nsew', padx=5, pady=5)
+        tFrame.grid_columnconfigure(0, weight=1)
+        tFrame.grid_rowconfigure(0, weight=1)
+        self.parent.grid_columnconfigure(1, weight=1)
+        self.parent.grid_rowconfigure(0, weight=1)
+        self.table = Treeview(tFrame, columns=list(self.columns.keys()),
+                              show='headings', height=12)
+        for (k, t) in self.columns.items():
+            self.table.heading(k, text=t,
+                               command=lambda c=k: self.sortBy(c))
+            self.table.column(k, width=170 if k == 'variant' else 75,
+                              anchor='w' if k in ('variant', 'status')
+                              else 'e')
+        self.table.grid(column=0, row=0, sticky='nsew')
+        sb = Scrollbar(tFrame, orient='vertical', command=self.table.yview)
+        sb.grid(column=1, row=0, sticky='ns')
+        self.table['yscrollcommand'] = sb.set
+
+    def variants(self):
+        """Read the variants given in the text box, one per line. If a field
+        to sweep is given, the variants are generated from the first line"""
+        result = []
+        for line in self.text.get('1.0', 'end').splitlines():
+            inputs = {}
+            for item in line.replace(',', ' ').split():
+                if '=' not in item:
+                    raise ValueError("Valor introducido {} no es válido".
+                                     format(item))
+                (k, v) = item.split('=', 1)
+                try:
+                    inputs[k.strip()] = float(v)
+                except ValueError:
+                    raise ValueError("Valor introducido {} = {} no es válido".
+                                     format(k, v))
+            if len(inputs) > 0:
+                result.append(inputs)
+        field = self.entries['field']['entryVar'].get().strip()
+        if len(field) > 0:
+            if len(result) == 0:
+                raise ValueError("Se requiere una variante base para el "
+                                 "barrido")
+            start = float(self.entries['start']['entryVar'].get())
+            stop = float(self.entries['stop']['entryVar'].get())
+            steps = int(float(self.entries['steps']['entryVar'].get()))
+            if steps < 2:
+                raise ValueError("El número de pasos debe ser mayor a 1")
+            base = result[0]
+            result = []
+            for n in range(steps):
+                aux = dict(base)
+                aux[field] = start + (stop - start) * n / (steps - 1)
+                result.append(aux)
+        return result
+
+    def solve(self):
+        springClass = self.cbEntries['type']['values'][
+            self.cbEntries['type']['entry'].get()]
+        options = {'material': self.cbEntries['material']['values'][
+            self.cbEntries['material']['entry'].get()]}
+        if springClass is Spring:
+            for k in ('ending', 'fixing'):
+                options[k] = self.cbEntries[k]['values'][
+                    self.cbEntries[k]['entry'].get()]
+        try:
+            variants = self.variants()
+            F = self.entries['F']['entryVar'].get().strip()
+            F = float(F) if len(F) > 0 else None
+            cycles = float(self.entries['cycles']['entryVar'].get())
+        except ValueError as ex:
+            print(ex)
+            return
+        self.rst()
+        for inputs in variants:
+            text = " ".join("{}={:g}".format(k, v) for (k, v) in
+                            inputs.items())
+            item = self.table.insert('', 'end', values=[text] + ['-'] *
+                                     (len(self.columns) - 2) + ['...'])
+            future = self._pool.submit(solveVariant, springClass, self._db,
+                                       dict(options), inputs, F, cycles)
+            future.add_done_callback(
+                lambda f, i=item, j=self._job: self._queue.put((j, i, f)))
+        self.after(100, self.poll)
+
+    def poll(self):
+        """Write in the table the variants solved since the last call, and
+        keep polling while there are variants being solved"""
+        pending = False
+        while True:
+            try:
+                (job, item, future) = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job != self._job or not self.table.exists(item):
+                continue
+            values = list(self.table.item(item, 'values'))
+            try:
+                result = future.result()
+            except Exception as ex:
+                values[-1] = "Error: {}".format(ex)
+            else:
+                for (i, k) in enumerate(self.columns.keys()):
+                    if k in result:
+                        values[i] = ("{:.3e}".format(float(result[k]))
+                                     if k == 'k' else
+                                     "{:.3f}".format(float(result[k])))
+                values[-1] = 'OK'
+            self.table.item(item, values=values)
+        for item in self.table.get_children():
+            if self.table.set(item, 'status') == '...':
+                pending = True
+        if self._sortKey is not None:
+            self.sortBy(self._sortKey, toggle=False)
+        if pending:
+            self.after(100, self.poll)
+
+    def sortBy(self, column, toggle=True):
+        """Sort the rows of the table using the column given; a second click
+        on the same column reverses the order"""
+        if toggle:
+            if self._sortKey == column:
+                self._sortReverse = not self._sortReverse
+            else:
+                self._sortReverse = False
+        self._sortKey = column
+
+        def key(item):
+            v = self.table.set(item, column)
+            try:
+                return (0, float(v), '')
+            except ValueError:
+                return (1, 0, v)
+        items = sorted(self.table.get_children(), key=key,
+                       reverse=self._sortReverse)
+        for (i, item) in enumerate(items):
+            self.table.move(item, '', i)
+
+    def close(self, event=None):
+        """Stop the workers when the window is destroyed; the variants not
+        started are cancelled"""
+        if event is None or event.widget is self:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def rst(self):
+        self._job += 1
+        self._sortKey = None
+        for item in self.table.get_children():
+            self.table.delete(item)
+
+
 class Window(Frame):
     def __init__(self, parent):
         self.parent = parent
@@ -592,9 +1176,11 @@ class Window(Frame):
         tab1 = Frame(nb)
         tab2 = Frame(nb)
         tab3 = Frame(nb)
+        tab4 = Frame(nb)
         nb.add(tab1, text="Compresión")
         nb.add(tab2, text="Extensión")
         nb.add(tab3, text="Torsión")
+        nb.add(tab4, text="Comparación")
         nb.grid(column=0, row=1, sticky='nsew', padx=5, pady=5)
         msg = consoleFrame(mainFrame, 'Mensages')
         dataB = resource_path('wires.db')
@@ -604,24 +1190,35 @@ class Window(Frame):
                                  "Favor verificar permisos de lectura o "
                                  "ubicación de la misma".format(dataB))
             return
-        self.sub1 = subWindow(tab1, Spring(database=dataB))
-        self.sub1.init_widgets()
-        self.sub2 = subWindow2(tab2, eSpring(database=dataB))
-        self.sub2.init_widgets()
-        self.sub3 = subWindow3(tab3, tSpring(database=dataB))
-        self.sub3.init_widgets()
+        self._db = dataB
+        tables = resource_path('surrogate.npz')
+        if os.path.isfile(tables):
+            surrogate.load(tables)
+        self._tabs = [(tab1, subWindow, Spring), (tab2, subWindow2, eSpring),
+                      (tab3, subWindow3, tSpring), (tab4, compWindow, None)]
+        self.subs = [None] * len(self._tabs)
+        self.buildTab(0)
         self.centerWindow()
         nb.bind("<<NotebookTabChanged>>", self.tabChangedEvent)
 
+    def buildTab(self, idx):
+        """Create the spring and the widgets of the tab the first time that
+        it's shown"""
+        if self.subs[idx] is None:
+            (tab, window, springClass) = self._tabs[idx]
+            if springClass is None:
+                self.subs[idx] = window(tab, self._db)
+                self.subs[idx].init_widget()
+            else:
+                self.subs[idx] = window(tab, springClass(database=self._db))
+                self.subs[idx].init_widgets()
+        return self.subs[idx]
+
     def tabChangedEvent(self, event):
         idx = event.widget.index("current")
-        if idx == 0:
-            self.sub1.lf1.entries['d']['entry'].focus_set()
-        elif idx == 1:
-            self.sub2.lf1.entries['d']['entry'].focus_set()
-        elif idx == 2:
-            self.sub3.lf1.entries['d']['entry'].focus_set()
-
+        sub = self.buildTab(idx)
+        if isinstance(sub, subWindow):
+            sub.lf1.entries['d']['entry'].focus_set()
 
     def appQuit(self):
         self.parent.destroy()
@@ -634,17 +1231,23 @@ class Window(Frame):
         sh = self.parent.winfo_screenheight()
         x = (sw - w) // 2
         y = (sh - h) // 2
-        self.parent.geometry('{}x{}+{}+{}'.format(w, h, x, y))
+        self.parent.geometry('+{}+{}'.format(x, y))
 
 
 def main():
     multiprocessing.freeze_support()
+    profiler = tkprofile.enable()
     root = Tk()
     iconFile = resource_path('spring.ico')
     if os.name == 'nt':
         root.iconbitmap(iconFile)
     Window(root)
-    root.mainloop()
+    try:
+        root.mainloop()
+    finally:
+        if profiler is not None:
+            sys.__stderr__.write("Reporte de latencia: {}\n".format(
+                                 profiler.dump()))
 
 if __name__ == "__main__":
     main()
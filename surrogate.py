@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+"""Approximate values of springs from interpolation tables.
+
+Solving a spring needs all its inputs; while they are being typed the
+values can be estimated from tables of solved springs. For each class,
+ending and material a table of k, fn, w and the stress for an unitary
+force (fraction of TS per N) is solved with the compiled solver over a
+grid of gauge d, spring index C and active turns Na, and the values are
+interpolated linearly in logarithmic scale (they are almost powers of the
+three parameters).
+
+The parameters that aren't given are taken over their whole range: the
+estimate is the median of the table, and the bounds are the minimum and
+maximum. The error of the interpolation is measured when the table is
+built, at the centers of the cells, where it's the largest."""
+from spring import Spring, eSpring, tSpring
+from tensile import loadTable
+from solver import solveFast
+from threading import Lock
+import argparse
+import numpy as np
+
+QUANTITIES = ('k', 'fn', 'w', 'stress')
+"""Ranges of the spring index and active turns of the tables"""
+CRANGE = (3.0, 20.0)
+NARANGE = (1.0, 60.0)
+
+_tables = {}
+_lock = Lock()
+
+
+def _exact(springClass, ending, material, database, d, C, Na):
+    """Solve one point of the table, return the values of QUANTITIES"""
+    inputs = {'d': d, 'DE': (C + 1) * d, 'Na': Na}
+    options = {'material': material}
+    if springClass is Spring:
+        inputs['Lo'] = 2 * d * (Na + 3)
+        options['ending'] = ending
+    design = solveFast(springClass, inputs, database, **options)
+    return ((design.k, design.fn, design.w, design._bodyFactor()),
+            design.Nt - design.Na)
+
+
+class Surrogate:
+    """Interpolation table of a class, ending and material"""
+    def __init__(self, springClass=Spring, ending='closed-ground',
+                 material='A229', database='wires.db', size=(16, 12, 12),
+                 samples=200, seed=0):
+        self.key = (springClass.__name__, ending, material)
+        rows = loadTable(database).get(material, ())
+        if len(rows) == 0:
+            raise ValueError("El data buscado, no se encuentra en la base de "
+                             "datos")
+        dRange = (min(r[0] for r in rows), max(r[1] for r in rows))
+        self.axes = [np.geomspace(*r, n) for (r, n) in
+                     zip((dRange, CRANGE, NARANGE), size)]
+        self.values = np.empty((len(QUANTITIES),) + tuple(size))
+        for i in np.ndindex(*size):
+            (v, self.offset) = _exact(springClass, ending, material,
+                                      database, *[float(a[j]) for (a, j) in
+                                                  zip(self.axes, i)])
+            self.values[(slice(None),) + i] = np.log(np.abs(v))
+        self.error = self._measure(springClass, ending, material, database,
+                                   samples, seed)
+
+    def _measure(self, springClass, ending, material, database, samples,
+                 seed):
+        """Maximum relative error at the centers of random cells"""
+        rnd = np.random.RandomState(seed)
+        error = np.zeros(len(QUANTITIES))
+        for n in range(samples):
+            point = [float(np.sqrt(a[j] * a[j + 1])) for (a, j) in
+                     zip(self.axes, [rnd.randint(len(a) - 1) for a in
+                                     self.axes])]
+            exact = np.abs(_exact(springClass, ending, material, database,
+                                  *point)[0])
+            approx = self._interpolate(point)
+            error = np.maximum(error, np.abs(approx - exact) / exact)
+        return dict((q, float(e)) for (q, e) in zip(QUANTITIES, error))
+
+    def _interpolate(self, point):
+        """Values of QUANTITIES at the point (d, C, Na); the coordinates
+        that are None are kept as a whole axis of the result"""
+        v = self.values
+        for (n, (a, x)) in reversed(list(enumerate(zip(self.axes, point)))):
+            if x is None:
+                continue
+            i = min(max(np.searchsorted(a, x) - 1, 0), len(a) - 2)
+            t = (np.log(x) - np.log(a[i])) / (np.log(a[i + 1]) -
+                                               np.log(a[i]))
+            v = (1 - t) * v.take(i, axis=n + 1) + t * v.take(i + 1,
+                                                                axis=n + 1)
+        return np.exp(v)
+
+    def _point(self, inputs):
+        """Coordinates (d, C, Na) of the parameters given, None when they
+        can't be calculated"""
+        g = dict((k, float(v)) for (k, v) in inputs.items() if v is not None)
+        d = g.get('d')
+        if d is None and 'DE' in g and 'DI' in g:
+            d = (g['DE'] - g['DI']) / 2
+        DM = g.get('DM')
+        if DM is None and 'DE' in g and 'DI' in g:
+            DM = (g['DE'] + g['DI']) / 2
+        if DM is None and d is not None:
+            for (k, s) in (('DE', -1), ('DI', 1)):
+                if k in g:
+                    DM = g[k] + s * d
+                    break
+        if DM is None and d is not None and 'C' in g:
+            DM = g['C'] * d
+        if d is None and DM is not None and 'C' in g:
+            d = DM / g['C']
+        C = g.get('C', DM / d if DM is not None and d is not None else None)
+        Na = g.get('Na', g['Nt'] - self.offset if 'Nt' in g else None)
+        return [d, C, Na]
+
+    def query(self, **inputs):
+        """Estimate the values of a spring from the parameters given (any of
+        d, DE, DM, DI, C, Nt, Na). Return None when the parameters are out
+        of the range of the table, otherwise a dictionary with the values of
+        QUANTITIES, 'bounds' (minimum and maximum of each one), 'error'
+        (relative error of the interpolation) and 'missing' (coordinates of
+        the table that weren't given)"""
+        point = self._point(inputs)
+        for (a, x) in zip(self.axes, point):
+            if x is not None and not a[0] <= x <= a[-1]:
+                return None
+        v = self._interpolate(point).reshape(len(QUANTITIES), -1)
+        result = dict((q, float(np.median(v[i]))) for (i, q) in
+                      enumerate(QUANTITIES))
+        result['bounds'] = dict((q, (float(v[i].min()), float(v[i].max())))
+                                for (i, q) in enumerate(QUANTITIES))
+        result['error'] = dict(self.error)
+        result['missing'] = [n for (n, x) in zip(('d', 'C', 'Na'), point)
+                             if x is None]
+        return result
+
+    def asArrays(self):
+        """Arrays of the table, to save it with numpy.savez"""
+        return {'d': self.axes[0], 'C': self.axes[1], 'Na': self.axes[2],
+                'values': self.values, 'offset': self.offset,
+                'error': np.array([self.error[q] for q in QUANTITIES])}
+
+    @classmethod
+    def fromArrays(cls, key, arrays):
+        self = cls.__new__(cls)
+        self.key = key
+        self.axes = [arrays[k] for k in ('d', 'C', 'Na')]
+        self.values = arrays['values']
+        self.offset = float(arrays['offset'])
+        self.error = dict((q, float(e)) for (q, e) in zip(QUANTITIES,
+                                                          arrays['error']))
+        return self
+
+
+def surrogate(springClass, ending, material, database='wires.db'):
+    """Return the table of the class, ending and material; it's built the
+    first time (a few seconds) and kept"""
+    if springClass is not Spring:
+        ending = 'open'
+    key = (springClass.__name__, ending, material)
+    with _lock:
+        table = _tables.get(key)
+    if table is None:
+        table = Surrogate(springClass, ending, material, database)
+        with _lock:
+            table = _tables.setdefault(key, table)
+    return table
+
+
+def preview(springClass, ending, material, database='wires.db', **inputs):
+    """Estimate the values of a spring from partial inputs, see
+    Surrogate.query"""
+    if springClass is tSpring and any(inputs.get(k) for k in ('L1', 'L2')):
+        return None
+    return surrogate(springClass, ending, material, database).query(**inputs)
+
+
+def save(path):
+    """Save the tables built to a file"""
+    with _lock:
+        tables = dict(_tables)
+    data = {}
+    for (key, table) in tables.items():
+        for (k, v) in table.asArrays().items():
+            data['|'.join(key) + '|' + k] = v
+    np.savez(path, **data)
+
+
+def load(path):
+    """Load the tables of a file saved with save()"""
+    data = np.load(path)
+    keys = set(tuple(k.split('|')[:3]) for k in data.files)
+    with _lock:
+        for key in keys:
+            prefix = '|'.join(key) + '|'
+            _tables[key] = Surrogate.fromArrays(key, dict(
+                (k[len(prefix):], data[k]) for k in data.files
+                if k.startswith(prefix)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path', nargs='?', default='surrogate.npz')
+    parser.add_argument('--material', nargs='*', default=None)
+    parser.add_argument('--database', default='wires.db')
+    args = parser.parse_args()
+    materials = args.material or list(loadTable(args.database).keys())
+    for m in materials:
+        for springClass in (Spring, eSpring, tSpring):
+            endings = Spring(database=args.database)._endList if \
+                springClass is Spring else ['open']
+            for e in endings:
+                table = surrogate(springClass, e, m, args.database)
+                print("{:8}{:15}{:6}".format(springClass.__name__, e, m),
+                      " ".join("{}: {:.2%}".format(q, table.error[q])
+                               for q in QUANTITIES))
+    save(args.path)
+
+
+if __name__ == '__main__':
+    main()
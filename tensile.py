@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+"""Minimum tensile strength of the wire, from the table EQ_TS.
+
+Each row of EQ_TS gives the coefficients A and M of a material for the
+gauges between VALID_MIN and VALID_MAX. With the values of the database the
+tensile strength in MPa is
+
+    TS = A + M * ln(d)
+
+(it agrees with the tabulated values of TABLE_TS within a few percent).
+When the gauge is in two ranges (e.g. T302 at 2.03 mm) the first row of the
+table is used. The table is read only once for each database and the values
+of every (material, d) are memorized, so the stress of many springs can be
+calculated without querying the database."""
+from functools import lru_cache
+from threading import Lock
+from math import log
+import sqlite3 as sq
+import numpy as np
+import os
+
+_tables = {}
+_lock = Lock()
+
+
+def loadTable(database='wires.db'):
+    """Return the rows of EQ_TS of each material as a dictionary of lists of
+    tuples (VALID_MIN, VALID_MAX, A, M), in the order of the database"""
+    key = os.path.abspath(database)
+    with _lock:
+        if key not in _tables:
+            if not os.path.isfile(database):
+                raise FileNotFoundError("El archivo de base de dato no se "
+                                        "encuentra disponible")
+            con = sq.connect(database)
+            try:
+                rows = con.execute("SELECT WIRE_MAT, VALID_MIN, VALID_MAX, "
+                                   "A, M FROM EQ_TS").fetchall()
+            finally:
+                con.close()
+            table = {}
+            for r in rows:
+                table.setdefault(r[0], []).append(tuple(r[1:]))
+            _tables[key] = table
+        return _tables[key]
+
+
+@lru_cache(maxsize=4096)
+def _scalarTS(database, material, d):
+    for (dMin, dMax, A, M) in loadTable(database).get(material, ()):
+        if dMin <= d <= dMax:
+            return A + M * log(d)
+    raise ValueError("El data buscado, no se encuentra en la base de datos")
+
+
+def tensileStrength(material, d, database='wires.db'):
+    """Tensile strength in MPa of the material for the gauge 'd'. If 'd' is
+    a number a float is returned, and a ValueError is raised when the gauge
+    is out of the valid ranges. If 'd' is an array, an array of the same
+    shape is returned, with NaN for the gauges out of range."""
+    database = os.path.abspath(database)
+    if np.ndim(d) == 0:
+        return _scalarTS(database, material, float(d))
+    d = np.asarray(d, dtype=float)
+    result = np.full(d.shape, np.nan)
+    done = np.zeros(d.shape, dtype=bool)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        lnd = np.log(d)
+    for (dMin, dMax, A, M) in loadTable(database).get(material, ()):
+        mask = ~done & (d >= dMin) & (d <= dMax)
+        result[mask] = A + M * lnd[mask]
+        done |= mask
+    return result
@@ -0,0 +1,14 @@
+import os
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATABASE = os.path.join(ROOT, 'wires.db')
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(autouse=True)
+def root(monkeypatch):
+    """The modules use 'wires.db' relative to the folder of the program"""
+    monkeypatch.chdir(ROOT)
+    return ROOT
@@ -0,0 +1,82 @@
+from threading import Thread
+import socket
+import numpy as np
+import pytest
+
+import cluster
+from design import PARAMS
+
+OPTIONS = {'material': 'A227', 'fixing': 'fix-pivot'}
+
+
+def fakeWorker(address, answer):
+    """Worker that answers each shard with answer(msg), None closes the
+    connection"""
+    with socket.create_connection(address) as sock:
+        cluster.send(sock, {'type': 'hello', 'token': ''})
+        while True:
+            try:
+                msg = cluster.recv(sock)
+            except ConnectionError:
+                return
+            if msg['type'] != 'shard':
+                return
+            reply = answer(msg)
+            if reply is None:
+                return
+            cluster.send(sock, reply)
+
+
+def test_grid():
+    (names, rows) = cluster.grid(d=[1, 2], Nt=[5, 6, 7])
+    assert names == ['d', 'Nt']
+    assert len(rows) == 6
+    assert rows[0] == [1.0, 5.0]
+
+
+def test_runLocal():
+    (names, rows) = cluster.grid(d=[1, 1.2], DE=[10], Nt=[8], Lo=[20, 25])
+    result = cluster.runLocal('compression', names, rows, workers=2,
+                              timeout=300, options=OPTIONS, shardSize=1)
+    assert result['values'].shape == (4, len(PARAMS))
+    assert result['errors'] == {}
+    (values, errors) = cluster.solveShard('compression', OPTIONS, names,
+                                          rows)
+    assert np.allclose(result['values'], np.array(values, dtype=float))
+
+
+def test_errorKeepsWorker():
+    (names, rows) = cluster.grid(d=[1], DE=[10], Nt=[8], Lo=[20, 25])
+    coord = cluster.Coordinator('compression', names, rows, OPTIONS,
+                                shardSize=1, retries=1).start()
+    answers = []
+
+    def answer(msg):
+        answers.append(msg['id'])
+        return {'type': 'error', 'id': msg['id'], 'error': 'Error: falla'}
+    Thread(target=fakeWorker, args=(coord.address, answer),
+           daemon=True).start()
+    result = coord.run(timeout=30)
+    assert len(answers) == 4
+    assert coord.stats == {'workers': 1, 'retries': 2, 'failed': 2}
+    assert sorted(result['errors']) == [0, 1]
+    assert np.isnan(result['values']).all()
+
+
+def test_noWorkersLeft():
+    (names, rows) = cluster.grid(d=[1], DE=[10], Nt=[8], Lo=[20, 25, 30])
+    coord = cluster.Coordinator('compression', names, rows, OPTIONS,
+                                shardSize=1, retries=5).start()
+    worker = Thread(target=fakeWorker, args=(coord.address, lambda m: None),
+                    daemon=True)
+    worker.start()
+    result = coord.run(timeout=30)
+    assert sorted(result['errors']) == [0, 1, 2]
+    assert "No quedan trabajadores" in result['errors'][2]
+
+
+def test_timeout():
+    coord = cluster.Coordinator('compression', ['d'], [[1.0]], OPTIONS)
+    coord.start()
+    with pytest.raises(TimeoutError):
+        coord.run(timeout=0.2)
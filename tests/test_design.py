@@ -0,0 +1,45 @@
+import pytest
+
+from spring import Spring, eSpring, tSpring
+from design import freeze
+
+CASES = [(Spring, {'material': 'A227', 'fixing': 'fix-pivot'},
+          {'d': 1, 'DE': 10, 'Nt': 8, 'Lo': 20}),
+         (eSpring, {'material': 'A228'}, {'d': 1, 'DE': 10, 'Nt': 8}),
+         (tSpring, {'material': 'A229', 'L1': 10, 'L2': 15},
+          {'d': 1, 'DE': 10, 'Nt': 8})]
+
+
+@pytest.fixture(params=CASES, ids=lambda c: c[0].__name__)
+def solved(request):
+    (springClass, options, inputs) = request.param
+    spring = springClass(**options)
+    spring.solveParams(None, **inputs)
+    return (spring, freeze(spring))
+
+
+def test_stress(solved):
+    (spring, design) = solved
+    expected = spring.stress(F=5)
+    for (k, v) in design.stress(F=5).items():
+        assert v == pytest.approx(float(expected[k]), rel=1e-9)
+
+
+def test_verifyDynamic(solved):
+    (spring, design) = solved
+    expected = spring.verifyDynamic()
+    result = design.verifyDynamic()
+    assert result['x'] == pytest.approx(float(expected['x']), rel=1e-9)
+    assert result['fmax'] == pytest.approx(float(expected['fmax']))
+
+
+def test_sharedFormulas(solved):
+    (spring, design) = solved
+    spring._setTS()
+    assert design._bodyFactor() == pytest.approx(float(spring._bodyFactor()))
+    assert design._fmax() == pytest.approx(float(spring._fmax()))
+    if type(spring) is eSpring:
+        assert design._hookFactorA() == \
+            pytest.approx(float(spring._hookFactorA()))
+        assert design._hookFactorB() == \
+            pytest.approx(float(spring._hookFactorB()))
@@ -0,0 +1,85 @@
+from multiprocessing import Process
+from time import time
+import io
+import pytest
+
+import jobqueue
+from design import PARAMS
+
+OPTIONS = {'material': 'A227', 'fixing': 'fix-pivot'}
+INPUTS = [{'d': 1, 'DE': 10, 'Nt': 8, 'Lo': 20},
+          {'d': 1.2, 'DE': 10, 'Nt': 8, 'Lo': 25}]
+
+
+@pytest.fixture
+def jobs(tmp_path):
+    jobs = jobqueue.JobQueue(str(tmp_path / 'jobs.db'))
+    yield jobs
+    jobs.close()
+
+
+def deadWorker():
+    """Name of a process of this machine that already exited"""
+    p = Process(target=int)
+    p.start()
+    p.join()
+    return "{}:{}".format(jobqueue.workerName().rpartition(':')[0], p.pid)
+
+
+def test_claimComplete(jobs):
+    assert jobs.add('compression', INPUTS, OPTIONS) == 2
+    claimed = jobs.claim('test:1')
+    assert [c[3] for c in claimed] == INPUTS
+    assert jobs.progress()['running'] == 2
+    jobs.complete([(i,) + jobqueue.solveJob(kind, options, inputs)
+                   for (i, kind, options, inputs) in claimed])
+    assert jobs.progress()['done'] == 2
+    result = jobs.results()
+    assert result['values'].shape == (2, len(PARAMS))
+    assert result['errors'] == {}
+
+
+def test_workerAlive():
+    assert jobqueue.workerAlive(jobqueue.workerName()) is True
+    assert jobqueue.workerAlive(deadWorker()) is False
+    assert jobqueue.workerAlive('other-machine:1') is None
+
+
+def test_resumeKeepsLiveWorkers(jobs):
+    jobs.add('compression', INPUTS, OPTIONS)
+    jobs.claim(jobqueue.workerName(), 1)
+    jobs.claim('other-machine:1', 1)
+    assert jobs.resume() == (0, 0)
+    assert jobs.progress()['running'] == 2
+
+
+def test_resumeStale(jobs):
+    jobs.add('compression', INPUTS, OPTIONS)
+    jobs.claim(deadWorker(), 1)
+    jobs.claim('other-machine:1', 1)
+    assert jobs.resume() == (1, 0)
+    assert jobs.progress()['running'] == 1
+    jobs._con.execute("UPDATE JOBS SET CLAIMED_AT = ?", (time() - 7200,))
+    assert jobs.resume(lease=3600) == (1, 0)
+    assert jobs.progress()['pending'] == 2
+
+
+def test_maxAttempts(jobs):
+    jobs.add('compression', INPUTS[:1], OPTIONS)
+    for i in range(3):
+        jobs.claim(deadWorker())
+        jobs.resume(maxAttempts=3)
+    assert jobs.progress()['failed'] == 1
+    assert 'intentos' in jobs.results()['errors'][0]
+    assert jobs.retryFailed() == 1
+    jobs.claim(deadWorker())
+    assert jobs.resume(maxAttempts=3) == (1, 0)
+
+
+def test_run(jobs):
+    jobs.add('compression', INPUTS, OPTIONS)
+    jobs.add('compression', [{'d': 1}], OPTIONS)
+    state = jobqueue.run(jobs.path, workers=1, interval=0.1,
+                         out=io.StringIO())
+    assert state['done'] == 2
+    assert state['failed'] == 1
@@ -0,0 +1,69 @@
+from threading import Thread
+from urllib.request import Request, urlopen
+from urllib.error import HTTPError
+import json
+import pytest
+
+import service
+
+SPEC = {'type': 'compression', 'material': 'A227', 'fixing': 'fix-pivot',
+        'inputs': {'d': 1, 'DE': 10, 'Nt': 8, 'Lo': 20}}
+
+
+@pytest.fixture(scope='module')
+def url():
+    server = service.serve('127.0.0.1', 0, workers=1, batchWait=0.001)
+    thread = Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield "http://{}:{}".format(*server.server_address)
+    server.shutdown()
+    server.batcher.close()
+
+
+def post(url, endpoint, data):
+    request = Request(url + '/' + endpoint, json.dumps(data).encode(),
+                      {'Content-Type': 'application/json'})
+    try:
+        with urlopen(request, timeout=60) as response:
+            return (response.status, json.load(response))
+    except HTTPError as ex:
+        return (ex.code, json.load(ex))
+
+
+def test_solve(url):
+    (code, result) = post(url, 'solve', SPEC)
+    assert code == 200
+    assert result['d'] == 1
+    assert result['Lo'] == 20
+    assert result['k'] > 0
+
+
+def test_force(url):
+    (code, solved) = post(url, 'solve', SPEC)
+    (code, result) = post(url, 'force', dict(SPEC, x=2))
+    assert code == 200
+    assert result['F'] == pytest.approx(2 * solved['k'])
+
+
+def test_badRequest(url):
+    (code, result) = post(url, 'solve', dict(SPEC, type='spiral'))
+    assert code == 400
+    assert 'error' in result
+    (code, result) = post(url, 'unknown', SPEC)
+    assert code == 404
+
+
+def test_health(url):
+    post(url, 'solve', SPEC)
+    with urlopen(url + '/health', timeout=60) as response:
+        health = json.load(response)
+    assert health['workers'] == 1
+    assert health['requests'] >= 1
+    assert health['batches'] >= 1
+
+
+def test_jsonValue():
+    data = service.jsonValue({'a': float('nan'), 'b': [1.0, float('inf')],
+                              'c': 'A227'})
+    assert json.dumps(data, allow_nan=False) == \
+        '{"a": null, "b": [1.0, null], "c": "A227"}'
@@ -0,0 +1,27 @@
+import pytest
+from spring import Spring, eSpring, tSpring
+import springcalc
+
+COMPRESSION = {'material': 'A229', 'ending': 'closed-ground',
+               'fixing': 'fix-parallel'}
+
+
+@pytest.mark.parametrize('springClass, options, inputs, hooks', [
+    (Spring, COMPRESSION, {'d': 1, 'DE': 10, 'Nt': 8, 'Lo': 20}, {}),
+    (eSpring, {'material': 'A229'}, {'d': 1, 'DE': 8, 'Nt': 10},
+     {'La': 5}),
+    (tSpring, {'material': 'A229'}, {'d': 1, 'DE': 10, 'Nt': 5},
+     {'L1': 10, 'L2': 10})])
+def test_solveVariant(springClass, options, inputs, hooks):
+    result = springcalc.solveVariant(springClass, 'wires.db', dict(options),
+                                     {**inputs, **hooks}, 5, 1e6)
+    ref = springClass(**options, **(hooks if springClass is tSpring else
+                                    {}))
+    for (k, v) in hooks.items():
+        setattr(ref, k, v)
+    ref.solveParams(None, **inputs)
+    for k in ('k', 'fn', 'w', 'C'):
+        assert result[k] == pytest.approx(float(getattr(ref, k)))
+    assert result['stress'] == pytest.approx(
+        float(ref.stress(F=5)['stress']) * 100)
+    assert result['x'] == pytest.approx(float(ref.verifyDynamic()['x']))
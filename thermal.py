@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+"""Derating of springs with the working temperature.
+
+The moduli of the steels decrease almost linearly with the temperature,
+so the constant and the natural frequency of a spring are lower when it's
+hot, and the relaxation limits the stress allowed as the temperature gets
+near the maximum working temperature of the material (MAX_WORK_TEMP of
+MATERIALS). The model used is
+    G(T) = G * (1 - DMODULUS * (T - TREF)),  E(T) the same
+    allowed(T) = allowed * (1 - (1 - RELAX) * s),  s = (T - TREF) /
+                 (maxT - TREF) between 0 and 1
+where TREF is the room temperature, DMODULUS the relative change of the
+moduli per °C and RELAX the fraction of the allowed stress kept at maxT.
+The temperatures over maxT are flagged, and also the ones over the stress
+relief temperature (HT_TEMP), that would change the heat treatment of the
+wire. Temperatures in °C.
+
+The database has no temperature data besides maxT and htTemp, so the
+constants are typical values, not tabulated ones:
+    - DMODULUS is the mean slope between 20 and 300 °C of the curves of the
+      moduli against temperature of carbon and stainless steels (ASM
+      Handbook, vol. 1, elastic properties of steels), rounded: about 2.5 %
+      per 100 °C for the carbon and alloy steels and 4 % for the stainless
+      T302.
+    - RELAX is a conservative choice of this module: the maximum working
+      temperatures of the spring design handbooks (Associated Spring,
+      Design Handbook; SMI, Handbook of Spring Design) are the ones where
+      the relaxation of a spring loaded to its usual stress is still small,
+      so 15 % of the allowed stress is given up when reaching them.
+Replace them with the data of the supplier of the wire when available."""
+from design import Design, eDesign, freeze
+from spring import loadMaterials
+import numpy as np
+
+TREF = 20.0
+"""Relative change of G and E per °C of each material"""
+DMODULUS = {'A227': 2.5e-4, 'A228': 2.5e-4, 'A229': 2.5e-4, 'A231': 2.5e-4,
+            'A401': 2.5e-4, 'T302': 4.0e-4}
+"""Fraction of the allowed stress kept at the maximum working temperature"""
+RELAX = 0.85
+
+
+def _coefficients(material):
+    if material not in DMODULUS:
+        raise ValueError("No hay datos de temperatura para el material {}".
+                         format(material))
+    return DMODULUS[material]
+
+
+def modulusFactor(material, T):
+    """Factor of G and E at the temperatures T (number or array)"""
+    return 1 - _coefficients(material) * (np.asarray(T, dtype=float) - TREF)
+
+
+def stressFactor(maxT, T):
+    """Factor of the allowed stress at the temperatures T for a material
+    with maximum working temperature maxT"""
+    s = np.clip((np.asarray(T, dtype=float) - TREF) / (maxT - TREF), 0, 1)
+    return 1 - (1 - RELAX) * s
+
+
+def _unitStress(design):
+    """Stress (fraction of TS) for an unitary force, of the body and the
+    hooks of the design"""
+    result = {'stress': design._bodyFactor()}
+    if type(design) is eDesign:
+        result['stressA'] = design._hookFactorA()
+        result['stressB'] = design._hookFactorB()
+    return result
+
+
+def derate(design, T, cycles=1e6):
+    """Evaluate a design (or solved spring) at the temperatures T in one
+    pass. Return a dictionary of arrays with the shape of T: G, E, k, fn,
+    the allowed stress (keys of the stress method) for the cycles given,
+    the maximum force F and deflexion x that keep the stress allowed, and
+    the flags overMax (T > maxT) and overHT (T >= htTemp)"""
+    if not isinstance(design, Design):
+        design = freeze(design)
+    T = np.asarray(T, dtype=float)
+    fm = modulusFactor(design.material, T)
+    fs = stressFactor(design.maxT, T)
+    result = {'T': T, 'G': design.G * fm, 'E': design.E * fm,
+              'k': design.k * fm, 'fn': design.fn * np.sqrt(fm)}
+    TS = design._dynamicTS(cycles)[0]
+    unit = _unitStress(design)
+    F = np.full(T.shape, np.inf)
+    for (key, frac) in TS.items():
+        result[key] = frac * fs
+        F = np.minimum(F, frac * fs / unit[key])
+    x = F / result['k']
+    if type(design) is Design:
+        x = np.minimum(x, design.Lo - design.Ls)
+        F = np.minimum(F, x * result['k'])
+    result['F'] = F
+    result['x'] = x
+    result['overMax'] = T > design.maxT
+    result['overHT'] = T >= design.htTemp
+    return result
+
+
+def screen(designs, T, cycles=1e6, kTol=None):
+    """Screen a catalog of designs against a thermal profile (array of
+    temperatures). Every design is evaluated at the highest temperature of
+    the profile; the values are arrays with one value per design: Tmax
+    (the highest temperature), margin (maxT - Tmax), overMax, overHT, dk
+    (relative loss of the constant), F (maximum force allowed) and ok. If
+    kTol is given, the designs that lose more constant than kTol aren't
+    ok."""
+    designs = [d if isinstance(d, Design) else freeze(d) for d in designs]
+    Tmax = float(np.max(T))
+    maxT = np.array([d.maxT for d in designs])
+    htTemp = np.array([d.htTemp for d in designs])
+    dm = np.array([_coefficients(d.material) for d in designs])
+    fs = stressFactor(maxT, Tmax)
+    F = np.array([min(frac / _unitStress(d)[key] for (key, frac) in
+                      d._dynamicTS(cycles)[0].items()) for d in designs])
+    result = {'Tmax': np.full(len(designs), Tmax), 'margin': maxT - Tmax,
+              'overMax': Tmax > maxT, 'overHT': Tmax >= htTemp,
+              'dk': dm * (Tmax - TREF), 'F': F * fs}
+    ok = ~result['overMax'] & ~result['overHT']
+    if kTol is not None:
+        ok &= result['dk'] <= kTol
+    result['ok'] = ok
+    return result
+
+
+def materialLimits(database='wires.db'):
+    """Maximum working temperature, stress relief temperature and time of
+    each material"""
+    return dict((m, {'maxT': v['maxT'], 'htTemp': v['htTemp'],
+                     'htTime': v['htTime']}) for (m, v) in
+                loadMaterials(database).items())
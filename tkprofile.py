@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+"""Latency of the callbacks of Tk.
+
+Every Python function called by Tk (commands of the buttons, bindings of
+events, traces of the variables and after) is registered through
+tkinter.CallWrapper; the Profiler replaces that class, so each call is
+timed. For each handler it keeps the number of calls, the total time, the
+own time (without the handlers called inside it, e.g. the ones bound to
+<<solved>> run by event_generate) and a histogram of the latency. The
+calls slower than 'threshold' ms are logged with their arguments, and the
+report can be saved as JSON for offline analysis.
+
+It's enabled by springcalc with the argument --profile[=report.json] or the
+environment variable SPRINGCALC_PROFILE (the path of the report); the
+threshold in ms can be given with SPRINGCALC_PROFILE_MS.
+
+Usage of a saved report:
+    python tkprofile.py report.json"""
+from collections import deque
+from time import perf_counter, time, strftime, localtime
+import argparse
+import tkinter
+import logging
+import reprlib
+import json
+import sys
+import os
+
+"""Upper limits of the buckets of the histogram, in ms"""
+BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+ENVIRON = 'SPRINGCALC_PROFILE'
+
+_repr = reprlib.Repr()
+_repr.maxstring = 80
+_repr.maxother = 80
+
+
+def handlerName(func):
+    """Readable name of a callback: the qualified name of the function or
+    method, plus the file and line for the lambdas and local functions"""
+    func = getattr(func, '__func__', func)
+    name = getattr(func, '__qualname__', None) or type(func).__qualname__
+    if '<' in name and hasattr(func, '__code__'):
+        name += " ({}:{})".format(os.path.basename(
+                                  func.__code__.co_filename),
+                                  func.__code__.co_firstlineno)
+    return name
+
+
+def _unwrap(func):
+    """Function and arguments scheduled with after, that tkinter wraps in
+    a local function 'callit'"""
+    code = getattr(func, '__code__', None)
+    if code is not None and func.__qualname__.endswith('after.<locals>.'
+                                                       'callit'):
+        cells = dict(zip(code.co_freevars, (c.cell_contents for c in
+                                            func.__closure__)))
+        if 'func' in cells:
+            return (cells['func'], cells.get('args', ()), 'after')
+    return (func, None, 'tk')
+
+
+class Profiler:
+    """Statistics of the callbacks of Tk. Use install() before creating the
+    widgets (the callbacks registered before aren't timed)"""
+    def __init__(self, threshold=100.0, maxSlow=1000, path=None):
+        self.threshold = threshold
+        self.path = path
+        self.stats = {}
+        self.slow = deque(maxlen=maxSlow)
+        self.started = time()
+        self._stack = []
+        self._original = None
+        self._log = logging.getLogger('springcalc.tkprofile')
+
+    def install(self):
+        """Replace tkinter.CallWrapper by a wrapper that times the calls"""
+        if self._original is None:
+            self._original = tkinter.CallWrapper
+            profiler = self
+
+            class CallWrapper(self._original):
+                def __call__(self, *args):
+                    return profiler._call(self, args)
+            tkinter.CallWrapper = CallWrapper
+        return self
+
+    def uninstall(self):
+        if self._original is not None:
+            tkinter.CallWrapper = self._original
+            self._original = None
+
+    def _call(self, wrapper, args):
+        """Call a callback like tkinter.CallWrapper and record its time"""
+        self._stack.append(0.0)
+        start = perf_counter()
+        try:
+            if wrapper.subst:
+                args = wrapper.subst(*args)
+            return wrapper.func(*args)
+        except SystemExit:
+            raise
+        except:
+            wrapper.widget._report_exception()
+        finally:
+            elapsed = (perf_counter() - start) * 1000
+            inner = self._stack.pop()
+            if len(self._stack) > 0:
+                self._stack[-1] += elapsed
+            self.record(wrapper, args, elapsed, elapsed - inner)
+
+    def record(self, wrapper, args, elapsed, own):
+        """Add a call of 'elapsed' ms (own ms without the inner callbacks)
+        to the statistics of its handler"""
+        name = getattr(wrapper, '_profileName', None)
+        if name is None:
+            (func, after, kind) = _unwrap(wrapper.func)
+            name = "{}: {}".format(kind, handlerName(func))
+            wrapper._profileName = name
+            wrapper._profileArgs = after
+        s = self.stats.get(name)
+        if s is None:
+            s = self.stats[name] = {'calls': 0, 'total': 0.0, 'own': 0.0,
+                                    'max': 0.0,
+                                    'histogram': [0] * (len(BUCKETS) + 1)}
+        s['calls'] += 1
+        s['total'] += elapsed
+        s['own'] += own
+        s['max'] = max(s['max'], elapsed)
+        i = 0
+        while i < len(BUCKETS) and elapsed > BUCKETS[i]:
+            i += 1
+        s['histogram'][i] += 1
+        if elapsed >= self.threshold:
+            if wrapper._profileArgs is not None:
+                args = wrapper._profileArgs
+            text = ", ".join(_repr.repr(a) for a in args)
+            self.slow.append({'time': time(), 'handler': name,
+                              'ms': round(elapsed, 3), 'own': round(own, 3),
+                              'args': text})
+            self._log.warning("%s tardó %.0f ms (propio %.0f ms), "
+                              "argumentos: %s", name, elapsed, own, text)
+
+    def report(self):
+        """Statistics of the session as a dictionary"""
+        handlers = {}
+        for (name, s) in sorted(self.stats.items(), key=lambda i:
+                                -i[1]['total']):
+            handlers[name] = {
+                'calls': s['calls'], 'totalMs': round(s['total'], 3),
+                'ownMs': round(s['own'], 3), 'maxMs': round(s['max'], 3),
+                'meanMs': round(s['total'] / s['calls'], 3),
+                'histogram': dict(zip(["<={}".format(b) for b in BUCKETS] +
+                                      [">{}".format(BUCKETS[-1])],
+                                      s['histogram']))}
+        return {'started': self.started, 'seconds': time() - self.started,
+                'thresholdMs': self.threshold, 'buckets': list(BUCKETS),
+                'handlers': handlers, 'slow': list(self.slow)}
+
+    def dump(self, path=None):
+        """Save the report as JSON, by default in 'path' or in
+        tkprofile-<date>.json. Return the path"""
+        path = path or self.path or strftime('tkprofile-%Y%m%d-%H%M%S.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=1, ensure_ascii=False)
+        return path
+
+
+def summary(report, n=15):
+    """Text with the handlers of a report with the most total time"""
+    lines = ["{0:50}{1:>8}{2:>11}{3:>11}{4:>10}".format(
+             'Manejador', 'Llamadas', 'Total ms', 'Propio ms', 'Máx ms')]
+    for (name, s) in list(report['handlers'].items())[:n]:
+        lines.append("{0:50}{1:8d}{2:11.1f}{3:11.1f}{4:10.1f}".format(
+                     name[:49], s['calls'], s['totalMs'], s['ownMs'],
+                     s['maxMs']))
+    lines.append("{} llamadas sobre {:.0f} ms".format(len(report['slow']),
+                                                       report['thresholdMs']))
+    return "\n".join(lines)
+
+
+def enable(argv=None, environ=None):
+    """Install a profiler if the arguments have --profile[=path] or the
+    environment has SPRINGCALC_PROFILE. Return it, or None"""
+    argv = sys.argv[1:] if argv is None else argv
+    environ = os.environ if environ is None else environ
+    path = environ.get(ENVIRON)
+    enabled = path is not None
+    for a in argv:
+        if a == '--profile' or a.startswith('--profile='):
+            enabled = True
+            path = a.partition('=')[2] or path
+    if not enabled:
+        return None
+    threshold = float(environ.get(ENVIRON + '_MS', 100))
+    return Profiler(threshold, path=path or None).install()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('report', help='reporte JSON de una sesión')
+    parser.add_argument('-n', type=int, default=15)
+    parser.add_argument('--slow', action='store_true',
+                        help='mostrar las llamadas lentas')
+    args = parser.parse_args()
+    with open(args.report, encoding='utf-8') as f:
+        report = json.load(f)
+    print(summary(report, args.n))
+    if args.slow:
+        for s in report['slow']:
+            print("{} {:8.1f} ms  {}({})".format(
+                  strftime('%H:%M:%S', localtime(s['time'])), s['ms'], s['handler'], s['args']))
+
+
+if __name__ == '__main__':
+    main()